@@ -0,0 +1,3 @@
+"""
+FoodScanner backend benchmarks package.
+"""
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark barcode resolution: BarcodeIndex lookups (hits and misses) against
+a linear scan of the code column, over the real product store or a synthetic
+corpus of EAN-13 codes.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src import config
+from src.barcode_index import BarcodeIndex
+
+
+def synthetic_codes(rows, rng):
+    """Distinct random 13-digit codes"""
+    codes = rng.choice(10 ** 12, size=rows, replace=False) + 10 ** 12
+    return [str(code) for code in codes]
+
+
+def time_per_call(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", type=Path, default=config.EMBEDDINGS_DIR / "product_store",
+                        help="Product store to index")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Use this many synthetic codes instead of the product store")
+    parser.add_argument("--samples", type=int, default=100000, help="Lookups timed")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        codes = synthetic_codes(args.synthetic, rng)
+    else:
+        from src.product_store import ProductStore
+        store = ProductStore(args.store)
+        codes = [store.get_raw(row)[2] for row in range(len(store))]
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        indexed = BarcodeIndex.build(codes, index_dir)
+        build_seconds = time.perf_counter() - start
+        index = BarcodeIndex(index_dir)
+
+        hits = [codes[int(row)] for row in rng.integers(0, len(codes), size=args.samples)]
+        misses = [str(code) for code in rng.integers(10 ** 13, 2 * 10 ** 13, size=args.samples)]
+        hit_seconds = time_per_call(index.lookup, hits)
+        miss_seconds = time_per_call(index.lookup, misses)
+        scan_seconds = time_per_call(codes.index, hits[:20])
+
+    print(f"Products:            {len(codes)}")
+    print(f"Indexed barcodes:    {indexed}")
+    print(f"Index build:         {build_seconds:.2f}s")
+    print(f"Lookup hit:          {hit_seconds * 1e6:.2f} µs")
+    print(f"Lookup miss:         {miss_seconds * 1e6:.2f} µs")
+    print(f"Linear scan / code:  {scan_seconds * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Replay a query log against a food cache seeded with the common foods list and
+report how the lookups split into exact, canonical-only exact (hits that the
+lowercased text alone would have missed), fuzzy and missed, with the mean
+lookup time. The log is one query per line (--log), or a synthetic one: common
+foods typed with quantities, units, plurals, case and punctuation noise.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from benchmarks.corpus import FOODS
+
+QUANTITIES = ["", "", "", "1 ", "2 ", "a ", "half a cup of ", "2 cups of ", "100g ", "a bowl of ", "some "]
+
+
+def synthetic_log(queries, seed):
+    """Common foods as users type them"""
+    rng = random.Random(seed)
+    log = []
+    for _ in range(queries):
+        text = rng.choice(QUANTITIES) + rng.choice(FOODS)
+        if rng.random() < 0.3:
+            text = text.title()
+        if rng.random() < 0.1:
+            text += rng.choice(["!", ".", " ", ","])
+        log.append(text)
+    return log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log", type=Path, help="Query log, one query per line")
+    parser.add_argument("--queries", type=int, default=20000, help="Synthetic log length")
+    args = parser.parse_args()
+
+    from src.food_cache import FoodCache
+
+    log = [line.strip() for line in open(args.log) if line.strip()] if args.log else \
+        synthetic_log(args.queries, seed=0)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = FoodCache(str(Path(workdir) / "food_cache.db"))
+        cache.add_many_to_cache((food, food, None, str(i), 1.0) for i, food in enumerate(dict.fromkeys(FOODS)))
+        start = time.perf_counter()
+        for text in log:
+            cache.get_cached_result(text)
+        seconds = time.perf_counter() - start
+        stats = cache.stats()
+        cache.close()
+
+    lookups = len(log)
+    print(f"Queries: {lookups} ({len(set(log))} distinct), cached keys: {stats['size']}")
+    print(f"exact {stats['exact_hits'] / lookups:.1%} "
+          f"(canonical-only {stats['canonical_hit_ratio']:.1%}), "
+          f"fuzzy {stats['fuzzy_hits'] / lookups:.1%}, misses {stats['misses'] / lookups:.1%}, "
+          f"mean {seconds / lookups * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark query encoding latency of the torch reference encoder against the
+ONNX export (float32 and int8) at single-query and batched sizes, and with
+different onnxruntime thread counts. Needs the export from
+`scripts/build_indexes.py onnx`.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src import config
+from src.encoders import OnnxEncoder, SentenceTransformerEncoder
+
+QUERIES = ["peanut butter", "greek yogurt with honey", "whole wheat bread", "diet cola",
+           "chicken breast grilled", "oat milk barista", "dark chocolate 70%", "banana"]
+
+
+def time_per_query(encoder, batch_size, repeats):
+    texts = (QUERIES * (batch_size // len(QUERIES) + 1))[:batch_size]
+    encoder.encode(texts, batch_size=batch_size)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        encoder.encode(texts, batch_size=batch_size)
+    return (time.perf_counter() - start) / (repeats * batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--onnx-dir", type=Path, default=config.ONNX_ENCODER_DIR)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--skip-torch", action="store_true", help="Only time the ONNX encoders")
+    args = parser.parse_args()
+
+    encoders = []
+    if not args.skip_torch:
+        encoders.append(("torch float32", SentenceTransformerEncoder()))
+    for threads in args.threads:
+        encoders.append((f"onnx float32 x{threads}", OnnxEncoder(args.onnx_dir, quantized=False, threads=threads)))
+        encoders.append((f"onnx int8 x{threads}", OnnxEncoder(args.onnx_dir, quantized=True, threads=threads)))
+
+    print(f"{'encoder':<22}" + "".join(f"{f'batch {size}':>14}" for size in args.batch_sizes))
+    for name, encoder in encoders:
+        timings = [time_per_query(encoder, size, args.repeats) for size in args.batch_sizes]
+        print(f"{name:<22}" + "".join(f"{seconds * 1e3:>11.2f} ms" for seconds in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Stress FoodCache reads from a growing number of threads, with and without the
+in-memory hot tier, while a writer keeps adding items.
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.food_cache import FoodCache
+
+
+def run(cache, names, threads, seconds, with_writer):
+    """Return total reads per second across `threads` reader threads"""
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def reader(slot):
+        i = slot
+        while not stop.is_set():
+            cache.get_cached_result(names[i % len(names)])
+            counts[slot] += 1
+            i += threads
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            cache.add_to_cache(f"new food {i}", f"New Product {i}", {"fat": 1.0}, str(i), 0.9)
+            i += 1
+            time.sleep(0.001)
+
+    workers = [threading.Thread(target=reader, args=(slot,)) for slot in range(threads)]
+    if with_writer:
+        workers.append(threading.Thread(target=writer))
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--no-writer", action="store_true")
+    args = parser.parse_args()
+
+    names = [f"food item {i}" for i in range(args.items)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "food_cache.db")
+        seed = FoodCache(db_path)
+        seed.add_many_to_cache((name, f"Product {name}", {"fat": 1.0, "proteins": 2.0}, name, 0.9)
+                               for name in names)
+        seed.close()
+
+        for label, hot_items in (("hot tier", None), ("sqlite only", 0)):
+            print(f"\n{label}")
+            print(f"{'threads':>8} {'reads/s':>12}")
+            for threads in args.threads:
+                cache = FoodCache(db_path, hot_cache_max_items=hot_items, hot_cache_max_bytes=None)
+                reads = run(cache, names, threads, args.seconds, not args.no_writer)
+                cache.close()
+                print(f"{threads:>8} {reads:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark FoodCache fuzzy matching: linear process.extractOne over every cached
+name against the length/bigram pruned FuzzyIndex, at growing cache sizes.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from rapidfuzz import fuzz, process
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.fuzzy_index import FuzzyIndex
+
+FOODS = [line.strip().lower() for line in open(backend_root / "data" / "common_foods_list.txt") if line.strip()]
+MODIFIERS = ["organic", "low fat", "smoked", "fresh", "frozen", "sweet", "spicy", "whole", "light",
+             "roasted", "classic", "original", "unsalted", "creamy", "crunchy", "mini", "extra"]
+
+
+SYLLABLES = ["ka", "lo", "ver", "mi", "to", "san", "ra", "bel", "di", "no", "fre", "zu", "pol", "ex", "qui"]
+
+
+def make_brand(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def make_names(count, rng):
+    """Product-like names (brand, modifier, food) built from the common foods list"""
+    names = dict.fromkeys(FOODS[:count])
+    while len(names) < count:
+        parts = [make_brand(rng), rng.choice(MODIFIERS), rng.choice(FOODS)]
+        if rng.random() < 0.5:
+            parts.append(rng.choice(FOODS))
+        if rng.random() < 0.3:
+            parts.append(str(rng.randint(1, 999)))
+        names[" ".join(parts)] = None
+    return list(names)
+
+
+def make_queries(names, count, rng):
+    """Misspelled cached names plus unrelated text"""
+    queries = []
+    for _ in range(count):
+        chars = list(rng.choice(names))
+        position = rng.randrange(len(chars))
+        chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        queries.append("".join(chars))
+    queries += [f"unknown item {i}" for i in range(count // 4)]
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=85.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'names':>9} {'build s':>8} {'linear ms':>10} {'indexed ms':>11} {'candidates':>11} {'speedup':>8}")
+    for size in args.sizes:
+        names = make_names(size, rng)
+        queries = make_queries(names, args.queries, rng)
+
+        start = time.perf_counter()
+        index = FuzzyIndex(names)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [process.extractOne(q, names, scorer=fuzz.ratio, score_cutoff=args.threshold) for q in queries]
+        linear_ms = (time.perf_counter() - start) * 1e3 / len(queries)
+
+        start = time.perf_counter()
+        actual = [index.extract_one(q, score_cutoff=args.threshold) for q in queries]
+        indexed_ms = (time.perf_counter() - start) * 1e3 / len(queries)
+
+        assert actual == expected, "indexed results differ from linear scan"
+        mean_candidates = sum(len(index.candidates(q, args.threshold)) for q in queries) / len(queries)
+        print(f"{size:>9} {build_seconds:>8.2f} {linear_ms:>10.3f} {indexed_ms:>11.3f} "
+              f"{mean_candidates:>11.1f} {linear_ms / indexed_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark module import time with `python -X importtime`: how long importing
+the server (or any other module) takes before it can answer requests, and
+which imported modules dominate it.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+
+def import_times(module):
+    """
+    Import a module in a fresh interpreter and parse the -X importtime report.
+
+    Returns:
+        List of (cumulative microseconds, module name) for every imported module
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_root,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "FOODSCANNER_BACKGROUND_LOADING": "0"},
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr}")
+
+    times = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indent><module>"
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times.append((int(cumulative), name[1:].rstrip()))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=["src.server", "src.analysemacro"],
+                        help="Modules to import")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Number of slowest direct imports to list")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        times = import_times(module)
+        total = next(cumulative for cumulative, name in times if name == module)
+        print(f"import {module}: {total / 1e3:.1f} ms")
+        # Direct imports of the module: the lines one indentation level deeper
+        # printed right before it (importtime reports children before parents)
+        position = next(i for i, (_, name) in enumerate(times) if name == module)
+        children = []
+        for cumulative, name in reversed(times[:position]):
+            if not name.startswith(" "):
+                break
+            if not name.startswith("   "):
+                children.append((cumulative, name.strip()))
+        for cumulative, name in sorted(children, reverse=True)[:args.top]:
+            print(f"  {cumulative / 1e3:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
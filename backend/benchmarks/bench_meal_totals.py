@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare meal totals from the macro matrix (one gather and sum) with totals
+from decoding every portion's product row out of the product store, for
+meals and days of increasing size. Runs over a synthetic corpus unless
+--embeddings-dir points at the real one.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from benchmarks.corpus import build_corpus
+
+
+def decoded_totals(product_store, rows, grams):
+    """Per-item baseline: decode the product row and read its per-100g values"""
+    from src.macro_matrix import NUTRIENTS, macro_values
+
+    totals = np.zeros(len(NUTRIENTS))
+    for row, portion in zip(rows, grams):
+        totals += np.nan_to_num(macro_values(product_store.get_raw(int(row))[1])[0]) * portion / 100.0
+    return totals
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic corpus rows")
+    parser.add_argument("--embeddings-dir", type=Path, help="Real embeddings directory instead of a synthetic corpus")
+    parser.add_argument("--portions", type=int, nargs="+", default=[5, 20, 100, 256])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    from src.macro_matrix import MacroMatrix
+    from src.product_store import ProductStore
+
+    embeddings_dir = args.embeddings_dir or build_corpus(args.rows)
+    product_store = ProductStore(embeddings_dir / "product_store")
+    if not MacroMatrix.exists(embeddings_dir / "macro_matrix"):
+        MacroMatrix.build_from_store(product_store, embeddings_dir / "macro_matrix")
+    macro_matrix = MacroMatrix(embeddings_dir / "macro_matrix")
+
+    rng = np.random.default_rng(0)
+    print(f"Corpus: {embeddings_dir} ({len(product_store)} products)")
+    for portions in args.portions:
+        rows = rng.integers(len(product_store), size=portions)
+        grams = rng.uniform(10, 300, size=portions)
+        servings = np.zeros(portions)
+        expected, decoded = timed(lambda: decoded_totals(product_store, rows, grams), args.repeat)
+        (totals, _), vectorized = timed(lambda: macro_matrix.totals(rows, grams, servings), args.repeat)
+        assert np.allclose(totals, expected, rtol=1e-4)
+        print(f"{portions:>5} portions: decoded {decoded * 1e6:8.1f} us, matrix {vectorized * 1e6:6.1f} us "
+              f"({decoded / vectorized:.0f}x)")
+    product_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-row product access: HF Dataset column indexing (the old
+lookup() pattern) against the memory-mapped ProductStore.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.product_store import ProductStore
+
+
+def make_synthetic_dataset(rows):
+    """Build an in-memory dataset shaped like total_dataset"""
+    from datasets import Dataset
+
+    return Dataset.from_dict({
+        "product_name": [f"Product {i}" for i in range(rows)],
+        "nutriments": [[{"name": "energy-kcal", "100g": float(i % 900)}] for i in range(rows)],
+        "code": [f"{i:013d}" for i in range(rows)],
+    })
+
+
+def column_access(dataset, row):
+    """The access pattern lookup() used before the product store"""
+    product_name = dataset["product_name"][row]
+    nutriments_info = dataset["nutriments"][row][0] if dataset["nutriments"][row] else None
+    code = dataset["code"][row]
+    return product_name, nutriments_info, code
+
+
+def time_per_call(fn, rows):
+    start = time.perf_counter()
+    for row in rows:
+        fn(int(row))
+    return (time.perf_counter() - start) / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dataset", type=Path, default=backend_root / "embeddings" / "total_dataset",
+                        help="Path of a saved total_dataset")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Use a synthetic dataset with this many rows instead")
+    parser.add_argument("--samples", type=int, default=20,
+                        help="Random rows fetched with the column access pattern")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        dataset = make_synthetic_dataset(args.synthetic)
+    else:
+        from datasets import load_from_disk
+        dataset = load_from_disk(str(args.dataset))
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        start = time.perf_counter()
+        ProductStore.build_from_dataset(dataset, store_dir)
+        build_seconds = time.perf_counter() - start
+        store = ProductStore(store_dir)
+
+        rng = np.random.default_rng(0)
+        column_rows = rng.integers(0, len(dataset), size=args.samples)
+        store_rows = rng.integers(0, len(dataset), size=max(args.samples, 10000))
+
+        for row in column_rows[:3]:
+            assert column_access(dataset, int(row)) == store.get(int(row))
+
+        column_seconds = time_per_call(lambda row: column_access(dataset, row), column_rows)
+        store_seconds = time_per_call(store.get, store_rows)
+        store.close()
+
+    print(f"Rows:                 {len(dataset)}")
+    print(f"Store build:          {build_seconds:.2f}s")
+    print(f"Column access / row:  {column_seconds * 1e3:.3f} ms")
+    print(f"ProductStore / row:   {store_seconds * 1e6:.2f} µs")
+    print(f"Speedup:              {column_seconds / store_seconds:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark sharded exact search: single-query and batch latency of ShardedIndex
+for several thread counts against the unsharded EmbeddingIndex, over a
+synthetic normalized corpus, and check that both return the same rows.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.embedding_index import EmbeddingIndex
+from src.sharded_index import ShardedIndex
+
+
+def time_per_call(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, nargs="+", default=None,
+                        help="Thread counts to time (default: 1 up to the CPU count, doubling)")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=32, help="Queries per batch search")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    thread_counts = args.threads or sorted({1, *(2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus), cpus})
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        embeddings = np.lib.format.open_memmap(str(directory / "embeddings_only.npy"), mode="w+",
+                                               dtype=np.float32, shape=(args.rows, args.dim))
+        for start in range(0, args.rows, 65536):
+            stop = min(start + 65536, args.rows)
+            embeddings[start:stop] = rng.standard_normal((stop - start, args.dim), dtype=np.float32)
+        embeddings.flush()
+        del embeddings
+
+        exact = EmbeddingIndex(directory / "embeddings_only.npy")
+        build_start = time.perf_counter()
+        ShardedIndex.build(exact.embeddings, directory / "shards", n_shards=args.shards)
+        build_seconds = time.perf_counter() - build_start
+
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+        exact_single = time_per_call(lambda query: exact.search(query, k=1), queries)
+        exact_batch = time_per_call(lambda batch: exact.search(batch, k=1), batches)
+        _, expected = exact.search(queries, k=10)
+
+        print(f"Rows x dim:          {args.rows} x {args.dim}")
+        print(f"Shards:              {args.shards} (built in {build_seconds:.2f}s)")
+        print(f"Exact single query:  {exact_single * 1e3:.2f} ms")
+        print(f"Exact batch of {args.batch}:  {exact_batch * 1e3:.2f} ms")
+        for threads in thread_counts:
+            index = ShardedIndex(directory / "shards", threads=threads)
+            single = time_per_call(lambda query: index.search(query, k=1), queries)
+            batch = time_per_call(lambda batch: index.search(batch, k=1), batches)
+            _, found = index.search(queries, k=10)
+            index.close()
+            same = np.mean([set(a) == set(b) for a, b in zip(found, expected)])
+            print(f"{threads:>2} threads: single {single * 1e3:.2f} ms ({exact_single / single:.2f}x), "
+                  f"batch {batch * 1e3:.2f} ms ({exact_batch / batch:.2f}x), top-10 identical {same:.0%}")
+
+
+if __name__ == "__main__":
+    main()
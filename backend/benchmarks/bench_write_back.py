@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Replay a query log through lookup() under different write-back policies and
+report the food cache hit rate, semantic searches run, fuzzy index growth and
+mean latency for each. The log is one query per line (--log), or a synthetic
+one: Zipf-distributed repeats of popular food texts mixed with one-off noise.
+Runs over a synthetic corpus with the hash encoder unless --embeddings-dir
+and --encoder point at the real ones.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from benchmarks.corpus import FOODS, MODIFIERS, HashEncoder, build_corpus
+
+
+def synthetic_log(queries, popular, noise_ratio, seed):
+    """Zipf-distributed popular texts with a share of never-repeated noise"""
+    rng = random.Random(seed)
+    texts = sorted({f"{rng.choice(MODIFIERS)} {food}" for food in FOODS})
+    rng.shuffle(texts)
+    texts = texts[:popular]
+    weights = 1.0 / np.arange(1, len(texts) + 1)
+    picks = np.random.default_rng(seed).choice(len(texts), size=queries, p=weights / weights.sum())
+    log = []
+    for i, pick in enumerate(picks):
+        if rng.random() < noise_ratio:
+            log.append(f"{rng.choice(FOODS)} {rng.getrandbits(40):x}")
+        else:
+            log.append(texts[pick])
+    return log
+
+
+def replay(log, policy, workdir):
+    """Replay the log on an empty food cache; returns the policy's numbers"""
+    from src import food_lookup
+    from src.food_cache import FoodCache
+
+    food_cache = FoodCache(str(workdir / f"{policy[0]}.db"))
+    food_lookup.food_cache_component.factory = lambda: food_cache
+    food_lookup.food_cache_component.state = food_lookup.food_cache_component.PENDING
+    food_lookup.write_back_policy = policy[1]
+
+    searches = 0
+    original = food_lookup.semantic_search
+
+    def counting_search(texts, encode_batch_size=32):
+        nonlocal searches
+        searches += len(texts)
+        return original(texts, encode_batch_size)
+
+    food_lookup.semantic_search = counting_search
+    start = time.perf_counter()
+    for text in log:
+        food_lookup.lookup(text)
+    seconds = time.perf_counter() - start
+    food_lookup.semantic_search = original
+
+    stats = food_cache.stats()
+    food_cache.close()
+    return {
+        "hit_ratio": stats["hit_ratio"],
+        "searches": searches,
+        "cached_names": stats["size"],
+        "mean_ms": seconds / len(log) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log", type=Path, help="Query log, one query per line")
+    parser.add_argument("--queries", type=int, default=20000, help="Synthetic log length")
+    parser.add_argument("--popular", type=int, default=2000, help="Distinct popular texts in the synthetic log")
+    parser.add_argument("--noise", type=float, default=0.2, help="Share of one-off queries in the synthetic log")
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic corpus rows")
+    parser.add_argument("--embeddings-dir", type=Path, help="Real embeddings directory instead of a synthetic corpus")
+    parser.add_argument("--encoder", default="hash", choices=["hash", "torch", "onnx"])
+    parser.add_argument("--min-score", type=float, default=None,
+                        help="Write-back threshold (default: 0 for the hash encoder, whose "
+                             "random embeddings never reach the configured one, else config)")
+    args = parser.parse_args()
+
+    from src import config, food_lookup
+    from src.encoders import load_encoder
+    from src.write_back import WriteBackPolicy
+
+    embeddings_dir = args.embeddings_dir or build_corpus(args.rows)
+    food_lookup.embeddings_dir = embeddings_dir
+    food_lookup.config.EMBEDDINGS_DIR = embeddings_dir
+    if args.encoder == "hash":
+        food_lookup.model_component.factory = lambda: HashEncoder(384)
+    else:
+        food_lookup.model_component.factory = lambda: load_encoder(args.encoder, onnx_dir=config.ONNX_ENCODER_DIR)
+    food_lookup.semantic_batcher = None
+    for component in food_lookup._semantic_components:
+        component.get()
+
+    log = [line.strip() for line in open(args.log) if line.strip()] if args.log else \
+        synthetic_log(args.queries, args.popular, args.noise, seed=0)
+    min_score = args.min_score if args.min_score is not None else \
+        (0.0 if args.encoder == "hash" else config.WRITE_BACK_MIN_SCORE)
+    policies = [
+        ("off", WriteBackPolicy(write_back=False)),
+        ("admit-1", WriteBackPolicy(min_score=min_score, admit_after=1)),
+        ("admit-2", WriteBackPolicy(min_score=min_score, admit_after=2)),
+        ("admit-3", WriteBackPolicy(min_score=min_score, admit_after=3)),
+    ]
+
+    print(f"Queries: {len(log)} ({len(set(log))} distinct), corpus: {embeddings_dir}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, policy in policies:
+            result = replay(log, (name, policy), Path(workdir))
+            print(f"{name:>8}: hit ratio {result['hit_ratio']:.1%}, semantic searches {result['searches']}, "
+                  f"cached names {result['cached_names']}, mean {result['mean_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Synthetic corpus fixtures for benchmarks.
+A corpus directory has the same layout as embeddings/: random L2-normalized
+embeddings_only.npy plus a total_dataset Arrow dataset with product_name,
+nutriments and code columns. Corpora are deterministic for a (rows, dim,
+seed) triple and cached on disk, so runs on different commits use identical
+data.
+"""
+
+import hashlib
+import json
+import random
+import shutil
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+backend_root = Path(__file__).parent.parent
+
+# Generated corpora are cached here (ignored by git)
+CORPORA_DIR = Path(__file__).parent / ".corpora"
+
+FOODS = [line.strip().lower() for line in open(backend_root / "data" / "common_foods_list.txt") if line.strip()]
+MODIFIERS = ["organic", "low fat", "smoked", "fresh", "frozen", "sweet", "spicy", "whole", "light",
+             "roasted", "classic", "original", "unsalted", "creamy", "crunchy", "mini", "extra"]
+SYLLABLES = ["ka", "lo", "ver", "mi", "to", "san", "ra", "bel", "di", "no", "fre", "zu", "pol", "ex", "qui"]
+
+# Rows generated per chunk, bounding memory for the 1M-row corpus
+_CHUNK_ROWS = 100000
+
+
+def product_names(count: int, seed: int = 0) -> List[str]:
+    """Product-like names (brand, modifier, food); duplicates occur as in the real corpus"""
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        brand = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+        parts = [brand, rng.choice(MODIFIERS), rng.choice(FOODS)]
+        if rng.random() < 0.3:
+            parts.append(str(rng.randint(1, 999)))
+        names.append(" ".join(parts))
+    return names
+
+
+def nutriments(row: int) -> list:
+    """Nutriments list shaped like the dataset's (a list of per-100g dicts)"""
+    return [{
+        "energy-kcal_100g": float(row % 900),
+        "proteins_100g": float(row % 40),
+        "carbohydrates_100g": float(row % 80),
+        "fat_100g": float(row % 60),
+    }]
+
+
+def corpus_dir(rows: int, dim: int = 384, seed: int = 0) -> Path:
+    return CORPORA_DIR / f"rows{rows}-dim{dim}-seed{seed}"
+
+
+def build_corpus(rows: int, dim: int = 384, seed: int = 0, directory: Optional[Path] = None,
+                 force: bool = False) -> Path:
+    """
+    Generate (or reuse) a synthetic corpus.
+
+    Args:
+        rows: Number of products
+        dim: Embedding dimension (384 for all-MiniLM-L6-v2)
+        seed: Random seed
+        directory: Destination. Defaults to a cached directory per (rows, dim, seed)
+        force: Regenerate even if a complete corpus exists
+
+    Returns:
+        The corpus directory, usable as FOODSCANNER_EMBEDDINGS_DIR
+    """
+    from datasets import Dataset, concatenate_datasets
+
+    directory = Path(directory) if directory is not None else corpus_dir(rows, dim, seed)
+    manifest_path = directory / "corpus.json"
+    manifest = {"rows": rows, "dim": dim, "seed": seed}
+    if not force and manifest_path.exists() and json.loads(manifest_path.read_text()) == manifest:
+        return directory
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+
+    rng = np.random.default_rng(seed)
+    embeddings = np.lib.format.open_memmap(directory / "embeddings_only.npy", mode="w+",
+                                           dtype=np.float32, shape=(rows, dim))
+    parts = []
+    for start in range(0, rows, _CHUNK_ROWS):
+        end = min(start + _CHUNK_ROWS, rows)
+        chunk = rng.standard_normal((end - start, dim), dtype=np.float32)
+        chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+        embeddings[start:end] = chunk
+        parts.append(Dataset.from_dict({
+            "product_name": product_names(end - start, seed=seed * 1000003 + start),
+            "nutriments": [nutriments(row) for row in range(start, end)],
+            # EAN-13-like codes, unique per row
+            "code": [f"{2000000000000 + row:013d}" for row in range(start, end)],
+        }))
+    embeddings.flush()
+    del embeddings
+    concatenate_datasets(parts).save_to_disk(str(directory / "total_dataset"))
+    manifest_path.write_text(json.dumps(manifest))
+    return directory
+
+
+class HashEncoder:
+    """
+    Stand-in query encoder: a deterministic random unit vector per text.
+
+    Lets the lookup path run end to end without the model; encode cost is
+    then negligible, so semantic-miss timings measure search and bookkeeping.
+    """
+
+    name = "hash"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size: int = 32) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+            vectors[i] = np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Reproducible lookup benchmark suite over synthetic corpora.
+
+For each corpus size it measures lookup() latency for exact cache hits, fuzzy
+cache hits and semantic misses, FoodCache insert throughput, and /food_lookup
+end to end through the Flask test client. Each size runs in a fresh
+interpreter pointed at its corpus. Results are written as JSON tagged with
+the git commit, and --compare prints the change against an earlier result.
+
+    python -m benchmarks.run_suite --sizes 10000 100000 1000000 --output results.json
+    python -m benchmarks.run_suite --sizes 10000 --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from benchmarks.corpus import HashEncoder, build_corpus
+
+
+def summarize(seconds):
+    """Latency distribution of per-call timings, in microseconds"""
+    micros = np.asarray(seconds) * 1e6
+    return {
+        "n": len(micros),
+        "mean_us": float(micros.mean()),
+        "p50_us": float(np.percentile(micros, 50)),
+        "p95_us": float(np.percentile(micros, 95)),
+        "p99_us": float(np.percentile(micros, 99)),
+    }
+
+
+def time_calls(fn, items):
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def misspell(name, rng):
+    """Replace one character, keeping the name well above the fuzzy threshold"""
+    chars = list(name)
+    position = rng.randrange(len(chars))
+    chars[position] = "z" if chars[position] != "z" else "q"
+    return "".join(chars)
+
+
+def unknown_text(rng):
+    """Text that matches nothing in the cache"""
+    return "".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(24))
+
+
+def run_worker(args):
+    """Benchmark one corpus size in this process; prints a JSON result"""
+    from src import food_lookup
+    from src import analysemacro
+    from src.encoders import load_encoder
+    from src.food_cache import FoodCache
+    from src.product_cache import ProductCache
+    from src.product_store import ProductStore
+    from src.server import app
+
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="foodscanner-bench-"))
+    food_lookup.food_cache_component.factory = lambda: FoodCache(str(workdir / "food_cache.db"))
+    if args.encoder == "hash":
+        food_lookup.model_component.factory = lambda: HashEncoder(args.dim)
+    else:
+        food_lookup.model_component.factory = lambda: load_encoder(args.encoder, onnx_dir=food_lookup.config.ONNX_ENCODER_DIR)
+    # Macro lookups see an empty local product cache and never reach the network
+    analysemacro._product_cache = ProductCache(lambda code: None, db_path=str(workdir / "off_products.db"))
+
+    result = {"load_seconds": {}}
+    for component in food_lookup.components:
+        component.get()
+        result["load_seconds"][component.name] = component.load_seconds
+
+    # Seed the food cache with corpus products, as a warmed cache would be
+    product_store: ProductStore = food_lookup.product_store_component.get()
+    rows = rng.sample(range(len(product_store)), min(args.cached, len(product_store)))
+    food_cache = food_lookup.get_food_cache()
+    cached = {}
+    for row in rows:
+        product_name, nutriments_info, code = product_store.get(row)
+        cached.setdefault(product_name.lower(), (product_name, nutriments_info, code))
+    food_cache.add_many_to_cache([(name, *value[:3], 1.0) for name, value in cached.items()])
+    names = list(cached)
+
+    exact = [rng.choice(names) for _ in range(args.queries)]
+    fuzzy = [misspell(rng.choice(names), rng) for _ in range(args.queries)]
+    misses = [unknown_text(rng) for _ in range(args.misses)]
+    result["lookup_exact_hit"] = time_calls(food_lookup.lookup, exact)
+    result["lookup_fuzzy_hit"] = time_calls(food_lookup.lookup, fuzzy)
+    result["lookup_semantic_miss"] = time_calls(food_lookup.lookup, misses)
+    result["food_cache_stats"] = {key: value for key, value in food_cache.stats().items() if key != "hot_tier"}
+
+    # Insert throughput on a fresh database
+    inserts = [(f"{unknown_text(rng)} {i}", "Product", {"energy-kcal_100g": 1.0}, f"{i:013d}", 0.9)
+               for i in range(args.inserts)]
+    single_cache = FoodCache(str(workdir / "insert_single.db"))
+    start = time.perf_counter()
+    for item in inserts[:args.inserts // 10]:
+        single_cache.add_to_cache(*item)
+    single_seconds = time.perf_counter() - start
+    batch_cache = FoodCache(str(workdir / "insert_batch.db"))
+    start = time.perf_counter()
+    for i in range(0, len(inserts), 500):
+        batch_cache.add_many_to_cache(inserts[i:i + 500])
+    batch_seconds = time.perf_counter() - start
+    result["food_cache_insert"] = {
+        "single_per_second": (args.inserts // 10) / single_seconds,
+        "batched_per_second": len(inserts) / batch_seconds,
+    }
+    single_cache.close()
+    batch_cache.close()
+
+    # End to end through Flask routing, JSON parsing and serialization
+    client = app.test_client()
+    post = lambda text: client.post("/food_lookup", json={"food_text": text})
+    result["http_exact_hit"] = time_calls(post, exact[:args.http_queries])
+    result["http_semantic_miss"] = time_calls(post, [unknown_text(rng) for _ in range(args.http_queries)])
+
+    food_cache.close()
+    print(json.dumps(result))
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=backend_root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=backend_root,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(current, baseline_path):
+    """Print p50 latency and throughput changes against an earlier result file"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"Compared with {baseline['meta'].get('commit')} ({baseline_path})")
+    print(f"{'rows':>9} {'metric':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for rows, result in current["results"].items():
+        old = baseline["results"].get(rows)
+        if old is None:
+            continue
+        for metric, value in result.items():
+            if metric not in old:
+                continue
+            if isinstance(value, dict) and "p50_us" in value:
+                pairs = [(f"{metric} p50 us", old[metric]["p50_us"], value["p50_us"])]
+            elif metric == "food_cache_insert":
+                pairs = [(f"{metric} {key}", old[metric][key], value[key]) for key in value]
+            else:
+                continue
+            for name, before, after in pairs:
+                change = (after - before) / before * 100 if before else float("nan")
+                print(f"{rows:>9} {name:<32} {before:>12.1f} {after:>12.1f} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--encoder", choices=["hash", "torch", "onnx"], default="hash",
+                        help="Query encoder; 'hash' needs no model and isolates search cost")
+    parser.add_argument("--index-mode", default="exact", help="FOODSCANNER_INDEX_MODE for the run")
+    parser.add_argument("--microbatch", action="store_true",
+                        help="Keep micro-batching on (adds its wait window to sequential misses)")
+    parser.add_argument("--cached", type=int, default=5000, help="Products seeded into the food cache")
+    parser.add_argument("--queries", type=int, default=2000, help="Exact and fuzzy hit lookups")
+    parser.add_argument("--misses", type=int, default=200, help="Semantic-miss lookups")
+    parser.add_argument("--inserts", type=int, default=20000, help="Rows inserted for throughput")
+    parser.add_argument("--http-queries", type=int, default=200)
+    parser.add_argument("--output", type=Path, help="Write the JSON result here")
+    parser.add_argument("--compare", type=Path, help="Earlier JSON result to compare against")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args)
+        return
+
+    commit, dirty = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: str(value) for key, value in vars(args).items() if key not in ("output", "compare", "worker")},
+        },
+        "results": {},
+    }
+    for rows in args.sizes:
+        directory = build_corpus(rows, dim=args.dim, seed=args.seed)
+        env = {
+            **os.environ,
+            "FOODSCANNER_EMBEDDINGS_DIR": str(directory),
+            "FOODSCANNER_INDEX_MODE": args.index_mode,
+            "FOODSCANNER_BACKGROUND_LOADING": "0",
+            "FOODSCANNER_MICROBATCH": "1" if args.microbatch else "0",
+            "FOODSCANNER_EMBEDDING_CACHE_PERSIST": "0",
+        }
+        command = [sys.executable, "-m", "benchmarks.run_suite", "--worker", str(rows)]
+        command += [arg for arg in sys.argv[1:] if arg != "--worker"]
+        completed = subprocess.run(command, cwd=backend_root, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Benchmark for {rows} rows failed:\n{completed.stderr}")
+        # The worker's JSON is its last output line; earlier lines are server logging
+        report["results"][str(rows)] = json.loads(completed.stdout.strip().splitlines()[-1])
+        exact = report["results"][str(rows)]
+        print(f"{rows:>9} rows: exact {exact['lookup_exact_hit']['p50_us']:.0f} us, "
+              f"fuzzy {exact['lookup_fuzzy_hit']['p50_us']:.0f} us, "
+              f"miss {exact['lookup_semantic_miss']['p50_us']:.0f} us (p50)", file=sys.stderr)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
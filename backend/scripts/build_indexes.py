@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Build the offline lookup artifacts that live next to embeddings_only.npy.
+Each subcommand builds one artifact from the embeddings/ directory.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src import config
+
+
+def build_product_store(args):
+    """Pack the total dataset into a row-addressable product store"""
+    from datasets import load_from_disk
+    from src.product_store import ProductStore
+
+    dataset = load_from_disk(str(args.embeddings_dir / "total_dataset"))
+    rows = ProductStore.build_from_dataset(dataset, args.embeddings_dir / "product_store",
+                                           batch_size=args.batch_size)
+    return f"{rows} products"
+
+
+def build_barcodes(args):
+    """Index the product store by barcode"""
+    from src.barcode_index import BarcodeIndex
+    from src.product_store import ProductStore
+
+    product_store = ProductStore(args.embeddings_dir / "product_store")
+    codes = BarcodeIndex.build_from_store(product_store, args.embeddings_dir / "barcode_index")
+    return f"{codes} barcodes over {len(product_store)} products"
+
+
+def build_macros(args):
+    """Extract the key nutrients of every product into the macro matrix"""
+    from src.macro_matrix import MacroMatrix
+    from src.product_store import ProductStore
+
+    product_store = ProductStore(args.embeddings_dir / "product_store")
+    covered = MacroMatrix.build_from_store(product_store, args.embeddings_dir / "macro_matrix")
+    return f"{covered} of {len(product_store)} products with nutrients"
+
+
+def build_ann(args):
+    """Build an approximate nearest-neighbour index and report its recall"""
+    import numpy as np
+    from src.ann_index import HNSW_FILE, IVF_DIR, HnswIndex, IVFIndex, evaluate_recall
+    from src.embedding_index import EmbeddingIndex
+
+    exact_index = EmbeddingIndex(args.embeddings_dir / "embeddings_only.npy")
+    if args.backend == "ivf":
+        IVFIndex.build(exact_index.embeddings, args.embeddings_dir / IVF_DIR, n_lists=args.n_lists)
+        index = IVFIndex(args.embeddings_dir / IVF_DIR, nprobe=args.nprobe)
+    else:
+        HnswIndex.build(exact_index.embeddings, args.embeddings_dir / HNSW_FILE)
+        index = HnswIndex(args.embeddings_dir / HNSW_FILE, dim=exact_index.dim, ef=args.ef)
+
+    # Perturbed corpus rows stand in for encoded queries
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(exact_index), size=min(args.queries, len(exact_index)), replace=False)
+    queries = np.asarray(exact_index.embeddings[np.sort(sample)], dtype=np.float32)
+    queries += rng.normal(scale=args.noise, size=queries.shape).astype(np.float32)
+    recall = evaluate_recall(index, exact_index, queries, k_values=(1, 10))
+    return ", ".join(f"{name}={value:.3f}" for name, value in recall.items())
+
+
+def build_shards(args):
+    """Split the normalized embeddings into row-range shards for parallel exact search"""
+    import numpy as np
+    from src.embedding_index import EmbeddingIndex
+    from src.sharded_index import SHARD_DIR, ShardedIndex
+
+    exact_index = EmbeddingIndex(args.embeddings_dir / "embeddings_only.npy")
+    n_shards = ShardedIndex.build(exact_index.embeddings, args.embeddings_dir / SHARD_DIR,
+                                  n_shards=args.shards)
+    index = ShardedIndex(args.embeddings_dir / SHARD_DIR, threads=args.threads)
+
+    # Sharded search is exact: check it returns the same rows on sampled queries
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(exact_index), size=min(args.queries, len(exact_index)), replace=False)
+    queries = np.asarray(exact_index.embeddings[np.sort(sample)], dtype=np.float32)
+    queries += rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+    expected, _ = exact_index.search(queries, k=10)
+    scores, _ = index.search(queries, k=10)
+    mismatches = int(np.sum(~np.isclose(scores, expected, atol=1e-5).all(axis=1)))
+    return f"{n_shards} shards over {len(exact_index)} rows, {mismatches}/{len(queries)} queries differ from exact"
+
+
+def build_onnx(args):
+    """Export the query encoder to ONNX and validate it against the torch encoder"""
+    import numpy as np
+    from src.encoders import OnnxEncoder, SentenceTransformerEncoder, compare_encoders, export_onnx
+    from src.embedding_index import EmbeddingIndex
+    from src.product_store import ProductStore
+
+    export_onnx(args.output_dir, quantize=not args.no_quantize)
+
+    # Product names sampled from the corpus stand in for queries
+    product_store = ProductStore(args.embeddings_dir / "product_store")
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(product_store), size=min(args.queries, len(product_store)), replace=False)
+    texts = [str(product_store.get(int(row))[0]) for row in rows]
+    search_index = EmbeddingIndex(args.embeddings_dir / "embeddings_only.npy")
+
+    reference = SentenceTransformerEncoder()
+    reports = []
+    for quantized in ([False] if args.no_quantize else [False, True]):
+        candidate = OnnxEncoder(args.output_dir, quantized=quantized, threads=args.threads)
+        agreement = compare_encoders(reference, candidate, texts, search_index)
+        reports.append(candidate.name + ": " + ", ".join(f"{name}={value:.4f}" for name, value in agreement.items()))
+    return "; ".join(reports)
+
+
+def main():
+    """Parse arguments and run the selected build step"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--embeddings-dir", type=Path, default=config.EMBEDDINGS_DIR,
+                        help="Directory holding embeddings_only.npy and total_dataset")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    product_store = subparsers.add_parser("product-store", help="Build the product store")
+    product_store.add_argument("--batch-size", type=int, default=10000)
+    product_store.set_defaults(func=build_product_store)
+
+    barcodes = subparsers.add_parser("barcodes", help="Build the barcode index (needs the product store)")
+    barcodes.set_defaults(func=build_barcodes)
+
+    macros = subparsers.add_parser("macros", help="Build the macro-nutrient matrix (needs the product store)")
+    macros.set_defaults(func=build_macros)
+
+    onnx = subparsers.add_parser("onnx", help="Export the query encoder to ONNX and report agreement with torch")
+    onnx.add_argument("--output-dir", type=Path, default=config.ONNX_ENCODER_DIR)
+    onnx.add_argument("--no-quantize", action="store_true", help="Skip the int8 model")
+    onnx.add_argument("--threads", type=int, default=config.ONNX_THREADS)
+    onnx.add_argument("--queries", type=int, default=2000, help="Corpus product names used for validation")
+    onnx.set_defaults(func=build_onnx)
+
+    ann = subparsers.add_parser("ann", help="Build an ANN index and report recall against exact search")
+    ann.add_argument("--backend", choices=["ivf", "hnsw"], default="ivf")
+    ann.add_argument("--n-lists", type=int, default=None, help="IVF lists (default 4*sqrt(rows))")
+    ann.add_argument("--nprobe", type=int, default=config.IVF_NPROBE)
+    ann.add_argument("--ef", type=int, default=config.HNSW_EF)
+    ann.add_argument("--queries", type=int, default=1000, help="Queries used to measure recall")
+    ann.add_argument("--noise", type=float, default=0.02, help="Noise added to sampled query rows")
+    ann.set_defaults(func=build_ann)
+
+    shards = subparsers.add_parser("shards", help="Split the embeddings into shards for parallel exact search")
+    shards.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="Number of shards (default: CPUs)")
+    shards.add_argument("--threads", type=int, default=config.SEARCH_THREADS)
+    shards.add_argument("--queries", type=int, default=200, help="Queries checked against exact search")
+    shards.set_defaults(func=build_shards)
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    summary = args.func(args)
+    print(f"✅ {args.command}: {summary} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
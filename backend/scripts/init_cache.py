@@ -1,61 +1,192 @@
 #!/usr/bin/env python3
 """
 Initialize and build the food cache database.
-This script generates the common foods list and populates the cache.
+Streams food names from data/common_foods_list.json (or .txt), resolves them in
+large batches with one encode and one vectorized top-1 search per batch, and
+bulk-loads the results into the food cache. Progress is checkpointed so an
+interrupted warm-up resumes where it stopped.
 """
 
-import subprocess
+import argparse
+import json
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 
-def run_script(script_name, description):
-    """Run a Python script and handle errors"""
-    print(f"\n{'='*60}")
-    print(f"{description}")
-    print(f"{'='*60}\n")
-    
-    # Scripts are in the same directory
-    script_path = Path(__file__).parent / script_name
-    
-    if not script_path.exists():
-        print(f"❌ Error: {script_name} not found!")
-        return False
-    
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+DEFAULT_SOURCE = backend_root / "data" / "common_foods_list.json"
+DEFAULT_CHECKPOINT = backend_root / "cache" / "warmup_checkpoint.json"
+
+
+def iter_names(path, chunk_size=1 << 16):
+    """
+    Stream food names from a .txt file (one per line) or a .json array of strings.
+
+    The JSON array is decoded incrementally, so the file is never loaded whole.
+    """
+    path = Path(path)
+    if path.suffix != ".json":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                name, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = not more
+                buffer += more
+                continue
+            buffer = buffer[end:]
+            if isinstance(name, str) and name.strip():
+                yield name.strip()
+
+
+def load_checkpoint(checkpoint_path, source):
+    """Number of names already processed for this source, or 0"""
     try:
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            check=True,
-            capture_output=False
-        )
-        print(f"\n✅ {description} completed successfully!")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ Error running {script_name}: {e}")
-        return False
-    except Exception as e:
-        print(f"\n❌ Unexpected error: {e}")
-        return False
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    stat = Path(source).stat()
+    if checkpoint.get("source") != str(source) or checkpoint.get("size") != stat.st_size \
+            or checkpoint.get("mtime") != stat.st_mtime:
+        print("⚠️  Checkpoint belongs to a different source file, starting over")
+        return 0
+    return int(checkpoint.get("processed", 0))
+
+
+def save_checkpoint(checkpoint_path, source, processed):
+    """Atomically record how many names have been committed to the cache"""
+    stat = Path(source).stat()
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = checkpoint_path.with_name(checkpoint_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"source": str(source), "size": stat.st_size, "mtime": stat.st_mtime,
+                   "processed": processed}, f)
+    tmp_path.replace(checkpoint_path)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def warm_cache(source, checkpoint_path, batch_size=1024, encode_batch_size=128,
+               min_similarity=0.0, limit=None, restart=False):
+    """
+    Resolve every name in source and bulk-load the results into the food cache.
+
+    Encoding of the next batch overlaps with the database write of the previous
+    one, which runs on a single background writer thread.
+
+    Returns:
+        Tuple of (names processed, items written)
+    """
+    from src.food_lookup import get_food_cache, semantic_search
+    food_cache = get_food_cache()
+
+    skip = 0 if restart else load_checkpoint(checkpoint_path, source)
+    if skip:
+        print(f"↪️  Resuming after {skip} already processed names")
+
+    names = islice(iter_names(source), skip, None if limit is None else skip + limit)
+    processed = skip
+    written = 0
+    start = time.perf_counter()
+
+    def commit(items, processed_after):
+        food_cache.add_many_to_cache(items)
+        # Write-behind buffers the rows; the checkpoint must not claim them before they are on disk
+        food_cache.flush()
+        save_checkpoint(checkpoint_path, source, processed_after)
+        return len(items)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer") as writer:
+        pending = None
+        for batch in batched(names, batch_size):
+            # Deduplicate and skip names that are already cached exactly
+            todo = [name for name in dict.fromkeys(batch) if not food_cache.has_exact(name)]
+            results = semantic_search(todo, encode_batch_size=encode_batch_size) if todo else []
+            items = [
+                (name, product_name, nutriments_info, code, similarity_score)
+                for name, (product_name, nutriments_info, similarity_score, code) in zip(todo, results)
+                if product_name is not None and similarity_score >= min_similarity
+            ]
+
+            if pending is not None:
+                written += pending.result()
+            processed += len(batch)
+            pending = writer.submit(commit, items, processed)
+
+            elapsed = time.perf_counter() - start
+            print(f"  {processed} names processed, {written} written, "
+                  f"{(processed - skip) / elapsed:.0f} names/s")
+        if pending is not None:
+            written += pending.result()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nProcessed {processed - skip} names in {elapsed:.1f}s "
+          f"({(processed - skip) / max(elapsed, 1e-9):.0f} names/s), wrote {written} cache entries")
+    return processed, written
+
 
 def main():
     """Main initialization function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE,
+                        help="Food names as a JSON array of strings or a text file with one name per line")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--batch-size", type=int, default=1024, help="Names resolved per transaction")
+    parser.add_argument("--encode-batch-size", type=int, default=128, help="Batch size inside model.encode")
+    parser.add_argument("--min-similarity", type=float, default=0.0,
+                        help="Skip matches below this cosine similarity")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many names")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
     print("="*60)
     print("Food Cache Initialization")
     print("="*60)
-    print("\nThis script will:")
-    print("  1. Generate the common foods list (1000 foods)")
-    print("  2. Build the cache database from the list")
-    print("\nThis may take several minutes...")
-    
-    # Step 1: Generate common foods list
-    if not run_script("generate_common_foods.py", "Step 1: Generating common foods list"):
-        print("\n❌ Failed to generate common foods list. Exiting.")
-        sys.exit(1)
-    
-    # Step 2: Build cache
-    if not run_script("build_cache.py", "Step 2: Building cache database"):
-        print("\n❌ Failed to build cache. Exiting.")
+    print(f"\nSource: {args.source}")
+    print("Loading model and embeddings...")
+
+    try:
+        warm_cache(args.source, args.checkpoint, batch_size=args.batch_size,
+                   encode_batch_size=args.encode_batch_size, min_similarity=args.min_similarity,
+                   limit=args.limit, restart=args.restart)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted, rerun to resume from the last checkpoint")
         sys.exit(1)
-    
+
+    if args.limit is None:
+        args.checkpoint.unlink(missing_ok=True)
+
     print("\n" + "="*60)
     print("✅ Cache initialization complete!")
     print("="*60)
@@ -64,5 +195,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
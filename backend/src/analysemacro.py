@@ -1,13 +1,58 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
-import torch
-import openfoodfacts
+import atexit
+import threading
+from src import config
+from src.metrics import REGISTRY
+from src.product_cache import OpenFoodFactsClient, ProductCache
 
-api = openfoodfacts.API(user_agent="MyAwesomeApp/1.0")
+# The Open Food Facts product cache is created on first use so importing this
+# module (and the server) does not pay for it
+_product_cache = None
+_product_cache_lock = threading.Lock()
 
-def analyse_macro(code):
-    product =  api.product.get(code)
-    return product
+def get_product_cache():
+    """The process-wide Open Food Facts product cache"""
+    global _product_cache
+    if _product_cache is None:
+        with _product_cache_lock:
+            if _product_cache is None:
+                client = OpenFoodFactsClient(config.OFF_API_URL, timeout=config.OFF_FETCH_TIMEOUT)
+                _product_cache = ProductCache(client.get_product,
+                                              db_path=config.OFF_CACHE_DB,
+                                              ttl=config.OFF_CACHE_TTL,
+                                              negative_ttl=config.OFF_NEGATIVE_TTL,
+                                              max_workers=config.OFF_FETCH_WORKERS)
+                atexit.register(_product_cache.close)
+    return _product_cache
 
+def analyse_macro(code, timeout=None):
+    """
+    Open Food Facts product for a barcode, served from the local product cache.
+    
+    Args:
+        code (str): Product barcode
+        timeout (float): Seconds to wait for a remote fetch; 0 returns only what
+            is cached and fetches in the background. Defaults to the HTTP timeout
+        
+    Returns:
+        dict: The product, or None if unknown or not available in time
+    """
+    if timeout is None:
+        timeout = config.OFF_FETCH_TIMEOUT
+    return get_product_cache().get(code, timeout=timeout)
 
+def prefetch_products(codes):
+    """Fetch products for the given barcodes in the background"""
+    if config.OFF_PREFETCH:
+        get_product_cache().prefetch(codes)
+
+def _metric_samples():
+    """Product cache statistics sampled at every /metrics scrape"""
+    if _product_cache is None:
+        return
+    stats = _product_cache.stats()
+    yield "foodscanner_product_cache_hit_ratio", "Open Food Facts product cache hit ratio", "gauge", stats["hit_ratio"]
+    yield "foodscanner_product_cache_fetches_total", "Open Food Facts fetches started", "counter", stats["fetches"]
+    yield "foodscanner_product_cache_fetch_errors_total", "Failed Open Food Facts fetches", "counter", stats["fetch_errors"]
+    yield "foodscanner_product_cache_inflight", "Open Food Facts fetches in flight", "gauge", stats["inflight"]
+
+REGISTRY.add_collector(_metric_samples)
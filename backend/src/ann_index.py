@@ -0,0 +1,267 @@
+"""
+Approximate nearest-neighbour indexes for semantic search.
+Both backends are built offline next to embeddings_only.npy and expose the same
+search(queries, k) -> (scores, indices) interface as EmbeddingIndex, which stays
+the exact reference.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from src.embedding_index import EmbeddingIndex, top_k
+
+IVF_DIR = "ivf_index"
+HNSW_FILE = "hnsw_index.bin"
+INDEX_MODES = ("exact", "sharded", "ivf", "hnsw")
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means lists scanned with exact dot products"""
+
+    def __init__(self, index_dir: Union[str, Path], nprobe: int = 16):
+        """
+        Open an IVF index built with IVFIndex.build.
+
+        Args:
+            index_dir: Directory containing the index arrays
+            nprobe: Number of lists scanned per query
+        """
+        self.index_dir = Path(index_dir)
+        self.nprobe = nprobe
+        self.centroids = np.load(str(self.index_dir / "centroids.npy"))
+        self.list_offsets = np.load(str(self.index_dir / "list_offsets.npy"))
+        self.row_ids = np.load(str(self.index_dir / "row_ids.npy"), mmap_mode="r")
+        self.vectors = np.load(str(self.index_dir / "vectors.npy"), mmap_mode="r")
+
+    @staticmethod
+    def exists(index_dir: Union[str, Path]) -> bool:
+        """Check whether a complete index exists in the directory"""
+        return (Path(index_dir) / "meta.json").exists()
+
+    @staticmethod
+    def build(embeddings: np.ndarray, index_dir: Union[str, Path], n_lists: Optional[int] = None,
+              iterations: int = 10, sample_size: int = 200000, chunk_size: int = 65536,
+              seed: int = 0) -> int:
+        """
+        Cluster normalized embeddings and write the inverted lists.
+
+        Args:
+            embeddings: L2-normalized embedding matrix (rows x dim), may be memory-mapped
+            index_dir: Destination directory
+            n_lists: Number of clusters. Defaults to 4 * sqrt(rows)
+            iterations: k-means iterations over the training sample
+            sample_size: Number of rows used to train the centroids
+            chunk_size: Number of rows assigned to clusters at a time
+            seed: Random seed for sampling and initialization
+
+        Returns:
+            Number of lists written
+        """
+        rows = embeddings.shape[0]
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(rows)))
+        n_lists = min(n_lists, rows)
+
+        rng = np.random.default_rng(seed)
+        sample_ids = np.sort(rng.choice(rows, size=min(sample_size, rows), replace=False))
+        sample = np.asarray(embeddings[sample_ids], dtype=np.float32)
+        centroids = _spherical_kmeans(sample, n_lists, iterations, rng)
+
+        assignments = np.empty(rows, dtype=np.int64)
+        for start in range(0, rows, chunk_size):
+            block = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+            assignments[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+
+        row_ids = np.argsort(assignments, kind="stable")
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=list_offsets[1:])
+
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        meta_path = index_dir / "meta.json"
+        if meta_path.exists():
+            # Invalidate the old index before its arrays are overwritten
+            meta_path.unlink()
+        np.save(index_dir / "centroids.npy", centroids)
+        np.save(index_dir / "list_offsets.npy", list_offsets)
+        np.save(index_dir / "row_ids.npy", row_ids)
+        vectors = np.lib.format.open_memmap(str(index_dir / "vectors.npy"), mode="w+",
+                                            dtype=np.float32, shape=(rows, embeddings.shape[1]))
+        for start in range(0, rows, chunk_size):
+            ids = row_ids[start:start + chunk_size]
+            # Gather in row order for sequential reads, then scatter into list order
+            order = np.argsort(ids)
+            block = np.empty((len(ids), embeddings.shape[1]), dtype=np.float32)
+            block[order] = embeddings[ids[order]]
+            vectors[start:start + len(ids)] = block
+        vectors.flush()
+        del vectors
+        # Written last so a partially built directory is never picked up
+        with open(meta_path, "w") as f:
+            json.dump({"rows": rows, "n_lists": n_lists, "iterations": iterations}, f)
+        return n_lists
+
+    def search(self, queries, k: int = 1, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximate top-k rows by scanning the nprobe closest lists.
+
+        Returns:
+            Tuple of (scores, indices), both of shape (batch, k), sorted by
+            descending score. Missing results are padded with score -inf and
+            index -1.
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        queries = EmbeddingIndex.normalize_queries(queries)
+        _, probes = top_k(queries @ self.centroids.T, nprobe)
+
+        all_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        all_indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        for i, query in enumerate(queries):
+            ranges = [(self.list_offsets[p], self.list_offsets[p + 1]) for p in probes[i]]
+            positions = np.concatenate([np.arange(start, end) for start, end in ranges])
+            if not len(positions):
+                continue
+            # Lists are contiguous in the reordered vectors, read them as slices
+            scores = np.concatenate([self.vectors[start:end] @ query for start, end in ranges])
+            best_scores, best = top_k(scores.reshape(1, -1), k)
+            found = best.shape[1]
+            all_scores[i, :found] = best_scores[0]
+            all_indices[i, :found] = self.row_ids[positions[best[0]]]
+        return all_scores, all_indices
+
+
+class HnswIndex:
+    """Adapter exposing an hnswlib graph through the EmbeddingIndex search interface"""
+
+    def __init__(self, index_path: Union[str, Path], dim: int, ef: int = 64):
+        """
+        Load an HNSW graph built with HnswIndex.build.
+
+        Args:
+            index_path: Path of the saved hnswlib index
+            dim: Embedding dimension
+            ef: Query-time candidate list size
+        """
+        import hnswlib
+
+        self.index = hnswlib.Index(space="ip", dim=dim)
+        self.index.load_index(str(index_path))
+        self.index.set_ef(ef)
+
+    @staticmethod
+    def build(embeddings: np.ndarray, index_path: Union[str, Path], m: int = 16,
+              ef_construction: int = 200, chunk_size: int = 65536) -> int:
+        """
+        Build and save an HNSW graph over normalized embeddings.
+
+        Returns:
+            Number of rows indexed
+        """
+        import hnswlib
+
+        rows, dim = embeddings.shape
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.init_index(max_elements=rows, M=m, ef_construction=ef_construction)
+        for start in range(0, rows, chunk_size):
+            block = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+            index.add_items(block, np.arange(start, start + block.shape[0]))
+        tmp_path = Path(str(index_path) + ".tmp")
+        index.save_index(str(tmp_path))
+        os.replace(tmp_path, index_path)
+        return rows
+
+    def search(self, queries, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Find approximate top-k rows, sorted by descending score"""
+        queries = EmbeddingIndex.normalize_queries(queries)
+        labels, distances = self.index.knn_query(queries, k=k)
+        # Inner-product space reports 1 - dot as the distance
+        return (1.0 - distances).astype(np.float32), labels.astype(np.int64)
+
+
+def _spherical_kmeans(sample: np.ndarray, n_lists: int, iterations: int,
+                      rng: np.random.Generator) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity, returning normalized centroids"""
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        counts = np.bincount(assignments, minlength=n_lists)
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.zeros_like(centroids)
+        non_empty = counts > 0
+        sums[non_empty] = np.add.reduceat(sample[order], starts[non_empty], axis=0)
+        empty = counts == 0
+        # Reseed empty clusters from random sample points
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = EmbeddingIndex.normalize_queries(sums)
+    return centroids
+
+
+def load_search_index(mode: str, embeddings_dir: Union[str, Path], exact_index: EmbeddingIndex,
+                      nprobe: int = 16, ef: int = 64, threads: int = 0):
+    """
+    Select the semantic search backend.
+
+    Args:
+        mode: "exact", "sharded", "ivf" or "hnsw"
+        embeddings_dir: Directory holding the offline-built indexes
+        exact_index: The exact index, returned for mode "exact"
+        nprobe: IVF lists scanned per query
+        ef: HNSW query-time candidate list size
+        threads: Shards searched in parallel; 0 uses every CPU
+
+    Returns:
+        An object with a search(queries, k) -> (scores, indices) method
+    """
+    embeddings_dir = Path(embeddings_dir)
+    if mode == "exact":
+        return exact_index
+    if mode == "sharded":
+        from src.sharded_index import SHARD_DIR, ShardedIndex
+        index = ShardedIndex(embeddings_dir / SHARD_DIR, threads=threads)
+        if len(index) != len(exact_index):
+            raise ValueError(f"Sharded index has {len(index)} rows but the corpus has {len(exact_index)}; "
+                             f"rebuild it with scripts/build_indexes.py shards")
+        return index
+    if mode == "ivf":
+        return IVFIndex(embeddings_dir / IVF_DIR, nprobe=nprobe)
+    if mode == "hnsw":
+        return HnswIndex(embeddings_dir / HNSW_FILE, dim=exact_index.dim, ef=ef)
+    raise ValueError(f"Unknown index mode {mode!r}, expected one of {INDEX_MODES}")
+
+
+def evaluate_recall(index, exact_index: EmbeddingIndex, queries: np.ndarray,
+                    k_values: Iterable[int] = (1, 10)) -> Dict[str, float]:
+    """
+    Measure recall@k of an approximate index against exact search.
+
+    recall@k is the fraction of the exact top-k rows that the approximate
+    index also returns in its top-k, averaged over the queries.
+
+    Returns:
+        Dictionary with recall@k for each k and mean per-query latency in ms
+        for both indexes
+    """
+    k_values = sorted(k_values)
+    k_max = k_values[-1]
+
+    start = time.perf_counter()
+    _, exact = exact_index.search(queries, k_max)
+    exact_ms = (time.perf_counter() - start) * 1e3 / len(queries)
+
+    start = time.perf_counter()
+    _, approx = index.search(queries, k_max)
+    approx_ms = (time.perf_counter() - start) * 1e3 / len(queries)
+
+    results = {}
+    for k in k_values:
+        hits = sum(len(np.intersect1d(exact[i, :k], approx[i, :k])) for i in range(len(queries)))
+        results[f"recall@{k}"] = hits / (k * len(queries))
+    results["exact_ms_per_query"] = exact_ms
+    results["ann_ms_per_query"] = approx_ms
+    return results
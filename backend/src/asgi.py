@@ -0,0 +1,288 @@
+"""
+ASGI serving mode, an alternative to the Flask app in src/server.py with the
+same endpoints and responses (both are built on src.handlers).
+Serve it with any ASGI server, e.g. `uvicorn src.asgi:app`.
+
+The event loop only parses requests and awaits; lookups (encoding, search,
+SQLite reads) run in a bounded thread pool sized to the CPU count, and
+Open Food Facts fetches in /scan, and /food_lookup requests for a text
+already being looked up, are awaited rather than holding a thread.
+When the pool is saturated new requests get 503 immediately instead of
+queueing without bound, and every request has a deadline.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import parse_qs
+
+from src import config, food_lookup, handlers
+from src.analysemacro import get_product_cache
+from src.batcher import BatchTimeout
+from src.canonicalize import canonicalize
+from src.food_lookup import scan_local, scan_result_from_product
+from src.handlers import REQUEST_SECONDS
+from src.loader import ComponentNotReady
+from src.metrics import REGISTRY
+from src.single_flight import FlightTimeout
+
+logger = logging.getLogger(__name__)
+
+# Largest accepted request body; a full /food_lookup/batch is a few KB
+MAX_BODY_BYTES = 1024 * 1024
+
+# Seconds an overloaded client should wait before retrying
+OVERLOADED_RETRY_AFTER = 1
+
+
+class Overloaded(Exception):
+    """The executor already holds its maximum number of pending requests"""
+
+
+class App:
+    """Raw ASGI application serving the FoodScanner endpoints"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 request_timeout: Optional[float] = None, fetch_timeout: Optional[float] = None):
+        """
+        Initialize the app; the executor starts its threads on first use.
+
+        Args:
+            workers: Executor threads (defaults to FOODSCANNER_ASGI_WORKERS, or every CPU)
+            max_pending: Requests queued or running in the executor before new
+                ones are rejected with 503
+            request_timeout: Seconds before a request is answered with 503
+            fetch_timeout: Seconds /scan awaits an Open Food Facts fetch
+        """
+        workers = workers or config.ASGI_WORKERS or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asgi-worker")
+        self.max_pending = max_pending or config.ASGI_MAX_PENDING
+        self.request_timeout = request_timeout or config.ASGI_REQUEST_TIMEOUT
+        self.fetch_timeout = fetch_timeout or config.OFF_FETCH_TIMEOUT
+        self.pending = 0
+        self.rejected = 0
+        self.deadlines_exceeded = 0
+        self._pending_lock = threading.Lock()
+
+        # (method, path) -> async handler(body, query) returning (body, status)
+        self.routes = {
+            ("POST", "/food_lookup"): self._food_lookup,
+            ("POST", "/food_lookup/batch"): self._offloaded(handlers.food_lookup_batch),
+            ("POST", "/scan"): self._scan,
+            ("POST", "/meal_totals"): self._offloaded(handlers.meal_totals_request),
+            ("GET", "/stats"): self._offloaded(lambda data: handlers.stats()),
+            ("GET", "/metrics"): self._offloaded(lambda data: handlers.metrics()),
+            ("GET", "/debug/profile"): self._debug_profile,
+            # Probes are answered on the loop so they respond under overload
+            ("GET", "/ready"): self._inline(handlers.ready),
+            ("GET", "/health"): self._inline(lambda: handlers.health("ASGI server is running")),
+        }
+        self.paths = {}
+        for method, path in self.routes:
+            self.paths.setdefault(path, []).append(method)
+
+    async def offload(self, fn, *args):
+        """
+        Run fn(*args) in the executor and await its result.
+
+        Raises:
+            Overloaded: max_pending calls are already queued or running
+        """
+        with self._pending_lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise Overloaded(f"{self.pending} requests pending")
+            self.pending += 1
+        future = self.executor.submit(fn, *args)
+        # Released when the work really finishes, not when a timed out request
+        # stops waiting, so abandoned work still counts against the limit
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future):
+        with self._pending_lock:
+            self.pending -= 1
+
+    def _offloaded(self, handler):
+        async def run(data, query):
+            return await self.offload(handler, data)
+        return run
+
+    @staticmethod
+    def _inline(handler):
+        async def run(data, query):
+            return handler()
+        return run
+
+    async def _debug_profile(self, data, query):
+        limit = query.get("limit", [None])[0]
+        limit = int(limit) if limit is not None and limit.isdigit() else None
+        return handlers.debug_profile(limit=limit, reset=query.get("reset", [None])[0] == "1")
+
+    async def _food_lookup(self, data, query):
+        flight = food_lookup.lookup_flight
+        future = None
+        # Only plain lookups are joined here; top-k lookups coalesce in the executor
+        if flight is not None and isinstance(data, dict) and isinstance(data.get("food_text"), str) \
+                and data.get("k") is None:
+            future = flight.join(canonicalize(data["food_text"]))
+        if future is None:
+            return await self.offload(handlers.food_lookup, data)
+        # An identical lookup is running: await its result without holding a
+        # worker thread. shield() keeps the deadline from cancelling the flight
+        found = await asyncio.shield(asyncio.wrap_future(future))
+        return await self.offload(handlers.food_lookup, data, found)
+
+    async def _scan(self, data, query):
+        barcode, error = handlers.scan_barcode(data)
+        if error is not None:
+            return error
+
+        def local_or_fetch():
+            found = scan_local(barcode)
+            if found is not None:
+                return found, None, None
+            stale, future = get_product_cache().fetch(barcode)
+            return None, stale, future
+
+        found, product, future = await self.offload(local_or_fetch)
+        if found is None and future is not None:
+            # Await the fetch without holding a worker thread. shield() keeps
+            # a timeout from cancelling the fetch, which other requests may share
+            try:
+                product = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.fetch_timeout)
+            except asyncio.TimeoutError:
+                pass
+            except Exception as e:
+                logger.warning("Product fetch error: %s", e)
+            found = scan_result_from_product(barcode, product)
+        return handlers.scan_response(barcode, found)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                handlers.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        # Servers without lifespan support still get the startup work
+        handlers.start()
+        start = time.perf_counter()
+        method, path = scope["method"], scope["path"]
+        headers = {}
+        route = path if path in self.paths else "unmatched"
+
+        if method == "OPTIONS" and path in self.paths:
+            # CORS preflight
+            request_headers = dict(scope.get("headers", []))
+            headers["Access-Control-Allow-Methods"] = ", ".join(self.paths[path])
+            requested = request_headers.get(b"access-control-request-headers")
+            if requested:
+                headers["Access-Control-Allow-Headers"] = requested.decode("latin-1")
+            body, status = "", 200
+        elif (method, path) not in self.routes:
+            if path in self.paths:
+                body, status = {"error": "Method not allowed"}, 405
+            else:
+                body, status = {"error": "Not found"}, 404
+        else:
+            body, status = await self._dispatch(method, path, scope, receive, headers)
+
+        await self._respond(send, body, status, headers)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route, str(status))
+
+    async def _dispatch(self, method, path, scope, receive, headers):
+        """(body, status) of a routed request, with errors mapped to responses"""
+        data = None
+        if method == "POST":
+            raw = await self._read_body(receive)
+            if raw is None:
+                return {"error": f"Request body exceeds {MAX_BODY_BYTES} bytes"}, 413
+            try:
+                data = json.loads(raw) if raw else None
+            except ValueError:
+                return {"error": "Request body is not valid JSON"}, 400
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+        try:
+            return await asyncio.wait_for(self.routes[method, path](data, query), self.request_timeout)
+        except Overloaded:
+            headers["Retry-After"] = str(OVERLOADED_RETRY_AFTER)
+            return {"error": "Server overloaded, retry shortly"}, 503
+        except asyncio.TimeoutError:
+            self.deadlines_exceeded += 1
+            headers["Retry-After"] = str(OVERLOADED_RETRY_AFTER)
+            return {"error": f"Request deadline of {self.request_timeout}s exceeded"}, 503
+        except ComponentNotReady as e:
+            headers["Retry-After"] = str(handlers.NOT_READY_RETRY_AFTER)
+            return handlers.not_ready(e)
+        except FlightTimeout as e:
+            headers["Retry-After"] = str(handlers.FLIGHT_TIMEOUT_RETRY_AFTER)
+            return handlers.flight_timeout(e)
+        except BatchTimeout as e:
+            headers["Retry-After"] = str(handlers.BATCH_TIMEOUT_RETRY_AFTER)
+            return handlers.batch_timeout(e)
+        except Exception as e:
+            return handlers.server_error(e)
+
+    @staticmethod
+    async def _read_body(receive) -> Optional[bytes]:
+        """The request body, or None if it exceeds MAX_BODY_BYTES"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    async def _respond(send, body, status, headers):
+        if isinstance(body, str):
+            payload = body.encode()
+            content_type = b"text/plain; version=0.0.4; charset=utf-8"
+        else:
+            payload = json.dumps(body).encode()
+            content_type = b"application/json"
+        response_headers = [
+            (b"content-type", content_type),
+            (b"content-length", str(len(payload)).encode()),
+            (b"access-control-allow-origin", b"*"),
+        ]
+        response_headers.extend((name.lower().encode(), value.encode()) for name, value in headers.items())
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": payload})
+
+    def samples(self):
+        """Executor load and rejection counts for /metrics"""
+        yield "foodscanner_asgi_pending", "Requests queued or running in the executor", "gauge", self.pending
+        yield "foodscanner_asgi_rejected_total", "Requests rejected with 503 by backpressure", "counter", self.rejected
+        yield ("foodscanner_asgi_deadlines_exceeded_total", "Requests answered with 503 at their deadline",
+               "counter", self.deadlines_exceeded)
+
+
+app = App()
+REGISTRY.add_collector(app.samples)
@@ -0,0 +1,132 @@
+"""
+Barcode index module for resolving scanned barcodes to product rows locally.
+Numeric barcodes of the product corpus are stored as a sorted uint64 key
+array with the matching row array, memory-mapped from one file, so a scan
+is one binary search and never touches the network.
+"""
+
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+
+# Keys and rows share one (2, n) uint64 array, so a rebuild replaces both at
+# once and a reader never pairs the keys of one build with the rows of another
+INDEX_FILE = "barcodes.npy"
+
+# Largest number of digits that always fits in a uint64
+_MAX_DIGITS = 19
+
+
+def normalize_barcode(code: object) -> Optional[int]:
+    """
+    Numeric key of a barcode, or None if it is not a plain digit string.
+
+    Leading zeros are dropped, so a 12-digit UPC-A code and its 13-digit
+    EAN-13 form ("0" + UPC-A) share one key.
+    """
+    if code is None:
+        return None
+    text = str(code).strip()
+    if not text.isdigit() or not text.isascii() or len(text.lstrip("0")) > _MAX_DIGITS:
+        return None
+    return int(text)
+
+
+class BarcodeIndex:
+    """Memory-mapped map from barcode to product row index"""
+
+    def __init__(self, index_dir: Union[str, Path]):
+        """
+        Open a barcode index built with BarcodeIndex.build.
+
+        Args:
+            index_dir: Directory containing the index file
+        """
+        self.index_dir = Path(index_dir)
+        index = np.load(str(self.index_dir / INDEX_FILE), mmap_mode="r")
+        self.keys = index[0]
+        self.rows = index[1].view(np.int64)
+
+    @staticmethod
+    def exists(index_dir: Union[str, Path]) -> bool:
+        """Check whether a complete index exists in the directory"""
+        return (Path(index_dir) / INDEX_FILE).exists()
+
+    @staticmethod
+    def build(codes: Iterable[object], index_dir: Union[str, Path]) -> int:
+        """
+        Write a barcode index from the codes of the product rows.
+
+        Args:
+            codes: Barcode of every product row, in row order. Non-numeric
+                codes are skipped; for duplicates the first row wins
+            index_dir: Destination directory
+
+        Returns:
+            Number of distinct barcodes indexed
+        """
+        keys = []
+        rows = []
+        for row, code in enumerate(codes):
+            key = normalize_barcode(code)
+            if key is not None:
+                keys.append(key)
+                rows.append(row)
+        keys = np.asarray(keys, dtype=np.uint64)
+        rows = np.asarray(rows, dtype=np.int64)
+
+        # Stable sort keeps rows in order within equal keys, so the first row is kept
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        keys, rows = keys[first], rows[first]
+
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        tmp = index_dir / (INDEX_FILE + ".tmp.npy")
+        np.save(tmp, np.stack([keys, rows.view(np.uint64)]))
+        os.replace(tmp, index_dir / INDEX_FILE)
+        return len(keys)
+
+    @staticmethod
+    def build_from_store(product_store, index_dir: Union[str, Path]) -> int:
+        """Write a barcode index from the code column of a ProductStore"""
+        return BarcodeIndex.build((product_store.get_raw(row)[2] for row in range(len(product_store))), index_dir)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, code: object) -> Optional[int]:
+        """
+        Product row of a barcode.
+
+        Returns:
+            The row index, or None if the barcode is not in the corpus
+        """
+        key = normalize_barcode(code)
+        if key is None or not len(self.keys):
+            return None
+        key = np.uint64(key)
+        position = int(np.searchsorted(self.keys, key))
+        if position < len(self.keys) and self.keys[position] == key:
+            return int(self.rows[position])
+        return None
+
+    def lookup_many(self, codes: Iterable[object]) -> List[Optional[int]]:
+        """Product rows of several barcodes, in the given order, with one vectorized search"""
+        keys = [normalize_barcode(code) for code in codes]
+        valid = [key is not None for key in keys]
+        if not len(self.keys) or not any(valid):
+            return [None] * len(keys)
+        queries = np.array([key for key in keys if key is not None], dtype=np.uint64)
+        positions = np.minimum(np.searchsorted(self.keys, queries), len(self.keys) - 1)
+        found = self.keys[positions] == queries
+        rows = iter(np.where(found, self.rows[positions], -1).tolist())
+        result = []
+        for is_valid in valid:
+            row = next(rows) if is_valid else -1
+            result.append(row if row >= 0 else None)
+        return result
@@ -0,0 +1,181 @@
+"""
+Micro-batching module for concurrent single-item requests.
+A background dispatcher collects items submitted from many request threads
+within a short window and runs them through one batched call. Callers wait
+with a timeout, and a dispatcher that dies fails every pending item, so no
+request thread blocks forever on a batch that will never run.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+
+
+class BatchTimeout(TimeoutError):
+    """A caller gave up waiting for its item's batch"""
+
+
+class MicroBatcher:
+    """Groups concurrently submitted items into batches for a batch function"""
+
+    def __init__(self, process_batch: Callable[[list], list], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, name: str = "micro-batcher", timeout: Optional[float] = None):
+        """
+        Initialize the batcher.
+
+        Args:
+            process_batch: Function mapping a list of items to a list of results
+                of the same length and order
+            max_batch_size: Dispatch as soon as this many items are queued
+            max_wait_ms: Longest time the first item of a batch waits for others
+            name: Name of the dispatcher thread
+            timeout: Longest time in seconds wait() waits for a result; None
+                waits for as long as the batch runs
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._submitted = 0
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._timeouts = 0
+        self._max_seen_batch = 0
+        self._batch_sizes = {}
+
+    def _ensure_started(self):
+        """Start the dispatcher thread on first use or after it died; call with the lock held"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item) -> Future:
+        """
+        Queue an item for the next batch.
+
+        Returns:
+            Future resolved with the item's result, or with the exception
+            raised by the batch function
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        with self._lock:
+            self._ensure_started()
+            self._submitted += 1
+            self._queue.put((item, future))
+        return future
+
+    def wait(self, future: Future, timeout: Optional[float] = None):
+        """
+        Result of a submitted item.
+
+        Raises:
+            BatchTimeout: No result within timeout (defaults to self.timeout)
+            Exception: Whatever the batch function raised
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise BatchTimeout(f"{self.name} batch did not finish within {timeout}s")
+
+    def _collect(self, first) -> list:
+        """Gather up to max_batch_size items, waiting at most max_wait after the first"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                # Re-queue the shutdown marker for the main loop
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        """Dispatcher loop"""
+        futures = []
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    return
+                batch = self._collect(first)
+                futures = [future for _, future in batch]
+                with self._lock:
+                    self._batches += 1
+                    self._items += len(batch)
+                    self._max_seen_batch = max(self._max_seen_batch, len(batch))
+                    self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                try:
+                    results = self.process_batch([item for item, _ in batch])
+                    if len(results) != len(batch):
+                        raise ValueError(f"Batch function returned {len(results)} results for {len(batch)} items")
+                except Exception as e:
+                    with self._lock:
+                        self._errors += 1
+                    for future in futures:
+                        future.set_exception(e)
+                    futures = []
+                    continue
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+                futures = []
+        except BaseException as e:
+            # The thread is dying: fail its batch and everything queued; the
+            # next submit() starts a new dispatcher
+            self._fail_pending(futures, RuntimeError(f"{self.name} dispatcher stopped: {e!r}"))
+            raise
+
+    def _fail_pending(self, futures: list, error: BaseException):
+        """Fail the given futures and every queued item, and let submit() start a new dispatcher"""
+        with self._lock:
+            self._thread = None
+            while True:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not None:
+                    futures.append(entry[1])
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        """Queue depth and batch-size metrics"""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "submitted": self._submitted,
+                "batches": self._batches,
+                "items": self._items,
+                "errors": self._errors,
+                "timeouts": self._timeouts,
+                "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size": self._max_seen_batch,
+                "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+            }
+
+    def close(self, timeout: Optional[float] = None):
+        """Process already queued items, then stop the dispatcher thread"""
+        self._closed = True
+        thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
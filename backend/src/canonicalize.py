@@ -0,0 +1,151 @@
+"""
+Query canonicalization module.
+Maps food texts that name the same food to one key, so "2 Cups of Apples",
+"apple" and "APPLES!" all take the exact-match path of the food cache instead
+of the fuzzy scan or the model. The same function keys inserts and lookups.
+
+Steps, in order: Unicode folding and lowercasing, punctuation and whitespace
+collapsing ("&" becomes "and", "2%" is kept), quantity and unit stripping
+("2 cups of", "100g", "1/2 cup"), stopword removal, plural folding and
+synonyms ("bbq" -> "barbecue"). Only numbers that measure something, i.e.
+are followed by a unit, "x" or "of", are quantities; other numbers are part
+of the name ("7 up", "omega 3", "chicken 65"). Word order is kept, since
+it tells foods apart ("rice milk" and "milk rice").
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# Bump when the output of canonicalize() changes; FoodCache rekeys stored rows
+CANONICAL_VERSION = 2
+
+_TOKEN = re.compile(r"\d+(?:[./]\d+)?%|[^\W_]+")
+_NUMBER = re.compile(r"\d+(?:[./]\d+)?$")
+
+UNITS = {
+    "g", "gram", "kg", "kilogram", "mg", "oz", "ounce", "lb", "pound", "ml", "l", "liter", "litre",
+    "cl", "dl", "cup", "tbsp", "tablespoon", "tsp", "teaspoon", "slice", "piece", "serving", "portion",
+    "bowl", "glass", "mug", "can", "bottle", "pinch", "handful", "scoop", "pack", "packet", "bag",
+    "pc", "pcs", "dozen", "x",
+}
+# A number glued to a unit, e.g. "100g", "12oz", "1.5l"
+_MEASURE = re.compile(r"\d+(?:[./]\d+)?(?:" + "|".join(sorted(UNITS, key=len, reverse=True)) + r")s?$")
+
+# Quantities like digits
+NUMBER_WORDS = {"one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"}
+# Dropped only before a unit, an article or "of" ("half a cup", but "half and half")
+FRACTION_WORDS = {"half", "quarter", "few", "couple", "several"}
+STOPWORDS = {"a", "an", "the", "of", "some"}
+
+# Singulars ending in "e" whose plurals would otherwise lose it ("pies" -> "py")
+_E_SINGULARS = {"pie", "cookie", "brownie", "smoothie", "veggie", "hoagie", "calorie", "quiche",
+                "brioche", "mousse", "ganache", "creme", "crepe"}
+_IRREGULAR = {"leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife", "calves": "calf",
+              "geese": "goose", "teeth": "tooth", "mice": "mouse", "feet": "foot"}
+_INVARIANT_ENDINGS = ("ss", "us", "is")
+
+SYNONYMS = {
+    "bbq": "barbecue",
+    "barbeque": "barbecue",
+    "choc": "chocolate",
+    "veggie": "vegetable",
+    "veg": "vegetable",
+    "yoghurt": "yogurt",
+    "yogourt": "yogurt",
+    "donut": "doughnut",
+    "catsup": "ketchup",
+    "mayo": "mayonnaise",
+    "omelette": "omelet",
+    "icecream": "ice cream",
+    "pb": "peanut butter",
+    "oj": "orange juice",
+    "spag": "spaghetti",
+    "garbanzo": "chickpea",
+}
+
+
+def singular(word: str) -> str:
+    """Plural folding by suffix rules; only needs to agree with itself"""
+    if len(word) <= 3 or not word.endswith("s") or not word.isalpha():
+        return word
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+    if word.endswith(_INVARIANT_ENDINGS):
+        return word
+    if word[:-1] in _E_SINGULARS:
+        return word[:-1]
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes", "sses", "oes")):
+        return word[:-2]
+    return word[:-1]
+
+
+def _is_unit(token: str) -> bool:
+    return token in UNITS or singular(token) in UNITS
+
+
+def _quantities(tokens: list) -> list:
+    """
+    Flag the tokens that state a quantity: measures ("100g"), numbers and
+    number words followed by a unit, "x", "of" or another quantity ("2 1/2
+    cups"), and fraction words before a unit or an article
+    """
+    flags = [False] * len(tokens)
+    for i in reversed(range(len(tokens))):
+        token = tokens[i]
+        following = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if _MEASURE.match(token):
+            flags[i] = True
+        elif _NUMBER.match(token) or token in NUMBER_WORDS:
+            flags[i] = _is_unit(following) or following == "of" or (bool(following) and flags[i + 1])
+        elif token in FRACTION_WORDS:
+            flags[i] = following in STOPWORDS or _is_unit(following)
+    return flags
+
+
+def _strip_quantities(tokens: list) -> list:
+    """Drop quantities, stopwords and units that follow a quantity or precede "of" """
+    kept = []
+    after_quantity = False
+    for i, (token, quantity) in enumerate(zip(tokens, _quantities(tokens))):
+        following = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if quantity:
+            after_quantity = True
+        elif token in STOPWORDS:
+            after_quantity = after_quantity or token in ("a", "an", "some")
+        elif _is_unit(token) and (after_quantity or following == "of"):
+            after_quantity = True
+        else:
+            after_quantity = False
+            kept.append(token)
+    return kept
+
+
+@lru_cache(maxsize=65536)
+def canonicalize(text: str) -> str:
+    """
+    Canonical key of a food text.
+
+    Args:
+        text: Food description as typed
+
+    Returns:
+        Space-separated canonical tokens in their original order; falls back
+        to the lowercased, whitespace-collapsed text when nothing else would
+        remain
+    """
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    # Apostrophes join ("reese's" -> "reeses"); "&" is a word
+    folded = folded.replace("'", "").replace("’", "").replace("&", " and ")
+    tokens = _TOKEN.findall(folded)
+
+    words = []
+    for token in _strip_quantities(tokens):
+        word = singular(token)
+        words.extend(SYNONYMS.get(word, word).split())
+    if not words:
+        return " ".join(text.lower().split())
+    return " ".join(words)
@@ -0,0 +1,121 @@
+"""
+Backend configuration.
+Every setting can be overridden with a FOODSCANNER_* environment variable.
+"""
+
+import os
+from pathlib import Path
+
+# Resolve paths relative to backend root
+backend_root = Path(__file__).parent.parent
+
+# Directory holding embeddings_only.npy, total_dataset and the offline indexes
+EMBEDDINGS_DIR = Path(os.environ.get("FOODSCANNER_EMBEDDINGS_DIR", str(backend_root / "embeddings")))
+
+# Semantic search backend: "exact" (brute force reference), "sharded" (exact,
+# parallel over offline-built shards), "ivf" or "hnsw"
+INDEX_MODE = os.environ.get("FOODSCANNER_INDEX_MODE", "exact")
+
+# Shards searched in parallel in "sharded" mode; 0 uses every CPU
+SEARCH_THREADS = int(os.environ.get("FOODSCANNER_SEARCH_THREADS", "0"))
+
+# Number of IVF lists scanned per query (higher is slower and more accurate)
+IVF_NPROBE = int(os.environ.get("FOODSCANNER_IVF_NPROBE", "16"))
+
+# HNSW query-time candidate list size (higher is slower and more accurate)
+HNSW_EF = int(os.environ.get("FOODSCANNER_HNSW_EF", "64"))
+
+# Maximum number of food_texts accepted by /food_lookup/batch
+MAX_BATCH_SIZE = int(os.environ.get("FOODSCANNER_MAX_BATCH_SIZE", "256"))
+
+# Largest k accepted by /food_lookup for top-k alternatives
+MAX_ALTERNATIVES = int(os.environ.get("FOODSCANNER_MAX_ALTERNATIVES", "20"))
+
+# Micro-batching of concurrent single lookups: enabled flag, batch window and size
+MICROBATCH_ENABLED = os.environ.get("FOODSCANNER_MICROBATCH", "1") == "1"
+MICROBATCH_WAIT_MS = float(os.environ.get("FOODSCANNER_MICROBATCH_WAIT_MS", "5"))
+MICROBATCH_MAX_SIZE = int(os.environ.get("FOODSCANNER_MICROBATCH_MAX_SIZE", "32"))
+# Seconds a lookup waits for its micro-batch before giving up with 503
+MICROBATCH_TIMEOUT = float(os.environ.get("FOODSCANNER_MICROBATCH_TIMEOUT", "30"))
+
+# Coalescing of concurrent lookups of the same canonical text into one
+# computation: enabled flag, and seconds a waiter waits for the first caller
+SINGLE_FLIGHT = os.environ.get("FOODSCANNER_SINGLE_FLIGHT", "1") == "1"
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get("FOODSCANNER_SINGLE_FLIGHT_TIMEOUT", "30"))
+
+# FoodCache SQLite database; defaults to backend/cache/food_cache.db
+FOOD_CACHE_DB = os.environ.get("FOODSCANNER_FOOD_CACHE_DB")
+
+# In-memory hot tier of FoodCache: maximum decoded rows and approximate bytes
+FOOD_CACHE_HOT_MAX_ITEMS = int(os.environ.get("FOODSCANNER_FOOD_CACHE_HOT_MAX_ITEMS", "100000"))
+FOOD_CACHE_HOT_MAX_BYTES = int(os.environ.get("FOODSCANNER_FOOD_CACHE_HOT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Maximum number of SQLite read connections shared by all FoodCache readers
+FOOD_CACHE_READERS = int(os.environ.get("FOODSCANNER_FOOD_CACHE_READERS", "8"))
+
+# Seconds between FoodCache checks for rows committed by other processes
+# (other prefork workers, scripts/init_cache.py)
+FOOD_CACHE_REFRESH_INTERVAL = float(os.environ.get("FOODSCANNER_FOOD_CACHE_REFRESH_INTERVAL", "1.0"))
+
+# Write-behind batching of FoodCache inserts (see FoodCache for durability)
+FOOD_CACHE_WRITE_BEHIND = os.environ.get("FOODSCANNER_FOOD_CACHE_WRITE_BEHIND", "0") == "1"
+FOOD_CACHE_FLUSH_MAX_ITEMS = int(os.environ.get("FOODSCANNER_FOOD_CACHE_FLUSH_MAX_ITEMS", "500"))
+FOOD_CACHE_FLUSH_INTERVAL = float(os.environ.get("FOODSCANNER_FOOD_CACHE_FLUSH_INTERVAL", "1.0"))
+
+# Write-back of semantic search results into the food cache: enabled flag,
+# lowest similarity written back, and sightings of a query before it is
+# admitted (1 writes back on first sight)
+WRITE_BACK = os.environ.get("FOODSCANNER_WRITE_BACK", "1") == "1"
+WRITE_BACK_MIN_SCORE = float(os.environ.get("FOODSCANNER_WRITE_BACK_MIN_SCORE", "0.6"))
+WRITE_BACK_ADMIT_AFTER = int(os.environ.get("FOODSCANNER_WRITE_BACK_ADMIT_AFTER", "2"))
+# Seconds queries that found nothing (or whose search failed) are answered as
+# not found without running the model; 0 disables. Queries tracked per cache
+NEGATIVE_CACHE_TTL = float(os.environ.get("FOODSCANNER_NEGATIVE_CACHE_TTL", "300"))
+NEGATIVE_CACHE_ERROR_TTL = float(os.environ.get("FOODSCANNER_NEGATIVE_CACHE_ERROR_TTL", "30"))
+WRITE_BACK_MAX_TRACKED = int(os.environ.get("FOODSCANNER_WRITE_BACK_MAX_TRACKED", "100000"))
+
+# Load the model, corpus and cache in background threads when the server starts
+BACKGROUND_LOADING = os.environ.get("FOODSCANNER_BACKGROUND_LOADING", "1") == "1"
+
+# Open Food Facts product cache: API root, freshness of fetched and unknown
+# products (seconds), fetch threads, per-request HTTP timeout and prefetching
+OFF_API_URL = os.environ.get("FOODSCANNER_OFF_API_URL", "https://world.openfoodfacts.org")
+OFF_CACHE_TTL = float(os.environ.get("FOODSCANNER_OFF_CACHE_TTL", str(7 * 24 * 3600)))
+OFF_NEGATIVE_TTL = float(os.environ.get("FOODSCANNER_OFF_NEGATIVE_TTL", str(24 * 3600)))
+OFF_FETCH_WORKERS = int(os.environ.get("FOODSCANNER_OFF_FETCH_WORKERS", "4"))
+OFF_FETCH_TIMEOUT = float(os.environ.get("FOODSCANNER_OFF_FETCH_TIMEOUT", "5.0"))
+OFF_PREFETCH = os.environ.get("FOODSCANNER_OFF_PREFETCH", "1") == "1"
+# Product cache SQLite database; defaults to backend/cache/off_products.db
+OFF_CACHE_DB = os.environ.get("FOODSCANNER_OFF_CACHE_DB")
+
+# Memoized query embeddings: in-memory byte budget, and the optional disk tier
+# (enabled flag, directory and maximum number of persisted embeddings)
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get("FOODSCANNER_EMBEDDING_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+EMBEDDING_CACHE_PERSIST = os.environ.get("FOODSCANNER_EMBEDDING_CACHE_PERSIST", "0") == "1"
+EMBEDDING_CACHE_DIR = Path(os.environ.get("FOODSCANNER_EMBEDDING_CACHE_DIR", str(backend_root / "cache" / "query_embeddings")))
+EMBEDDING_CACHE_MAX_PERSISTED = int(os.environ.get("FOODSCANNER_EMBEDDING_CACHE_MAX_PERSISTED", "200000"))
+
+# Query encoder backend: "torch" (sentence-transformers reference) or "onnx"
+# (offline export run with onnxruntime; int8-quantized unless disabled)
+ENCODER_BACKEND = os.environ.get("FOODSCANNER_ENCODER_BACKEND", "torch")
+ONNX_ENCODER_DIR = Path(os.environ.get("FOODSCANNER_ONNX_ENCODER_DIR", str(EMBEDDINGS_DIR / "onnx_encoder")))
+ONNX_QUANTIZED = os.environ.get("FOODSCANNER_ONNX_QUANTIZED", "1") == "1"
+# onnxruntime intra-op threads; 0 uses every CPU
+ONNX_THREADS = int(os.environ.get("FOODSCANNER_ONNX_THREADS", "0"))
+
+# Log level of the backend loggers (DEBUG logs every request)
+LOG_LEVEL = os.environ.get("FOODSCANNER_LOG_LEVEL", "INFO")
+
+# Opt-in sampling profiler exposed at /debug/profile, and its sampling interval
+PROFILER_ENABLED = os.environ.get("FOODSCANNER_PROFILER", "0") == "1"
+PROFILER_INTERVAL = float(os.environ.get("FOODSCANNER_PROFILER_INTERVAL", "0.01"))
+
+# ASGI serving mode (src/asgi.py): threads running lookups (0 uses every CPU),
+# requests queued or running before new ones get 503, and the per-request
+# deadline in seconds
+ASGI_WORKERS = int(os.environ.get("FOODSCANNER_ASGI_WORKERS", "0"))
+ASGI_MAX_PENDING = int(os.environ.get("FOODSCANNER_ASGI_MAX_PENDING", "64"))
+ASGI_REQUEST_TIMEOUT = float(os.environ.get("FOODSCANNER_ASGI_REQUEST_TIMEOUT", "10.0"))
+
+# Pre-fork serving mode (python -m src.prefork): worker processes (0 uses every CPU)
+WORKERS = int(os.environ.get("FOODSCANNER_WORKERS", "0"))
@@ -0,0 +1,238 @@
+"""
+Embedding cache module for memoizing query encodings.
+Query embeddings are kept in a byte-bounded in-memory LRU tier and, optionally,
+in an append-only vector file with a key index on disk that survives restarts.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from src.lru_cache import LRUCache
+
+META_FILE = "meta.json"
+KEYS_FILE = "keys.jsonl"
+VECTORS_FILE = "vectors.f32"
+
+# Approximate per-entry bookkeeping cost of an in-memory embedding, in bytes
+_ENTRY_OVERHEAD = 200
+
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key of a query.
+
+    all-MiniLM-L6-v2 uses an uncased tokenizer that splits on whitespace, so
+    case and runs of whitespace do not change the embedding.
+    """
+    return " ".join(text.lower().split())
+
+
+class _DiskTier:
+    """Append-only float32 vector file with a JSON-lines key index, memory-mapped for reads"""
+
+    def __init__(self, directory: Path, model_name: str, max_items: int):
+        self.directory = directory
+        self.model_name = model_name
+        self.max_items = max_items
+        self.dim: Optional[int] = None
+        self.rows: Dict[str, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        meta_path = self.directory / META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta.get("model") != self.model_name:
+                # Embeddings of another encoder are useless; start over
+                self._reset()
+                return
+            self.dim = meta["dim"]
+        else:
+            self._reset()
+            return
+
+        keys = []
+        torn = False
+        keys_path = self.directory / KEYS_FILE
+        if keys_path.exists():
+            with open(keys_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        torn = True
+                        break
+                    keys.append(json.loads(line))
+        row_bytes = self.dim * 4
+        vectors_path = self.directory / VECTORS_FILE
+        stored = vectors_path.stat().st_size // row_bytes if vectors_path.exists() else 0
+
+        # A crash between the two appends leaves one file longer; cut both to the shorter
+        count = min(len(keys), stored)
+        with open(vectors_path, "ab") as f:
+            f.truncate(count * row_bytes)
+        if count != len(keys) or torn:
+            self._write_keys(keys[:count])
+        self.rows = {key: row for row, key in enumerate(keys[:count])}
+        self._remap()
+
+    def _reset(self):
+        for name in (META_FILE, KEYS_FILE, VECTORS_FILE):
+            path = self.directory / name
+            if path.exists():
+                path.unlink()
+        self.dim = None
+        self.rows = {}
+        self._vectors = None
+
+    def _write_keys(self, keys: List[str]):
+        tmp = self.directory / (KEYS_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            for key in keys:
+                f.write(json.dumps(key) + "\n")
+        os.replace(tmp, self.directory / KEYS_FILE)
+
+    def _remap(self):
+        count = len(self.rows)
+        if count == 0:
+            self._vectors = None
+            return
+        self._vectors = np.memmap(self.directory / VECTORS_FILE, dtype=np.float32, mode="r",
+                                  shape=(count, self.dim))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        vectors = self._vectors
+        if vectors is None or row >= len(vectors):
+            with self._lock:
+                self._remap()
+                vectors = self._vectors
+        return np.array(vectors[row])
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray):
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                (self.directory / META_FILE).write_text(json.dumps({"model": self.model_name, "dim": self.dim}))
+            first = {}
+            for i, key in enumerate(keys):
+                if key not in self.rows:
+                    first.setdefault(key, i)
+            new = list(first.values())[:max(0, self.max_items - len(self.rows))]
+            if not new:
+                return
+            # Vectors first: a crash before the keys are written only leaves unreferenced rows
+            with open(self.directory / VECTORS_FILE, "ab") as f:
+                f.write(np.ascontiguousarray(vectors[new], dtype=np.float32).tobytes())
+            with open(self.directory / KEYS_FILE, "a") as f:
+                f.write("".join(json.dumps(keys[i]) + "\n" for i in new))
+            for i in new:
+                self.rows[keys[i]] = len(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class EmbeddingCache:
+    """
+    Memoizes query text -> float32 embedding in front of an encoder.
+
+    Lookups use normalize_query() keys. The memory tier evicts least recently
+    used embeddings beyond max_bytes. The optional disk tier keeps up to
+    max_persisted embeddings across restarts and is discarded when the
+    encoder (model_name) changes.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = 32 * 1024 * 1024,
+                 persist_dir: Optional[Union[str, Path]] = None, max_persisted: int = 200000,
+                 model_name: str = "all-MiniLM-L6-v2"):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            max_bytes: Maximum approximate size of the in-memory embeddings
+            persist_dir: Directory of the disk tier, or None to keep embeddings in memory only
+            max_persisted: Maximum number of embeddings written to disk
+            model_name: Encoder identity; a disk tier written by another encoder is discarded
+        """
+        self.memory = LRUCache(max_bytes=max_bytes, sizeof=lambda vector: vector.nbytes + _ENTRY_OVERHEAD)
+        self.disk = _DiskTier(Path(persist_dir), model_name, max_persisted) if persist_dir is not None else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Cached embedding of a query, or None"""
+        key = normalize_query(text)
+        vector = self.memory.get(key)
+        if vector is None and self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.memory.put(key, vector)
+                with self._lock:
+                    self.disk_hits += 1
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return vector
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray):
+        """Cache embeddings of several queries"""
+        keys = [normalize_query(text) for text in texts]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        for key, vector in zip(keys, vectors):
+            # Copy so cached rows do not keep the whole batch array alive
+            self.memory.put(key, vector.copy())
+        if self.disk is not None:
+            self.disk.put_many(keys, vectors)
+
+    def encode(self, texts: Sequence[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings of texts, encoding only the ones not cached.
+
+        Args:
+            texts: Query texts
+            encode_fn: Encoder mapping a list of texts to a (len, dim) array
+
+        Returns:
+            float32 array of shape (len(texts), dim), in input order
+        """
+        vectors: List[Optional[np.ndarray]] = [self.get(text) for text in texts]
+
+        # Encode each distinct missing query once
+        missing: Dict[str, List[int]] = {}
+        for position, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(normalize_query(texts[position]), []).append(position)
+        if missing:
+            first_texts = [texts[positions[0]] for positions in missing.values()]
+            encoded = np.asarray(encode_fn(first_texts), dtype=np.float32)
+            self.put_many(first_texts, encoded)
+            for positions, vector in zip(missing.values(), encoded):
+                for position in positions:
+                    vectors[position] = vector
+        return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and tier occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "memory": self.memory.stats(),
+                "persisted": len(self.disk) if self.disk is not None else None,
+            }
@@ -0,0 +1,177 @@
+"""
+Embedding index module for semantic search over the product corpus.
+Keeps an L2-normalized copy of the embedding matrix on disk and memory-maps it,
+so a query is a single dot product plus a top-k selection.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+class EmbeddingIndex:
+    """Memory-mapped, pre-normalized embedding matrix answering cosine queries"""
+
+    def __init__(self, embeddings_path: Union[str, Path],
+                 normalized_path: Optional[Union[str, Path]] = None,
+                 dtype: str = "float32", chunk_size: int = 65536):
+        """
+        Initialize the embedding index.
+
+        Args:
+            embeddings_path: Path to the raw embeddings .npy file (rows x dim)
+            normalized_path: Path of the normalized sidecar. Defaults to
+                <embeddings stem>.normalized.<dtype>.npy next to the raw file
+            dtype: Storage dtype of the sidecar, "float32" or "float16"
+            chunk_size: Number of rows processed at a time when normalizing
+                or scoring float16 matrices
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}, expected one of {SUPPORTED_DTYPES}")
+
+        self.embeddings_path = Path(embeddings_path)
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        if normalized_path is None:
+            normalized_path = self.sidecar_path(self.embeddings_path, dtype)
+        self.normalized_path = Path(normalized_path)
+
+        if self._sidecar_is_stale():
+            self.build_normalized(self.embeddings_path, self.normalized_path, dtype, chunk_size)
+
+        # Read-only mapping: pages are shared between processes via the page cache
+        self.embeddings = np.load(str(self.normalized_path), mmap_mode="r")
+        if self.embeddings.ndim == 1:
+            self.embeddings = self.embeddings.reshape(1, -1)
+
+    @staticmethod
+    def sidecar_path(embeddings_path: Union[str, Path], dtype: str = "float32") -> Path:
+        """Default location of the normalized sidecar for an embeddings file"""
+        embeddings_path = Path(embeddings_path)
+        return embeddings_path.with_name(f"{embeddings_path.stem}.normalized.{dtype}.npy")
+
+    def _sidecar_is_stale(self) -> bool:
+        """Check whether the sidecar is missing or older than the raw embeddings"""
+        if not self.normalized_path.exists():
+            return True
+        if not self.embeddings_path.exists():
+            # Only the sidecar was shipped, trust it
+            return False
+        return self.normalized_path.stat().st_mtime < self.embeddings_path.stat().st_mtime
+
+    @staticmethod
+    def build_normalized(embeddings_path: Union[str, Path], normalized_path: Union[str, Path],
+                         dtype: str = "float32", chunk_size: int = 65536):
+        """
+        L2-normalize a raw embeddings file into a sidecar .npy file.
+
+        Rows are processed in chunks so the full matrix is never held in memory,
+        and the result is written to a temporary file and renamed into place.
+
+        Args:
+            embeddings_path: Path to the raw embeddings .npy file
+            normalized_path: Destination path of the normalized sidecar
+            dtype: Storage dtype of the sidecar
+            chunk_size: Number of rows normalized at a time
+        """
+        raw = np.load(str(embeddings_path), mmap_mode="r")
+        if raw.ndim == 1:
+            raw = raw.reshape(1, -1)
+
+        normalized_path = Path(normalized_path)
+        tmp_path = normalized_path.with_name(normalized_path.name + ".tmp")
+        out = np.lib.format.open_memmap(str(tmp_path), mode="w+", dtype=dtype, shape=raw.shape)
+        for start in range(0, raw.shape[0], chunk_size):
+            block = np.asarray(raw[start:start + chunk_size], dtype=np.float32)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            out[start:start + chunk_size] = block / np.maximum(norms, 1e-12)
+        out.flush()
+        del out
+        os.replace(tmp_path, normalized_path)
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.embeddings.shape[1]
+
+    @staticmethod
+    def normalize_queries(queries) -> np.ndarray:
+        """Convert query embeddings to a normalized float32 (batch x dim) array"""
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        return queries / np.maximum(norms, 1e-12)
+
+    def scores(self, queries) -> np.ndarray:
+        """
+        Compute cosine similarity between queries and every corpus row.
+
+        Args:
+            queries: Query embeddings, shape (dim,) or (batch, dim)
+
+        Returns:
+            float32 array of shape (batch, rows)
+        """
+        return score_block(self.normalize_queries(queries), self.embeddings, self.chunk_size)
+
+    def search(self, queries, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the top-k most similar corpus rows for each query.
+
+        Args:
+            queries: Query embeddings, shape (dim,) or (batch, dim)
+            k: Number of results per query
+
+        Returns:
+            Tuple of (scores, indices), both of shape (batch, k), sorted by
+            descending score
+        """
+        return top_k(self.scores(queries), k)
+
+
+def score_block(queries: np.ndarray, embeddings: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Dot products of normalized float32 queries with every row of a matrix.
+
+    Returns:
+        float32 array of shape (batch, rows)
+    """
+    if embeddings.dtype == np.float32:
+        return queries @ embeddings.T
+
+    # No BLAS path for half precision, upcast one chunk at a time
+    result = np.empty((queries.shape[0], embeddings.shape[0]), dtype=np.float32)
+    for start in range(0, embeddings.shape[0], chunk_size):
+        block = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+        result[:, start:start + block.shape[0]] = queries @ block.T
+    return result
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest scores per row with a partial sort.
+
+    Args:
+        scores: Score matrix of shape (batch, rows)
+        k: Number of results per row
+
+    Returns:
+        Tuple of (scores, indices), both of shape (batch, k), sorted by
+        descending score
+    """
+    k = max(1, min(k, scores.shape[1]))
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return np.take_along_axis(candidate_scores, order, axis=1), indices
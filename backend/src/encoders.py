@@ -0,0 +1,232 @@
+"""
+Query encoder backends.
+The reference backend runs all-MiniLM-L6-v2 through sentence-transformers
+(PyTorch). The ONNX backend runs an offline export of the same model, optionally
+int8-quantized, through onnxruntime and the Rust tokenizer, so serving needs
+neither torch nor transformers.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+ENCODER_BACKENDS = ("torch", "onnx")
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+META_FILE = "meta.json"
+
+
+def encoder_id(backend: str, quantized: bool = False) -> str:
+    """Identity of an encoder configuration; embeddings of different ids are not interchangeable"""
+    if backend == "torch":
+        return MODEL_NAME
+    return f"{MODEL_NAME}:onnx{'-int8' if quantized else ''}"
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Average token embeddings over the attention mask, as the model's pooling layer does.
+
+    Args:
+        token_embeddings: (batch, tokens, dim) last hidden state
+        attention_mask: (batch, tokens) mask of real tokens
+
+    Returns:
+        float32 array of shape (batch, dim)
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings.astype(np.float32) * mask).sum(axis=1)
+    return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length, as the model's Normalize layer does"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class SentenceTransformerEncoder:
+    """Reference encoder: sentence-transformers on PyTorch at float32"""
+
+    def __init__(self, model_name: str = MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = encoder_id("torch")
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """Embeddings of texts as a float32 (len, dim) array"""
+        return np.asarray(self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True),
+                          dtype=np.float32)
+
+
+class OnnxEncoder:
+    """all-MiniLM-L6-v2 exported to ONNX, run with onnxruntime on CPU"""
+
+    def __init__(self, model_dir: Union[str, Path], quantized: bool = True, threads: Optional[int] = None):
+        """
+        Open an export written by export_onnx.
+
+        Args:
+            model_dir: Directory holding the ONNX model(s) and tokenizer.json
+            quantized: Use the int8 model instead of the float32 one
+            threads: onnxruntime intra-op threads. Defaults to the CPU count
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_dir = Path(model_dir)
+        self.name = encoder_id("onnx", quantized)
+        meta = json.loads((self.model_dir / META_FILE).read_text())
+        self.max_length = meta["max_length"]
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count() or 1
+        # One request thread per batch already; parallel operators only add overhead
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = ONNX_QUANTIZED_FILE if quantized else ONNX_MODEL_FILE
+        self.session = onnxruntime.InferenceSession(str(self.model_dir / model_file), options,
+                                                    providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _inputs(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        return {name: value for name, value in inputs.items() if name in self.input_names}
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """Embeddings of texts as a float32 (len, dim) array"""
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self._inputs(texts[start:start + batch_size])
+            token_embeddings = self.session.run(None, inputs)[0]
+            batches.append(l2_normalize(mean_pool(token_embeddings, inputs["attention_mask"])))
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32, copy=False)
+
+
+def export_onnx(output_dir: Union[str, Path], model_name: str = MODEL_NAME, quantize: bool = True,
+                opset: int = 17) -> List[Path]:
+    """
+    Export the transformer of a sentence-transformers model to ONNX (offline; needs torch).
+
+    Args:
+        output_dir: Destination directory
+        model_name: Hugging Face model id
+        quantize: Also write a dynamically int8-quantized copy
+        opset: ONNX opset version
+
+    Returns:
+        Paths of the written model files
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    tokenizer.save_pretrained(str(output_dir))
+
+    sample = tokenizer(["peanut butter", "whole milk"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "tokens"}
+
+    model_path = output_dir / ONNX_MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(model_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    written = [model_path]
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = output_dir / ONNX_QUANTIZED_FILE
+        quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+        written.append(quantized_path)
+
+    (output_dir / META_FILE).write_text(json.dumps({
+        "model": model_name,
+        "max_length": model.max_seq_length,
+        "dim": model.get_sentence_embedding_dimension(),
+    }))
+    return written
+
+
+def compare_encoders(reference, candidate, texts: Sequence[str], search_index=None,
+                     batch_size: int = 64) -> Dict[str, float]:
+    """
+    Agreement of a candidate encoder with the reference encoder.
+
+    Args:
+        reference: Encoder producing the reference embeddings
+        candidate: Encoder under test
+        texts: Validation queries, e.g. product names sampled from the corpus
+        search_index: Optional index with search(queries, k); adds top-1 agreement
+        batch_size: Encoding batch size
+
+    Returns:
+        Dict with mean and minimum cosine similarity between the two encoders'
+        embeddings of each text and, with a search index, the fraction of texts
+        whose top-1 corpus row is the same
+    """
+    expected = l2_normalize(reference.encode(list(texts), batch_size=batch_size))
+    actual = l2_normalize(candidate.encode(list(texts), batch_size=batch_size))
+    cosine = (expected * actual).sum(axis=1)
+    agreement = {
+        "mean_cosine": float(cosine.mean()),
+        "min_cosine": float(cosine.min()),
+    }
+    if search_index is not None:
+        _, expected_rows = search_index.search(expected, k=1)
+        _, actual_rows = search_index.search(actual, k=1)
+        agreement["top1_agreement"] = float((expected_rows[:, 0] == actual_rows[:, 0]).mean())
+    return agreement
+
+
+def load_encoder(backend: str, onnx_dir: Union[str, Path, None] = None, quantized: bool = True,
+                 threads: Optional[int] = None):
+    """
+    Create the configured query encoder.
+
+    Args:
+        backend: "torch" or "onnx"
+        onnx_dir: Directory of the ONNX export (onnx backend)
+        quantized: Use the int8 ONNX model (onnx backend)
+        threads: onnxruntime intra-op threads (onnx backend)
+    """
+    if backend == "torch":
+        return SentenceTransformerEncoder()
+    if backend == "onnx":
+        if onnx_dir is None or not (Path(onnx_dir) / META_FILE).exists():
+            raise FileNotFoundError(
+                f"No ONNX encoder in {onnx_dir}; build it with scripts/build_indexes.py onnx"
+            )
+        return OnnxEncoder(onnx_dir, quantized=quantized, threads=threads)
+    raise ValueError(f"Unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}")
@@ -5,19 +5,143 @@ Uses SQLite database and fuzzy matching for flexible text matching.
 
 import sqlite3
 import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
-from rapidfuzz import fuzz, process
+from typing import Iterable, Optional, Tuple
+from src.canonicalize import CANONICAL_VERSION, canonicalize
+from src.fuzzy_index import FuzzyIndex
+from src.lru_cache import LRUCache
+from src.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Stage timings; bound once since exact hits take only microseconds
+_EXACT_SECONDS = STAGE_SECONDS.labels("cache_exact")
+_FUZZY_SECONDS = STAGE_SECONDS.labels("cache_fuzzy")
+
+# Approximate per-entry bookkeeping cost of a hot-tier row, in bytes
+_ROW_OVERHEAD = 200
+
+# Names added since the last merge are kept in a small delta index; it is
+# merged into a fresh copy of the base once it exceeds this many names
+_DELTA_MAX_NAMES = 4096
+
+def _legacy_name(food_name: str) -> str:
+    """Key before canonicalization, kept to count the exact hits it added"""
+    return food_name.lower().strip()
+
+def _row_size(product_name, nutriments_json: Optional[str], code) -> int:
+    """Approximate memory footprint of a decoded cache row"""
+    return _ROW_OVERHEAD + len(str(product_name)) + len(nutriments_json or "") + len(str(code))
+
+class _NameSnapshot:
+    """
+    Immutable view of the cached normalized names.
+    
+    The writer never modifies a published snapshot: it publishes a new one with
+    a copied (small) delta index, and only occasionally merges the delta into a
+    copy of the base. Readers grab the current snapshot without locking.
+    """
+    
+    __slots__ = ("base", "delta")
+    
+    def __init__(self, base: FuzzyIndex, delta: Optional[FuzzyIndex] = None):
+        self.base = base
+        self.delta = delta if delta is not None else FuzzyIndex()
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.delta or name in self.base
+    
+    def __len__(self) -> int:
+        return len(self.base) + len(self.delta)
+    
+    @property
+    def names(self) -> list:
+        return self.base.names + self.delta.names
+    
+    def extract_one(self, query: str, score_cutoff: float):
+        """Best fuzzy match over base and delta; ties go to the older name"""
+        best = self.base.extract_one(query, score_cutoff) if self.base else None
+        if self.delta:
+            result = self.delta.extract_one(query, score_cutoff)
+            if result and (best is None or result[1] > best[1]):
+                best = (result[0], result[1], len(self.base) + result[2])
+        return best
+    
+    def with_names(self, names: Iterable[str]) -> "_NameSnapshot":
+        """New snapshot that also contains the given names"""
+        new_names = [name for name in dict.fromkeys(names) if name not in self]
+        if not new_names:
+            return self
+        if len(self.delta) + len(new_names) > _DELTA_MAX_NAMES:
+            base = self.base.copy()
+            for name in self.delta.names + new_names:
+                base.add(name)
+            return _NameSnapshot(base)
+        delta = self.delta.copy()
+        for name in new_names:
+            delta.add(name)
+        return _NameSnapshot(self.base, delta)
 
 class FoodCache:
-    """Manages cached food lookup results in SQLite database"""
+    """
+    Manages cached food lookup results in SQLite database.
     
-    def __init__(self, db_path: Optional[str] = None):
+    Rows are keyed by the canonical form of the food name (see
+    src.canonicalize), so "2 cups of apples" finds a row stored as "Apple"
+    on the exact path. Databases keyed by an older canonical version are
+    rekeyed on open.
+    
+    Decoded rows are kept in a bounded in-memory LRU hot tier, so repeated hits
+    run no SQL and no JSON decoding; SQLite is the persistent backing store.
+    
+    Other processes: the name snapshot is loaded on open and extended with
+    every add made through this instance. Rows committed by other processes
+    (other prefork workers writing back results, scripts/init_cache.py run
+    against a live database) are picked up within refresh_interval seconds:
+    lookups then compare SQLite's PRAGMA data_version and, if another
+    connection committed, load the rows added since the last load.
+    
+    Thread safety: reads check out one of at most reader_pool_size SQLite
+    connections, all writes go through one connection serialized by a lock,
+    and the in-memory name index is an immutable snapshot replaced on write,
+    so lookups never block on writers. The pool is shared by all threads, so
+    a server that starts a thread per request does not open a connection per
+    request.
+    
+    Durability: the database runs in WAL mode with synchronous=NORMAL. In the
+    default write-through mode every add is committed before it returns and
+    survives a crash of the process; a power loss or OS crash may roll back the
+    most recent commits. In write-behind mode adds are visible to lookups
+    immediately but are buffered in memory and written in one transaction once
+    flush_max_items are pending, every flush_interval seconds, and on flush()
+    or close(). A process crash loses the buffered adds, i.e. at most
+    flush_max_items items or flush_interval seconds of writes.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, hot_cache_max_items: Optional[int] = 100000,
+                 hot_cache_max_bytes: Optional[int] = 64 * 1024 * 1024, write_behind: bool = False,
+                 flush_max_items: int = 500, flush_interval: float = 1.0, reader_pool_size: int = 8,
+                 refresh_interval: Optional[float] = 1.0):
         """
         Initialize the food cache.
         
         Args:
             db_path: Path to SQLite database file. Defaults to cache/food_cache.db
+            hot_cache_max_items: Maximum number of decoded rows held in memory
+            hot_cache_max_bytes: Maximum approximate size of the decoded rows held in memory
+            write_behind: Buffer adds and write them in batches instead of
+                committing each one
+            flush_max_items: Write-behind buffer size that triggers a flush
+            flush_interval: Longest time in seconds an add stays buffered
+            reader_pool_size: Maximum number of read connections; further
+                concurrent reads wait for a free one
+            refresh_interval: Seconds between checks for rows committed by
+                other processes, or None to never check
         """
         if db_path is None:
             # Resolve path relative to backend root
@@ -27,14 +151,45 @@ class FoodCache:
             db_path = str(cache_dir / "food_cache.db")
         
         self.db_path = db_path
+        # Single writer connection; only used while holding _write_lock
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        self.reader_pool_size = max(1, reader_pool_size)
+        # Idle read connections; every connection opened is also in _readers
+        self._reader_pool = queue.Queue()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self.hot_cache = LRUCache(max_items=hot_cache_max_items, max_bytes=hot_cache_max_bytes)
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        # Exact hits whose lowercased text is not a stored name
+        self.canonical_hits = 0
+        self.write_behind = write_behind
+        self.flush_max_items = flush_max_items
+        self.flush_interval = flush_interval
+        # Buffered write-behind rows by food_name, and decoded by normalized name
+        self._pending = {}
+        self._pending_rows = {}
+        self._write_lock = threading.RLock()
+        self._closed = threading.Event()
+        self.refresh_interval = refresh_interval
+        self._next_refresh = time.monotonic() + (refresh_interval or 0.0)
         self._init_database()
         self._load_cache_into_memory()
+        
+        self._flusher = None
+        if write_behind:
+            self._flusher = threading.Thread(target=self._flush_periodically,
+                                             name="food-cache-flusher", daemon=True)
+            self._flusher.start()
     
     def _init_database(self):
         """Initialize the database schema if it doesn't exist"""
         cursor = self.conn.cursor()
+        # WAL lets readers proceed during writes; NORMAL skips the fsync per commit
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS food_cache (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -53,18 +208,108 @@ class FoodCache:
             ON food_cache(normalized_name)
         """)
         self.conn.commit()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version != CANONICAL_VERSION:
+            self._rekey(version)
+    
+    def _rekey(self, version: int):
+        """Recompute normalized_name of every row for the current canonical version"""
+        rows = self.conn.execute("SELECT id, food_name FROM food_cache").fetchall()
+        with self.conn:
+            self.conn.executemany("UPDATE food_cache SET normalized_name = ? WHERE id = ?",
+                                  [(self._normalize_name(row['food_name']), row['id']) for row in rows])
+            self.conn.execute(f"PRAGMA user_version = {CANONICAL_VERSION:d}")
+        if rows:
+            logger.info("Rekeyed %d food cache rows from canonical version %d to %d",
+                        len(rows), version, CANONICAL_VERSION)
     
     def _load_cache_into_memory(self):
         """Load all cached food names into memory for fast fuzzy matching"""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT food_name, normalized_name FROM food_cache")
+        # Read before the rows, so a commit in between is seen by the next refresh
+        self._data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+        cursor.execute("SELECT id, food_name, normalized_name FROM food_cache")
         rows = cursor.fetchall()
-        self.cached_foods = {row['normalized_name']: row['food_name'] for row in rows}
-        self.food_names_list = list(self.cached_foods.keys())
+        self._names = _NameSnapshot(FuzzyIndex(row['normalized_name'] for row in rows))
+        self._legacy_names = {_legacy_name(row['food_name']) for row in rows}
+        self._max_id = max((row['id'] for row in rows), default=0)
+    
+    def refresh(self) -> int:
+        """
+        Load the names of rows committed by other connections since the last load.
+        
+        Rows replaced under an existing name keep serving the decoded row held
+        in the hot tier until it is evicted.
+        
+        Returns:
+            Number of rows loaded
+        """
+        with self._write_lock:
+            # Only changes when another connection commits
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return 0
+            self._data_version = version
+            rows = self.conn.execute("SELECT id, food_name, normalized_name FROM food_cache WHERE id > ?",
+                                     (self._max_id,)).fetchall()
+            if rows:
+                self._names = self._names.with_names(row['normalized_name'] for row in rows)
+                self._legacy_names.update(_legacy_name(row['food_name']) for row in rows)
+                self._max_id = max(row['id'] for row in rows)
+            return len(rows)
+    
+    def _refresh_if_due(self):
+        """Refresh at most every refresh_interval, skipping while a writer holds the lock"""
+        if self.refresh_interval is None or time.monotonic() < self._next_refresh:
+            return
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            self.refresh()
+        except sqlite3.Error as e:
+            logger.error("Food cache refresh error: %s", e)
+        finally:
+            self._write_lock.release()
+    
+    @contextmanager
+    def _reading(self):
+        """Check out a read connection from the pool, opening one while below its size"""
+        if self.db_path == ":memory:":
+            # Private in-memory databases cannot be shared between connections
+            yield self.conn
+            return
+        try:
+            conn = self._reader_pool.get_nowait()
+        except queue.Empty:
+            conn = self._open_reader()
+            if conn is None:
+                conn = self._reader_pool.get()
+        try:
+            yield conn
+        finally:
+            self._reader_pool.put(conn)
+    
+    def _open_reader(self) -> Optional[sqlite3.Connection]:
+        """New read connection, or None once reader_pool_size are open"""
+        with self._readers_lock:
+            if len(self._readers) >= self.reader_pool_size:
+                return None
+            # Connections move between threads as they are checked out
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only=ON")
+            self._readers.append(conn)
+            return conn
+    
+    @property
+    def food_names_list(self):
+        """Cached normalized names in insertion order"""
+        return self._names.names
     
     def _normalize_name(self, food_name: str) -> str:
-        """Normalize food name for matching (lowercase, strip whitespace)"""
-        return food_name.lower().strip()
+        """Normalize food name for matching (canonical form)"""
+        return canonicalize(food_name)
     
     def get_cached_result(self, food_text: str, threshold: float = 85.0) -> Optional[Tuple[str, Optional[dict], float, str]]:
         """
@@ -79,63 +324,81 @@ class FoodCache:
             None otherwise
         """
         normalized = self._normalize_name(food_text)
+        self._refresh_if_due()
+        names = self._names
         
-        # Try exact match first
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT product_name, nutriments_info, similarity_score, code
-            FROM food_cache
-            WHERE normalized_name = ?
-        """, (normalized,))
-        
-        row = cursor.fetchone()
+        # Try exact match first; the in-memory key set avoids SQL on misses
+        start = time.perf_counter()
+        row = self._get_row(normalized) if normalized in names else None
+        _EXACT_SECONDS.observe(time.perf_counter() - start)
         if row:
-            nutriments = json.loads(row['nutriments_info']) if row['nutriments_info'] else None
-            return (
-                row['product_name'],
-                nutriments,
-                float(row['similarity_score']),
-                row['code']
-            )
+            self.exact_hits += 1
+            if _legacy_name(food_text) not in self._legacy_names:
+                self.canonical_hits += 1
+            return row
         
         # If no exact match, try fuzzy matching
-        if self.food_names_list:
-            # Use rapidfuzz to find best match
-            result = process.extractOne(
-                normalized,
-                self.food_names_list,
-                scorer=fuzz.ratio,
-                score_cutoff=threshold
-            )
+        if names:
+            # Only names that can still reach the threshold are scored
+            start = time.perf_counter()
+            result = names.extract_one(normalized, score_cutoff=threshold)
+            _FUZZY_SECONDS.observe(time.perf_counter() - start)
             
             if result:
                 matched_normalized, score, _ = result
-                matched_food_name = self.cached_foods[matched_normalized]
-                
-                # Get the full result from database
-                cursor.execute("""
-                    SELECT product_name, nutriments_info, similarity_score, code
-                    FROM food_cache
-                    WHERE food_name = ?
-                """, (matched_food_name,))
-                
-                row = cursor.fetchone()
+                row = self._get_row(matched_normalized)
                 if row:
-                    nutriments = json.loads(row['nutriments_info']) if row['nutriments_info'] else None
-                    # Use the fuzzy match score as similarity
+                    self.fuzzy_hits += 1
+                    product_name, nutriments, similarity, code = row
+                    # A fuzzy hit is no more confident than the stored match
+                    # (e.g. a written-back 0.6 semantic result) or the name match
                     return (
-                        row['product_name'],
+                        product_name,
                         nutriments,
-                        score / 100.0,  # Convert to 0-1 range
-                        row['code']
+                        min(similarity, score / 100.0),  # Convert to 0-1 range
+                        code
                     )
         
+        self.misses += 1
         return None
     
+    def _get_row(self, normalized: str) -> Optional[Tuple[str, Optional[dict], float, str]]:
+        """Fetch a decoded cache row, from the hot tier when possible"""
+        row = self.hot_cache.get(normalized)
+        if row is not None:
+            return row
+        
+        row = self._pending_rows.get(normalized)
+        if row is not None:
+            return row
+        
+        with self._reading() as conn:
+            db_row = conn.execute("""
+                SELECT product_name, nutriments_info, similarity_score, code
+                FROM food_cache
+                WHERE normalized_name = ?
+            """, (normalized,)).fetchone()
+        if not db_row:
+            return None
+        nutriments = json.loads(db_row['nutriments_info']) if db_row['nutriments_info'] else None
+        row = (
+            db_row['product_name'],
+            nutriments,
+            float(db_row['similarity_score']),
+            db_row['code']
+        )
+        self.hot_cache.put(normalized, row,
+                           size=_row_size(db_row['product_name'], db_row['nutriments_info'], db_row['code']))
+        return row
+    
     def is_cached(self, food_text: str) -> bool:
         """Check if a food item exists in cache"""
         return self.get_cached_result(food_text) is not None
     
+    def has_exact(self, food_text: str) -> bool:
+        """Check if a food item is cached under its exact normalized name"""
+        return self._normalize_name(food_text) in self._names
+    
     def add_to_cache(self, food_name: str, product_name: str, 
                      nutriments_info: Optional[dict], code: str, 
                      similarity_score: float = 1.0):
@@ -149,39 +412,114 @@ class FoodCache:
             code: Product code
             similarity_score: Similarity score from semantic search
         """
-        normalized = self._normalize_name(food_name)
-        nutriments_json = json.dumps(nutriments_info) if nutriments_info else None
-        
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO food_cache 
-            (food_name, normalized_name, product_name, nutriments_info, code, similarity_score)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (food_name, normalized, product_name, nutriments_json, code, similarity_score))
+        self.add_many_to_cache([(food_name, product_name, nutriments_info, code, similarity_score)])
+    
+    def add_many_to_cache(self, items: Iterable[Tuple[str, str, Optional[dict], str, float]]):
+        """
+        Add several food items to the cache in a single transaction.
         
-        self.conn.commit()
+        Args:
+            items: Iterable of (food_name, product_name, nutriments_info, code,
+                similarity_score) tuples
+        """
+        rows = []
+        decoded = []
+        for food_name, product_name, nutriments_info, code, similarity_score in items:
+            normalized = self._normalize_name(food_name)
+            nutriments_json = json.dumps(nutriments_info) if nutriments_info else None
+            rows.append((food_name, normalized, product_name, nutriments_json, code, similarity_score))
+            decoded.append((product_name, nutriments_info, float(similarity_score), code))
+        if not rows:
+            return
         
-        # Update in-memory cache
-        self.cached_foods[normalized] = food_name
-        if normalized not in self.food_names_list:
-            self.food_names_list.append(normalized)
+        with self._write_lock:
+            if self.write_behind:
+                for row, decoded_row in zip(rows, decoded):
+                    self._pending[row[0]] = row
+                    self._pending_rows[row[1]] = decoded_row
+                if len(self._pending) >= self.flush_max_items:
+                    self.flush()
+            else:
+                self._write_rows(rows)
+            
+            # Update in-memory cache and publish the new name snapshot
+            for (_, normalized, product_name, nutriments_json, code, _), row in zip(rows, decoded):
+                self.hot_cache.put(normalized, row, size=_row_size(product_name, nutriments_json, code))
+            self._names = self._names.with_names(row[1] for row in rows)
+            self._legacy_names.update(_legacy_name(row[0]) for row in rows)
+    
+    def _write_rows(self, rows: list):
+        """Write rows to SQLite in one transaction"""
+        with self.conn:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO food_cache 
+                (food_name, normalized_name, product_name, nutriments_info, code, similarity_score)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+    
+    def flush(self):
+        """Write all buffered write-behind rows to SQLite in one transaction"""
+        with self._write_lock:
+            if not self._pending:
+                return
+            self._write_rows(list(self._pending.values()))
+            self._pending = {}
+            self._pending_rows = {}
+    
+    def _flush_periodically(self):
+        """Background loop flushing the write-behind buffer every flush_interval"""
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                # Rows stay buffered and are retried on the next flush
+                logger.error("Food cache flush error: %s", e)
     
     def get_cache_size(self) -> int:
         """Get the number of items in the cache"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT COUNT(*) as count FROM food_cache")
-        return cursor.fetchone()['count']
+        self.flush()
+        with self._reading() as conn:
+            return conn.execute("SELECT COUNT(*) as count FROM food_cache").fetchone()['count']
     
     def clear_cache(self):
         """Clear all items from the cache"""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM food_cache")
-        self.conn.commit()
-        self.cached_foods = {}
-        self.food_names_list = []
+        with self._write_lock:
+            self._pending = {}
+            self._pending_rows = {}
+            cursor = self.conn.cursor()
+            cursor.execute("DELETE FROM food_cache")
+            self.conn.commit()
+            self._names = _NameSnapshot(FuzzyIndex())
+            self._legacy_names = set()
+            self.hot_cache.clear()
+    
+    def stats(self) -> dict:
+        """Hit counters of the cache and its in-memory hot tier"""
+        lookups = self.exact_hits + self.fuzzy_hits + self.misses
+        return {
+            "size": len(self._names),
+            "exact_hits": self.exact_hits,
+            "canonical_hits": self.canonical_hits,
+            "canonical_hit_ratio": self.canonical_hits / lookups if lookups else 0.0,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.exact_hits + self.fuzzy_hits) / lookups if lookups else 0.0,
+            "pending_writes": len(self._pending),
+            "hot_tier": self.hot_cache.stats()
+        }
     
     def close(self):
-        """Close the database connection"""
+        """Flush buffered writes and close the database connection"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
         self.conn.close()
 
 
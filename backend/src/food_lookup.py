@@ -1,73 +1,538 @@
-from sentence_transformers import SentenceTransformer, util
-import pandas as pd
+import atexit
+import logging
 import numpy as np
-from pathlib import Path
-from datasets import load_from_disk
-import torch
+from src import config
 from src.food_cache import FoodCache
+from src.embedding_cache import EmbeddingCache
+from src.embedding_index import EmbeddingIndex
+from src.encoders import encoder_id, load_encoder
+from src.ann_index import load_search_index
+from src.analysemacro import analyse_macro
+from src.barcode_index import BarcodeIndex
+from src.batcher import BatchTimeout, MicroBatcher
+from src.canonicalize import canonicalize
+from src.loader import Component, ComponentNotReady
+from src.macro_matrix import NUTRIENTS, MacroMatrix
+from src.metrics import REGISTRY, span
+from src.product_store import ProductStore
+from src.single_flight import SingleFlight
+from src.write_back import NOT_FOUND, WriteBackPolicy
 
-# Resolve paths relative to backend root
-backend_root = Path(__file__).parent.parent
-embeddings_dir = backend_root / "embeddings"
+logger = logging.getLogger(__name__)
 
-# Load the dataset and model
-loaded_dataset = load_from_disk(str(embeddings_dir / 'total_dataset')) # Total dataset
-model = SentenceTransformer("all-MiniLM-L6-v2")
-embeds = np.load(str(embeddings_dir / 'embeddings_only.npy')) # Only embeddings
+# Failed semantic searches by lookup path; their queries are negative-cached
+SEARCH_ERRORS = REGISTRY.counter("foodscanner_search_errors_total",
+                                 "Semantic searches that raised an error", ("path",))
 
-# Initialize cache
-food_cache = FoodCache()
+embeddings_dir = config.EMBEDDINGS_DIR
 
-def lookup(input_text):
+# Heavy components are built on first use, or in background threads once the
+# server calls start_background_loading(). Nothing is loaded at import time.
+
+def _load_food_cache():
+    food_cache = FoodCache(config.FOOD_CACHE_DB,
+                           hot_cache_max_items=config.FOOD_CACHE_HOT_MAX_ITEMS,
+                           hot_cache_max_bytes=config.FOOD_CACHE_HOT_MAX_BYTES,
+                           write_behind=config.FOOD_CACHE_WRITE_BEHIND,
+                           flush_max_items=config.FOOD_CACHE_FLUSH_MAX_ITEMS,
+                           flush_interval=config.FOOD_CACHE_FLUSH_INTERVAL,
+                           reader_pool_size=config.FOOD_CACHE_READERS,
+                           refresh_interval=config.FOOD_CACHE_REFRESH_INTERVAL)
+    # Persist buffered write-behind rows on interpreter exit
+    atexit.register(food_cache.close)
+    return food_cache
+
+def _load_product_store():
+    # Row-addressable product store, packed from the total dataset on first run
+    product_store_dir = embeddings_dir / 'product_store'
+    if not ProductStore.exists(product_store_dir):
+        from datasets import load_from_disk
+        ProductStore.build_from_dataset(load_from_disk(str(embeddings_dir / 'total_dataset')), product_store_dir)
+    return ProductStore(product_store_dir)
+
+def _load_barcode_index():
+    # Barcode -> product row index over the product store, built on first run
+    barcode_index_dir = embeddings_dir / 'barcode_index'
+    if not BarcodeIndex.exists(barcode_index_dir):
+        BarcodeIndex.build_from_store(product_store_component.get(), barcode_index_dir)
+    return BarcodeIndex(barcode_index_dir)
+
+def _load_macro_matrix():
+    # Key nutrients of every product row, extracted from the product store on first run
+    macro_matrix_dir = embeddings_dir / 'macro_matrix'
+    if not MacroMatrix.exists(macro_matrix_dir):
+        MacroMatrix.build_from_store(product_store_component.get(), macro_matrix_dir)
+    return MacroMatrix(macro_matrix_dir)
+
+def _load_model():
+    # Query encoder: sentence-transformers (torch) or the offline ONNX export
+    return load_encoder(config.ENCODER_BACKEND, onnx_dir=config.ONNX_ENCODER_DIR,
+                        quantized=config.ONNX_QUANTIZED, threads=config.ONNX_THREADS)
+
+def _load_embedding_cache():
+    # Memoized query embeddings, optionally persisted across restarts
+    persist_dir = config.EMBEDDING_CACHE_DIR if config.EMBEDDING_CACHE_PERSIST else None
+    return EmbeddingCache(max_bytes=config.EMBEDDING_CACHE_MAX_BYTES, persist_dir=persist_dir,
+                          max_persisted=config.EMBEDDING_CACHE_MAX_PERSISTED,
+                          model_name=encoder_id(config.ENCODER_BACKEND, config.ONNX_QUANTIZED))
+
+def _load_search_index():
+    # Pre-normalized, memory-mapped embeddings (sidecar is built on first run)
+    embedding_index = EmbeddingIndex(embeddings_dir / 'embeddings_only.npy')
+    # Exact search by default, or an offline-built ANN index selected by config
+    return load_search_index(config.INDEX_MODE, embeddings_dir, embedding_index,
+                             nprobe=config.IVF_NPROBE, ef=config.HNSW_EF, threads=config.SEARCH_THREADS)
+
+food_cache_component = Component("food_cache", _load_food_cache)
+product_store_component = Component("product_store", _load_product_store)
+model_component = Component("model", _load_model)
+embedding_cache_component = Component("embedding_cache", _load_embedding_cache)
+search_index_component = Component("search_index", _load_search_index)
+barcode_index_component = Component("barcode_index", _load_barcode_index)
+macro_matrix_component = Component("macro_matrix", _load_macro_matrix)
+components = [food_cache_component, product_store_component, model_component, embedding_cache_component,
+              search_index_component, barcode_index_component, macro_matrix_component]
+
+# Semantic search needs all of these; cache hits only need the food cache
+_semantic_components = [product_store_component, model_component, search_index_component]
+
+# Scripts load components synchronously on first use; the server switches to
+# background loading and answers from the cache alone until the model is ready
+_block_on_load = True
+
+def start_background_loading():
+    """Start loading every component in background threads without blocking"""
+    global _block_on_load
+    _block_on_load = False
+    for component in components:
+        component.start()
+
+def load_shared_components():
+    """
+    Load the read-only components in this process before it forks workers.
+    
+    The corpus, product store and indexes are memory-mapped files and the
+    model weights are never written after loading, so forked workers share
+    one copy of each. Components holding SQLite connections or threads
+    (food cache, embedding cache) are left for every worker to load.
+    
+    Returns:
+        list: Names of the loaded components
+    """
+    shared = [product_store_component, search_index_component, barcode_index_component, macro_matrix_component]
+    # onnxruntime creates its thread pools with the session, and threads do
+    # not survive fork; ONNX sessions are created in each worker instead
+    if config.ENCODER_BACKEND != "onnx":
+        shared.append(model_component)
+    for component in shared:
+        component.get()
+    return [component.name for component in shared]
+
+def readiness():
+    """
+    Load state of every component.
+    
+    Returns:
+        tuple: (all components ready, {component name: status dict})
+    """
+    return all(c.is_ready for c in components), {c.name: c.status() for c in components}
+
+def get_food_cache():
+    """The food cache, loaded on first use"""
+    return food_cache_component.get(block=_block_on_load)
+
+def _require_semantic_search():
+    """Raise ComponentNotReady unless semantic search can run (or load it when blocking)"""
+    for component in _semantic_components:
+        component.get(block=_block_on_load)
+
+def semantic_search(texts, encode_batch_size=32):
+    """
+    Encode texts in one batch and find the best matching product for each.
+    
+    Args:
+        texts (list): Food descriptions to search for
+        encode_batch_size (int): Batch size used inside model.encode
+        
+    Returns:
+        list: One (product_name, nutriments_info, similarity_score, code) tuple
+        per text, in input order
+    """
+    return [hits[0] if hits else NOT_FOUND for hits in semantic_search_top_k(texts, 1, encode_batch_size)]
+
+def semantic_search_top_k(texts, k, encode_batch_size=32):
+    """
+    Encode texts in one batch and find the k best matching products for each.
+    The top k come from one partial selection over each score vector, and the
+    rows of all hits are fetched from the product store in one bulk read.
+    
+    Args:
+        texts (list): Food descriptions to search for
+        k (int): Products per text
+        encode_batch_size (int): Batch size used inside model.encode
+        
+    Returns:
+        list: Per text, in input order, a list of up to k (product_name,
+        nutriments_info, similarity_score, code) tuples by descending score
+    """
+    model = model_component.get()
+    product_store = product_store_component.get()
+    # Only queries whose embedding is not memoized are encoded
+    with span("encode"):
+        queries = embedding_cache_component.get().encode(
+            list(texts),
+            lambda missing: model.encode(missing, batch_size=encode_batch_size)
+        )
+    
+    # Cosine similarity against the normalized corpus (exact or approximate)
+    with span("search"):
+        scores, indices = search_index_component.get().search(queries, k=k)
+    
+    with span("row_fetch"):
+        # Approximate indexes pad missing hits with -1
+        found = indices >= 0
+        rows = iter(product_store.get_many(indices[found]))
+        results = []
+        for text_scores, text_found in zip(scores, found):
+            results.append([
+                (product_name, nutriments_info, float(score), code)
+                for score, (product_name, nutriments_info, code) in zip(text_scores[text_found], rows)
+            ])
+    return results
+
+# Concurrent single-item misses share one encode and top-k pass
+semantic_batcher = None
+if config.MICROBATCH_ENABLED:
+    semantic_batcher = MicroBatcher(semantic_search, max_batch_size=config.MICROBATCH_MAX_SIZE,
+                                    max_wait_ms=config.MICROBATCH_WAIT_MS, name="semantic-search",
+                                    timeout=config.MICROBATCH_TIMEOUT)
+
+# Concurrent lookups of the same canonical text share one computation
+lookup_flight = None
+if config.SINGLE_FLIGHT:
+    lookup_flight = SingleFlight(timeout=config.SINGLE_FLIGHT_TIMEOUT)
+
+# Decides which semantic results are written into the food cache and which
+# queries are answered from the negative cache
+write_back_policy = WriteBackPolicy(write_back=config.WRITE_BACK,
+                                    min_score=config.WRITE_BACK_MIN_SCORE,
+                                    admit_after=config.WRITE_BACK_ADMIT_AFTER,
+                                    negative_ttl=config.NEGATIVE_CACHE_TTL,
+                                    error_ttl=config.NEGATIVE_CACHE_ERROR_TTL,
+                                    max_tracked=config.WRITE_BACK_MAX_TRACKED)
+
+def _write_back(food_cache, results):
+    """Add the semantic results admitted by the write-back policy to the food cache"""
+    to_cache = []
+    for text, result in results:
+        if write_back_policy.admit(text, result):
+            product_name, nutriments_info, similarity_score, code = result
+            to_cache.append((text, product_name, nutriments_info, code, similarity_score))
+    food_cache.add_many_to_cache(to_cache)
+
+def lookup(input_text, k=None):
     """
     Look up food information based on input text using semantic similarity.
     First checks cache for fast lookup, then falls back to semantic search.
+    Confident results of repeated queries are written back to the cache, and
+    queries that found nothing are remembered by the negative cache.
+    Concurrent lookups of the same canonical text run once and share the result.
     
     Args:
         input_text (str): The food description to search for
+        k (int): Return up to k alternatives instead of the best product. A
+            cached result comes first, followed by the best semantic matches;
+            this always runs the model
         
     Returns:
-        tuple: (product_name, nutriments_info, similarity_score, code)
+        tuple: (product_name, nutriments_info, similarity_score, code), or
+        with k a list of up to k such tuples, best first
+    
+    Raises:
+        ComponentNotReady: In background-loading mode, the cache missed and
+            the model or corpus is still loading
+        FlightTimeout: An identical lookup was already running and did not
+            finish within FOODSCANNER_SINGLE_FLIGHT_TIMEOUT
+        BatchTimeout: The micro-batch searching the text did not finish
+            within FOODSCANNER_MICROBATCH_TIMEOUT
     """
+    if lookup_flight is None:
+        return _lookup(input_text, k)
+    key = canonicalize(input_text) if k is None else (canonicalize(input_text), k)
+    return lookup_flight.do(key, _lookup, input_text, k)
+
+def _lookup(input_text, k=None):
+    """lookup() without coalescing"""
     # Check cache first for fast lookup
+    food_cache = get_food_cache()
     cached_result = food_cache.get_cached_result(input_text)
+    if k is not None:
+        return _lookup_alternatives(food_cache, input_text, cached_result, k)
     if cached_result:
         return cached_result
     
+    # Queries that recently found nothing are not searched again
+    if write_back_policy.is_negative(input_text):
+        return NOT_FOUND
+    
     # If not in cache, perform semantic search
+    _require_semantic_search()
     try:
-        # Encode the input text
-        sentences = [input_text]
-        embeddings = model.encode(sentences, convert_to_tensor=True, dtype=torch.float32)
-        
-        # Move to CPU to match the stored embeddings
-        embeddings = embeddings.cpu()
-        
-        # Ensure embeddings are 2D (batch_size x embedding_dim)
-        if embeddings.dim() == 1:
-            embeddings = embeddings.unsqueeze(0)
-        
-        # Convert numpy embeddings to tensor and ensure proper shape
-        embeds_tensor = torch.tensor(embeds, dtype=torch.float32)
-        if embeds_tensor.dim() == 1:
-            embeds_tensor = embeds_tensor.unsqueeze(0)
-        
-        # Calculate cosine similarity
-        cosine_scores = util.cos_sim(embeddings, embeds_tensor)
-        
-        # Get the best match
-        max_index = torch.argmax(cosine_scores).item()
-        similarity_score = float(torch.max(cosine_scores).item())
+        if semantic_batcher is not None:
+            result = semantic_batcher.wait(semantic_batcher.submit(input_text))
+        else:
+            result = semantic_search([input_text])[0]
+    except BatchTimeout:
+        # Overload, not a bad query: answered with 503 and not negative-cached
+        raise
+    except Exception:
+        logger.exception("Semantic search failed for %r", input_text)
+        SEARCH_ERRORS.inc("lookup")
+        write_back_policy.record_error(input_text)
+        return NOT_FOUND
+    
+    _write_back(food_cache, [(input_text, result)])
+    return result
+
+def _lookup_alternatives(food_cache, input_text, cached_result, k):
+    """Top-k results for lookup(); the cached result, if any, stays first"""
+    if cached_result is None and write_back_policy.is_negative(input_text):
+        return []
+    try:
+        _require_semantic_search()
+    except ComponentNotReady:
+        # The best product is known, the alternatives have to wait
+        if cached_result is not None:
+            return [cached_result]
+        raise
+    try:
+        hits = semantic_search_top_k([input_text], k)[0]
+    except Exception:
+        logger.exception("Top-%d semantic search failed for %r", k, input_text)
+        SEARCH_ERRORS.inc("alternatives")
+        write_back_policy.record_error(input_text)
+        return [cached_result] if cached_result is not None else []
+    
+    if cached_result is None:
+        _write_back(food_cache, [(input_text, hits[0] if hits else NOT_FOUND)])
+        return hits
+    return [cached_result] + [hit for hit in hits if hit[3] != cached_result[3]][:k - 1]
+
+def lookup_many(texts, partial=False):
+    """
+    Look up several food descriptions at once.
+    Cache hits are resolved first; all misses are encoded in one batch, scored
+    in one matrix multiply, and the admitted results are written back to the
+    cache in one transaction. Misses whose canonical text is already being
+    looked up by another request wait for that result instead.
+    
+    Args:
+        texts (list): Food descriptions to search for
+        partial (bool): While the model or corpus is still loading, return
+            None for the misses instead of raising, so the hits are served
         
-        # Get the product information
-        product_name = loaded_dataset["product_name"][max_index]
-        nutriments_info = loaded_dataset["nutriments"][max_index][0] if loaded_dataset["nutriments"][max_index] else None
-        code = loaded_dataset["code"][max_index]
+    Returns:
+        list: One (product_name, nutriments_info, similarity_score, code) tuple
+        per input text, in input order; None for misses that cannot be
+        searched yet when partial is set
+    
+    Raises:
+        ComponentNotReady: In background-loading mode, some texts missed the
+            cache and the model or corpus is still loading (unless partial)
+        FlightTimeout: A joined lookup did not finish in time
+    """
+    food_cache = get_food_cache()
+    results = [None] * len(texts)
+    
+    # Group misses by text so duplicates are only searched once
+    misses = {}
+    for position, text in enumerate(texts):
+        cached_result = food_cache.get_cached_result(text)
+        if cached_result:
+            results[position] = cached_result
+        elif write_back_policy.is_negative(text):
+            results[position] = NOT_FOUND
+        else:
+            misses.setdefault(text, []).append(position)
+    
+    if not misses:
+        return results
+    
+    # Lead a flight for each miss, or join the one already running
+    flights = {}
+    joined = []
+    if lookup_flight is not None:
+        for text in list(misses):
+            key = canonicalize(text)
+            future, leader = lookup_flight.begin(key)
+            if leader:
+                flights[text] = (key, future)
+            else:
+                joined.append((future, misses.pop(text)))
+    
+    try:
+        found = _search_misses(food_cache, list(misses)) if misses else []
+    except BaseException as e:
+        for key, future in flights.values():
+            lookup_flight.finish(key, future, error=e)
+        if not (partial and isinstance(e, ComponentNotReady)):
+            raise
+        flights = {}
+        found = [None] * len(misses)
+    
+    for (text, positions), result in zip(misses.items(), found):
+        if text in flights:
+            lookup_flight.finish(*flights[text], result)
+        for position in positions:
+            results[position] = result
+    # Led flights are finished before waiting, so batches never wait on each other
+    for future, positions in joined:
+        try:
+            result = lookup_flight.wait(future)
+        except ComponentNotReady:
+            if not partial:
+                raise
+            result = None
+        for position in positions:
+            results[position] = result
+    
+    return results
+
+def _search_misses(food_cache, texts):
+    """Semantic results of cache misses, written back as the policy admits"""
+    _require_semantic_search()
+    try:
+        found = semantic_search(texts)
+    except Exception:
+        logger.exception("Semantic search failed for a batch of %d texts", len(texts))
+        SEARCH_ERRORS.inc("batch")
+        for text in texts:
+            write_back_policy.record_error(text)
+        return [NOT_FOUND] * len(texts)
+    _write_back(food_cache, zip(texts, found))
+    return found
+
+def scan_local(barcode):
+    """
+    Look up a scanned barcode in the local barcode index over the product corpus.
+    
+    Returns:
+        tuple: (product_name, nutriments_info, code, "local"), or None if the
+        barcode is not in the corpus or the index is still loading
+    """
+    try:
+        barcode_index = barcode_index_component.get(block=_block_on_load)
+        product_store = product_store_component.get(block=_block_on_load)
+    except ComponentNotReady:
+        return None
+    row = barcode_index.lookup(barcode)
+    if row is None:
+        return None
+    product_name, nutriments_info, code = product_store.get(row)
+    return product_name, nutriments_info, code, "local"
+
+def scan_result_from_product(barcode, product):
+    """Scan result tuple for an Open Food Facts product, or None"""
+    if product is None:
+        return None
+    return product.get("product_name"), product.get("nutriments"), product.get("code", barcode), "open_food_facts"
+
+def scan(barcode, timeout=None):
+    """
+    Look up a scanned barcode.
+    The local barcode index over the product corpus is tried first; unknown
+    barcodes (or all of them while the index is loading) fall back to the
+    cached Open Food Facts API.
+    
+    Args:
+        barcode (str): Scanned barcode
+        timeout (float): Seconds to wait for the remote fallback
         
-        return product_name, nutriments_info, similarity_score, code
+    Returns:
+        tuple: (product_name, nutriments_info, code, source) where source is
+        "local" or "open_food_facts", or None if the barcode is unknown
+    """
+    found = scan_local(barcode)
+    if found is not None:
+        return found
+    return scan_result_from_product(barcode, analyse_macro(barcode, timeout=timeout))
+
+def meal_totals(codes, rows, grams, servings):
+    """
+    Macro-nutrient totals of a meal (or a day) from the precomputed matrix.
+    
+    Args:
+        codes (list): Barcode of every portion, or None where a row is given
+        rows (list): Product row of every portion whose code is None
+        grams (list): Grams of every portion, counted with per-100g values
+        servings (list): Servings of every portion, counted with per-serving values
         
-    except Exception as e:
-        return None, None, 0.0, None
+    Returns:
+        tuple: ({nutrient: total}, positions of portions whose product is not
+        in the corpus, positions of portions lacking a nutrient)
+    
+    Raises:
+        ComponentNotReady: The matrix or barcode index is still loading
+    """
+    macro_matrix = macro_matrix_component.get(block=_block_on_load)
+    rows = list(rows)
+    by_code = [position for position, code in enumerate(codes) if code is not None]
+    if by_code:
+        barcode_index = barcode_index_component.get(block=_block_on_load)
+        for position, row in zip(by_code, barcode_index.lookup_many(codes[position] for position in by_code)):
+            rows[position] = row
+    
+    with span("meal_totals"):
+        rows = np.array([-1 if row is None else row for row in rows], dtype=np.int64)
+        known = (rows >= 0) & (rows < len(macro_matrix))
+        totals, incomplete = macro_matrix.totals(rows[known], np.asarray(grams, dtype=np.float32)[known],
+                                                 np.asarray(servings, dtype=np.float32)[known])
+    return (dict(zip(NUTRIENTS, totals.tolist())), np.flatnonzero(~known).tolist(),
+            np.flatnonzero(known)[incomplete].tolist())
+
+def lookup_stats():
+    """Runtime statistics of the loaded lookup components"""
+    food_cache = food_cache_component.peek()
+    embedding_cache = embedding_cache_component.peek()
+    return {
+        "food_cache": food_cache.stats() if food_cache is not None else None,
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "batcher": semantic_batcher.stats() if semantic_batcher is not None else None,
+        "write_back": write_back_policy.stats(),
+        "single_flight": lookup_flight.stats() if lookup_flight is not None else None
+    }
+
+def _metric_samples():
+    """Cache and batcher statistics sampled at every /metrics scrape"""
+    stats = lookup_stats()
+    food_cache = stats["food_cache"]
+    if food_cache is not None:
+        yield "foodscanner_food_cache_entries", "Cached food names", "gauge", food_cache["size"]
+        yield "foodscanner_food_cache_exact_hits_total", "Exact food cache hits", "counter", food_cache["exact_hits"]
+        yield ("foodscanner_food_cache_canonical_hits_total",
+               "Exact food cache hits only found through query canonicalization", "counter",
+               food_cache["canonical_hits"])
+        yield "foodscanner_food_cache_fuzzy_hits_total", "Fuzzy food cache hits", "counter", food_cache["fuzzy_hits"]
+        yield "foodscanner_food_cache_misses_total", "Food cache misses", "counter", food_cache["misses"]
+        yield "foodscanner_food_cache_hit_ratio", "Food cache hit ratio", "gauge", food_cache["hit_ratio"]
+        yield "foodscanner_food_cache_hot_hit_ratio", "Hit ratio of the in-memory row tier", "gauge", food_cache["hot_tier"]["hit_ratio"]
+    embedding_cache = stats["embedding_cache"]
+    if embedding_cache is not None:
+        yield "foodscanner_embedding_cache_hit_ratio", "Query embedding cache hit ratio", "gauge", embedding_cache["hit_ratio"]
+    write_back = stats["write_back"]
+    yield "foodscanner_write_back_admitted_total", "Semantic results written back to the food cache", "counter", write_back["admitted"]
+    yield "foodscanner_negative_cache_hits_total", "Lookups answered from the negative cache", "counter", write_back["negative_hits"]
+    single_flight = stats["single_flight"]
+    if single_flight is not None:
+        yield "foodscanner_lookup_coalesced_total", "Lookups that joined an identical one in flight", "counter", single_flight["coalesced"]
+        yield "foodscanner_lookup_flight_timeouts_total", "Coalesced lookups that timed out waiting", "counter", single_flight["timeouts"]
+    batcher = stats["batcher"]
+    if batcher is not None:
+        yield "foodscanner_batcher_queue_depth", "Queries waiting for the micro-batcher", "gauge", batcher["queue_depth"]
+        yield "foodscanner_batcher_mean_batch_size", "Mean micro-batch size", "gauge", batcher["mean_batch_size"]
+        yield "foodscanner_batcher_timeouts_total", "Lookups that timed out waiting for their micro-batch", "counter", batcher["timeouts"]
+
+REGISTRY.add_collector(_metric_samples)
 
 # Test function (can be removed in production)
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+"""
+Fuzzy index module for candidate pruning before rapidfuzz scoring.
+Names are bucketed by length and indexed by character bigrams, so a query is
+only scored against names that can still reach the score cutoff. Results are
+identical to process.extractOne(query, names, scorer=fuzz.ratio, score_cutoff=...).
+"""
+
+from array import array
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Slack for float rounding; it only ever widens the candidate set
+_EPSILON = 1e-9
+
+# Below this many names a plain linear scan is faster than pruning
+LINEAR_SCAN_MAX_NAMES = 2000
+
+
+def _tokens(name: str) -> List[Tuple[str, int]]:
+    """
+    Character bigrams numbered by occurrence, e.g. "aaa" -> [("aa", 0), ("aa", 1)].
+
+    Numbering turns the bigram multiset into a set, so the size of the
+    intersection of two token sets is the number of shared bigram occurrences.
+    """
+    seen: Dict[str, int] = {}
+    tokens = []
+    for i in range(len(name) - 1):
+        bigram = name[i:i + 2]
+        occurrence = seen.get(bigram, 0)
+        seen[bigram] = occurrence + 1
+        tokens.append((bigram, occurrence))
+    return tokens
+
+
+class _LengthBucket:
+    """Names of one length with their bigram postings"""
+
+    __slots__ = ("ids", "postings")
+
+    def __init__(self):
+        # Global name ids; postings hold positions in this array.
+        # array('q') keeps postings compact and readable by NumPy without copies.
+        self.ids = array("q")
+        self.postings: Dict[Tuple[str, int], array] = {}
+
+    def add(self, name_id: int, tokens: List[Tuple[str, int]]):
+        position = len(self.ids)
+        self.ids.append(name_id)
+        for token in tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = array("q")
+            posting.append(position)
+
+    def copy(self) -> "_LengthBucket":
+        bucket = _LengthBucket()
+        bucket.ids = array("q", self.ids)
+        bucket.postings = {token: array("q", posting) for token, posting in self.postings.items()}
+        return bucket
+
+    def all_ids(self) -> np.ndarray:
+        return np.array(self.ids, dtype=np.int64)
+
+    def ids_sharing(self, tokens: List[Tuple[str, int]], required: int) -> np.ndarray:
+        """Ids of names sharing at least `required` of the tokens"""
+        postings = [self.postings[token] for token in tokens if token in self.postings]
+        if len(postings) < required:
+            return np.empty(0, dtype=np.int64)
+        positions = np.concatenate([np.frombuffer(posting, dtype=np.int64) for posting in postings])
+        counts = np.bincount(positions, minlength=len(self.ids))
+        return np.frombuffer(self.ids, dtype=np.int64)[counts >= required]
+
+
+class FuzzyIndex:
+    """
+    Length-bucketed bigram index over names, scored with fuzz.ratio.
+
+    fuzz.ratio is 100 * (1 - d / (len(a) + len(b))) where d is the
+    insertion/deletion distance. For a cutoff t this bounds both the length
+    of a match and, since each insertion or deletion destroys at most two
+    bigrams, the number of bigrams it must share with the query. Names that
+    cannot meet both bounds are never scored.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._buckets: Dict[int, _LengthBucket] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def add(self, name: str) -> bool:
+        """
+        Add a name to the index.
+
+        Returns:
+            True if the name was new, False if it was already indexed
+        """
+        if name in self._ids:
+            return False
+        name_id = len(self.names)
+        self.names.append(name)
+        self._ids[name] = name_id
+
+        bucket = self._buckets.get(len(name))
+        if bucket is None:
+            bucket = self._buckets[len(name)] = _LengthBucket()
+        bucket.add(name_id, _tokens(name))
+        return True
+
+    def copy(self) -> "FuzzyIndex":
+        """Independent copy that can be extended without affecting readers of this one"""
+        index = FuzzyIndex()
+        index.names = list(self.names)
+        index._ids = dict(self._ids)
+        index._buckets = {length: bucket.copy() for length, bucket in self._buckets.items()}
+        return index
+
+    def clear(self):
+        """Remove all names"""
+        self.names = []
+        self._ids = {}
+        self._buckets = {}
+
+    def candidates(self, query: str, score_cutoff: float) -> List[int]:
+        """
+        Ids of every name that could score at least score_cutoff, in insertion order.
+        """
+        query_length = len(query)
+        query_tokens = _tokens(query)
+        candidate_ids = []
+
+        for length, bucket in self._buckets.items():
+            total = query_length + length
+            if total == 0:
+                candidate_ids.append(bucket.all_ids())
+                continue
+
+            # Length filter: ratio <= 200 * min(len) / (len(a) + len(b))
+            if 200.0 * min(query_length, length) / total < score_cutoff - _EPSILON:
+                continue
+
+            # Count filter: shared bigrams >= max(len) - 1 - 2 * max_distance
+            max_distance = int((100.0 - score_cutoff) * total / 100.0 + _EPSILON)
+            required = max(query_length, length) - 1 - 2 * max_distance
+            if required <= 0:
+                candidate_ids.append(bucket.all_ids())
+            elif required <= len(query_tokens):
+                candidate_ids.append(bucket.ids_sharing(query_tokens, required))
+
+        if not candidate_ids:
+            return []
+        return np.sort(np.concatenate(candidate_ids)).tolist()
+
+    def extract_one(self, query: str, score_cutoff: float) -> Optional[Tuple[str, float, int]]:
+        """
+        Find the best scoring name, like process.extractOne with fuzz.ratio.
+
+        Args:
+            query: Normalized query text
+            score_cutoff: Minimum fuzz.ratio score (0-100)
+
+        Returns:
+            Tuple of (name, score, insertion index) or None
+        """
+        if score_cutoff <= 0 or len(self.names) <= LINEAR_SCAN_MAX_NAMES:
+            candidate_ids = range(len(self.names))
+        else:
+            candidate_ids = self.candidates(query, score_cutoff)
+        if not candidate_ids:
+            return None
+
+        if isinstance(candidate_ids, range):
+            choices = self.names
+        elif len(candidate_ids) == 1:
+            choices = [self.names[candidate_ids[0]]]
+        else:
+            choices = itemgetter(*candidate_ids)(self.names)
+        result = process.extractOne(
+            query,
+            choices,
+            scorer=fuzz.ratio,
+            score_cutoff=score_cutoff
+        )
+        if result is None:
+            return None
+        name, score, position = result
+        return name, score, candidate_ids[position]
@@ -0,0 +1,353 @@
+"""
+Request handlers shared by the Flask app (src/server.py) and the ASGI app
+(src/asgi.py), so both serve the same endpoint contract.
+Each handler takes the parsed JSON body (or query arguments) and returns a
+(body, status) pair; a str body is served as text/plain, anything else as JSON.
+"""
+
+import logging
+import os
+from typing import Optional, Tuple
+
+from src import config
+from src.analysemacro import analyse_macro, get_product_cache, prefetch_products
+from src.barcode_index import normalize_barcode
+from src.food_lookup import (lookup, lookup_many, lookup_stats, meal_totals, readiness, scan,
+                              start_background_loading)
+from src.log import setup_logging
+from src.metrics import REGISTRY, process_memory, span
+from src.profiler import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+Response = Tuple[object, int]
+
+ENDPOINTS = ["/test", "/food_lookup", "/food_lookup/batch", "/scan", "/meal_totals", "/stats", "/metrics", "/ready",
+             "/health"]
+
+# /meal_totals response keys of the macro matrix nutrients, as used by the tracker
+TOTAL_KEYS = {"energy-kcal": "calories", "proteins": "protein", "carbohydrates": "carbs", "fat": "fat"}
+
+# Seconds a client should wait before retrying while components load
+NOT_READY_RETRY_AFTER = 5
+
+# Seconds a client should wait before retrying a lookup that timed out
+# waiting for an identical one
+FLIGHT_TIMEOUT_RETRY_AFTER = 1
+
+# Seconds a client should wait before retrying a lookup that timed out
+# waiting for its micro-batch
+BATCH_TIMEOUT_RETRY_AFTER = 1
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "foodscanner_request_seconds",
+    "HTTP request latency by endpoint and status",
+    labelnames=("endpoint", "status")
+)
+
+
+def _memory_samples():
+    """Memory of this worker process, sampled at every /metrics scrape"""
+    memory = process_memory()
+    yield "foodscanner_process_resident_bytes", "Resident memory of this process", "gauge", memory.get("rss")
+    yield ("foodscanner_process_unique_bytes", "Memory of this process not shared with other processes",
+           "gauge", memory.get("uss"))
+
+
+REGISTRY.add_collector(_memory_samples)
+
+# Opt-in sampling profiler; collapsed stacks are served at /debug/profile
+profiler: Optional[SamplingProfiler] = None
+
+_started = False
+
+
+def start():
+    """Process startup shared by both apps: logging, profiler and background loading"""
+    global profiler, _started
+    if _started:
+        return
+    _started = True
+    setup_logging(config.LOG_LEVEL)
+    if config.PROFILER_ENABLED:
+        profiler = SamplingProfiler(interval=config.PROFILER_INTERVAL)
+        profiler.start()
+    # Load the model, corpus and cache in background threads so the server starts
+    # immediately; until they are ready only cache hits can be answered
+    if config.BACKGROUND_LOADING:
+        start_background_loading()
+
+
+def not_ready(error) -> Response:
+    """Body and status for lookups that need a component which is still loading"""
+    return {"error": str(error), "ready": False}, 503
+
+
+def flight_timeout(error) -> Response:
+    """Body and status for lookups that gave up waiting for an identical one"""
+    return {"error": str(error)}, 503
+
+
+def batch_timeout(error) -> Response:
+    """Body and status for lookups that gave up waiting for their micro-batch"""
+    return {"error": str(error)}, 503
+
+
+def server_error(error) -> Response:
+    logger.exception("Error: %s", error)
+    return {"error": str(error)}, 500
+
+
+def food_lookup(data, found=None) -> Response:
+    """
+    Look up one food text.
+
+    Args:
+        data: Parsed request body; an optional integer "k" asks for up to k
+            alternatives, returned as "results"
+        found: Lookup result already computed for this text and k (by an
+            identical request in flight); looked up when None
+
+    Raises:
+        ComponentNotReady: The cache missed while the model is still loading
+        FlightTimeout: An identical lookup in flight did not finish in time
+        BatchTimeout: The micro-batch searching the text did not finish in time
+    """
+    logger.debug("Received data: %s", data)
+
+    if not data or 'food_text' not in data:
+        return {"error": "No food_text provided"}, 400
+
+    food_text = data['food_text']
+    k = data.get('k')
+    if k is not None and (type(k) is not int or not 1 <= k <= config.MAX_ALTERNATIVES):
+        return {"error": f"k must be an integer from 1 to {config.MAX_ALTERNATIVES}"}, 400
+    logger.debug("Looking up: %s", food_text)
+
+    if found is None:
+        found = lookup(food_text, k)
+    alternatives = found if k is not None else [found]
+    if not alternatives:
+        return {"error": "No product found"}, 404
+    product_name, nutriments_info, similarity_score, code = alternatives[0]
+    logger.debug("Code: %s", code)
+
+    # Check if we got valid data
+    if product_name is None:
+        return {"error": "No product found"}, 404
+
+    # Handle macro analysis safely; only cached products are used so the
+    # Open Food Facts fetch runs in the background, off the request path
+    macro_analysis = None
+    if nutriments_info is not None:
+        try:
+            with span("analyse_macro"):
+                macro_analysis = analyse_macro(code, timeout=0)
+            if macro_analysis is not None:
+                macro_analysis = list(macro_analysis)
+        except Exception as e:
+            logger.warning("Macro analysis error: %s", e)
+            macro_analysis = []
+
+    similarity_score = float(similarity_score)*100
+    product_name = str(product_name)
+
+    logger.debug("Macro analysis: %s", macro_analysis)
+
+    # Simple response for now
+    response = {
+        "status": "success",
+        "message": f"Received: {product_name}",
+        "food_text": product_name,
+        "result": {
+            "product_name": product_name,
+            "similarity_score": similarity_score
+        }
+    }
+    if k is not None:
+        # "Did you mean" alternatives, best first; the first is "result"
+        response["results"] = [{
+            "product_name": str(name),
+            "similarity_score": float(score)*100,
+            "code": str(alternative_code)
+        } for name, _, score, alternative_code in alternatives]
+        # Warm the product cache for the alternatives the user may pick
+        prefetch_products(alternative_code for _, _, _, alternative_code in alternatives[1:])
+    return response, 200
+
+
+def food_lookup_batch(data) -> Response:
+    """
+    Look up a list of food texts, returning per-item results in input order.
+
+    While the model or corpus is still loading, cache hits are answered and
+    the misses come back with status "unavailable", to be retried later.
+
+    Raises:
+        FlightTimeout: An identical lookup in flight did not finish in time
+    """
+    if not data or 'food_texts' not in data:
+        return {"error": "No food_texts provided"}, 400
+
+    food_texts = data['food_texts']
+    if not isinstance(food_texts, list) or not all(isinstance(text, str) for text in food_texts):
+        return {"error": "food_texts must be a list of strings"}, 400
+    if len(food_texts) > config.MAX_BATCH_SIZE:
+        return {"error": f"At most {config.MAX_BATCH_SIZE} food_texts per request"}, 400
+
+    logger.debug("Batch looking up %d items", len(food_texts))
+
+    results = []
+    found = lookup_many(food_texts, partial=True)
+    for food_text, item in zip(food_texts, found):
+        if item is None:
+            results.append({
+                "status": "unavailable",
+                "food_text": food_text,
+                "error": "Search is still loading, retry later"
+            })
+            continue
+        product_name, nutriments_info, similarity_score, code = item
+        if product_name is None:
+            results.append({
+                "status": "not_found",
+                "food_text": food_text,
+                "error": "No product found"
+            })
+            continue
+        results.append({
+            "status": "success",
+            "food_text": food_text,
+            "result": {
+                "product_name": str(product_name),
+                "similarity_score": float(similarity_score)*100
+            }
+        })
+
+    # Warm the product cache for the matched products
+    prefetch_products(item[3] for item in found if item is not None and item[0] is not None)
+
+    return {
+        "status": "success",
+        "results": results
+    }, 200
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def meal_totals_request(data) -> Response:
+    """
+    Calorie and macro totals of a list of portions, each given by barcode
+    ("code") or product row ("row") with "grams" and/or "servings".
+
+    Raises:
+        ComponentNotReady: The macro matrix or barcode index is still loading
+    """
+    if not data or 'items' not in data:
+        return {"error": "No items provided"}, 400
+    items = data['items']
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return {"error": "items must be a list of objects"}, 400
+    if len(items) > config.MAX_BATCH_SIZE:
+        return {"error": f"At most {config.MAX_BATCH_SIZE} items per request"}, 400
+
+    codes, rows, grams, servings = [], [], [], []
+    for position, item in enumerate(items):
+        code, row = item.get('code'), item.get('row')
+        if (code is None) == (row is None) or (row is not None and (type(row) is not int or row < 0)):
+            return {"error": f"items[{position}] needs either a code or a non-negative integer row"}, 400
+        quantities = [item.get('grams', 0), item.get('servings', 0)]
+        if not all(_is_number(quantity) and quantity >= 0 for quantity in quantities) or not any(quantities):
+            return {"error": f"items[{position}] needs non-negative grams or servings"}, 400
+        codes.append(None if code is None else str(code))
+        rows.append(row)
+        grams.append(quantities[0])
+        servings.append(quantities[1])
+
+    totals, unknown, incomplete = meal_totals(codes, rows, grams, servings)
+    return {
+        "status": "success",
+        "totals": {TOTAL_KEYS[nutrient]: total for nutrient, total in totals.items()},
+        "unknown": unknown,
+        "incomplete": incomplete
+    }, 200
+
+
+def scan_barcode(data) -> Tuple[Optional[str], Optional[Response]]:
+    """The barcode of a /scan request body, or the error response for a bad body"""
+    if not data or 'barcode' not in data:
+        return None, ({"error": "No barcode provided"}, 400)
+    barcode = str(data['barcode']).strip()
+    if normalize_barcode(barcode) is None:
+        return None, ({"error": "barcode must be a string of digits"}, 400)
+    logger.debug("Scanning: %s", barcode)
+    return barcode, None
+
+
+def scan_response(barcode: str, found) -> Response:
+    """Response for a scan result tuple from food_lookup.scan (None if unknown)"""
+    if found is None:
+        return {"error": "No product found", "barcode": barcode}, 404
+
+    product_name, nutriments_info, code, source = found
+    return {
+        "status": "success",
+        "barcode": barcode,
+        "source": source,
+        "result": {
+            "product_name": product_name,
+            "code": code,
+            "nutriments": nutriments_info
+        }
+    }, 200
+
+
+def scan_request(data) -> Response:
+    """Resolve a scanned barcode to a product, locally when possible"""
+    barcode, error = scan_barcode(data)
+    if error is not None:
+        return error
+    return scan_response(barcode, scan(barcode))
+
+
+def stats() -> Response:
+    """Runtime statistics of the lookup components"""
+    runtime_stats = lookup_stats()
+    runtime_stats["product_cache"] = get_product_cache().stats()
+    runtime_stats["process"] = dict(pid=os.getpid(), **process_memory())
+    return runtime_stats, 200
+
+
+def metrics() -> Response:
+    """Stage and request latency histograms and cache statistics in Prometheus text format"""
+    return REGISTRY.render(), 200
+
+
+def debug_profile(limit: Optional[int] = None, reset: bool = False) -> Response:
+    """Collapsed stacks from the sampling profiler (FOODSCANNER_PROFILER=1)"""
+    if profiler is None:
+        return {"error": "Profiler is disabled; set FOODSCANNER_PROFILER=1"}, 404
+    collapsed = profiler.collapsed(limit=limit)
+    if reset:
+        profiler.reset()
+    return collapsed, 200
+
+
+def ready() -> Response:
+    """Readiness endpoint: per-component load state and load time"""
+    all_ready, component_status = readiness()
+    return {
+        "ready": all_ready,
+        "components": component_status
+    }, 200 if all_ready else 503
+
+
+def health(message: str = "Basic server is running") -> Response:
+    """Health check endpoint"""
+    return {
+        "status": "healthy",
+        "message": message,
+        "endpoints": ENDPOINTS
+    }, 200
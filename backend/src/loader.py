@@ -0,0 +1,115 @@
+"""
+Deferred loading module for heavy backend components.
+Each component is built once, either in a background thread at server start or
+on first use, and reports its load state and load time.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class ComponentNotReady(RuntimeError):
+    """Raised when a component is requested without waiting while it is still loading"""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} is still loading")
+        self.name = name
+
+
+class Component:
+    """A heavy resource built once by a factory function"""
+
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        """
+        Initialize the component without loading it.
+
+        Args:
+            name: Name reported by status()
+            factory: Function building the resource
+        """
+        self.name = name
+        self.factory = factory
+        self.state = self.PENDING
+        self.error: Optional[BaseException] = None
+        self.load_seconds: Optional[float] = None
+        self._value = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    def _claim(self) -> bool:
+        """Move from pending to loading; True if this caller should run the factory"""
+        with self._lock:
+            if self.state != self.PENDING:
+                return False
+            self.state = self.LOADING
+            return True
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            value = self.factory()
+        except BaseException as e:
+            self.error = e
+            self.state = self.FAILED
+        else:
+            self._value = value
+            self.state = self.READY
+        finally:
+            self.load_seconds = time.perf_counter() - start
+            self._done.set()
+
+    def start(self):
+        """Start loading in a background thread if not already started"""
+        if self._claim():
+            threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True).start()
+
+    def get(self, block: bool = True) -> Any:
+        """
+        Return the loaded resource.
+
+        Args:
+            block: Load synchronously (or wait for a background load) when not
+                ready yet. If False, start a background load and raise
+                ComponentNotReady instead of waiting
+
+        Raises:
+            ComponentNotReady: The component is loading and block is False
+            RuntimeError: The factory failed
+        """
+        if self.state == self.READY:
+            return self._value
+        if not block:
+            self.start()
+            if self.state == self.READY:
+                return self._value
+            if self.state != self.FAILED:
+                raise ComponentNotReady(self.name)
+        elif self._claim():
+            self._load()
+        else:
+            self._done.wait()
+        if self.state == self.FAILED:
+            raise RuntimeError(f"{self.name} failed to load: {self.error}") from self.error
+        return self._value
+
+    def peek(self) -> Any:
+        """Return the resource if it is loaded, otherwise None, without loading it"""
+        return self._value if self.state == self.READY else None
+
+    def status(self) -> dict:
+        """Load state, load time and error of the component"""
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": str(self.error) if self.error is not None else None,
+        }
@@ -0,0 +1,55 @@
+"""
+Logging setup module.
+Log records are put on an in-memory queue by the calling thread and written
+to stdout by a background listener thread, so request threads never block on
+console I/O. The level comes from FOODSCANNER_LOG_LEVEL.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: str = "INFO") -> QueueListener:
+    """
+    Route the root logger through a queue to a background stdout handler.
+
+    Calling it again only updates the level.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    if _listener is not None:
+        return _listener
+
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    root.addHandler(QueueHandler(records))
+    # Flush what is still queued on exit
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def _reset_after_fork():
+    """Drop the inherited queue handler: the listener thread does not survive fork"""
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    _listener = None
+
+
+# Pre-fork workers (src/prefork.py) call setup_logging again to start their own listener
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,112 @@
+"""
+LRU cache module for bounded in-memory tiers.
+Entries are evicted least-recently-used first once either the entry count or
+the accounted byte size exceeds its limit.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU map bounded by entry count and approximate byte size"""
+
+    def __init__(self, max_items: Optional[int] = None, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_items: Maximum number of entries, or None for no limit
+            max_bytes: Maximum accounted size of all entries, or None for no limit
+            sizeof: Function estimating an entry's size in bytes when put() is
+                not given one. Defaults to counting every entry as 1 byte
+        """
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 1)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def bytes(self) -> int:
+        """Accounted size of all entries"""
+        return self._bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value and mark it recently used, counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None):
+        """
+        Insert or replace an entry, evicting old entries as needed.
+
+        Entries larger than max_bytes on their own are not cached.
+        """
+        if size is None:
+            size = self.sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (
+                (self.max_items is not None and len(self._entries) > self.max_items)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "items": len(self._entries),
+                "bytes": self._bytes,
+                "max_items": self.max_items,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
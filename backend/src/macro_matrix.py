@@ -0,0 +1,166 @@
+"""
+Macro-nutrient matrix module for vectorized meal and daily totals.
+The key nutrients of every product row are extracted once, offline, into a
+float32 matrix of shape (rows, bases, nutrients) (per 100 g and per serving),
+memory-mapped at startup, so totalling a meal is one gather and one sum and
+never decodes a product's JSON.
+"""
+
+import math
+import os
+from pathlib import Path
+from typing import Iterable, Tuple, Union
+
+import numpy as np
+
+MATRIX_FILE = "macros.npy"
+
+# Matrix columns; "energy-kcal" falls back to "energy-kj" / "energy" (kJ)
+NUTRIENTS = ("energy-kcal", "proteins", "carbohydrates", "fat")
+# Quantity bases, the second matrix axis
+BASES = ("100g", "serving")
+
+_KJ_PER_KCAL = 4.184
+
+
+def _number(value) -> float:
+    """Finite float of a nutriment value, else NaN"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def _entries(nutriments) -> dict:
+    """
+    {(name, basis): value} of a product's nutriments.
+
+    Accepts both shapes found in the dataset: flat dicts keyed like
+    "proteins_100g", and lists of per-nutrient dicts with "name", "100g" and
+    "serving" fields.
+    """
+    if isinstance(nutriments, dict):
+        nutriments = [nutriments]
+    entries = {}
+    for entry in nutriments or ():
+        if not isinstance(entry, dict):
+            continue
+        if "name" in entry:
+            for basis in BASES:
+                if entry.get(basis) is not None:
+                    entries[str(entry["name"]), basis] = entry[basis]
+            continue
+        for key, value in entry.items():
+            name, _, basis = str(key).rpartition("_")
+            if basis in BASES and value is not None:
+                entries[name, basis] = value
+    return entries
+
+
+def macro_values(nutriments) -> np.ndarray:
+    """
+    Matrix row of one product.
+
+    Args:
+        nutriments: The product's raw nutriments, as stored in the dataset
+
+    Returns:
+        float32 array of shape (len(BASES), len(NUTRIENTS)); NaN where the
+        product does not report a nutrient
+    """
+    entries = _entries(nutriments)
+    values = np.full((len(BASES), len(NUTRIENTS)), np.nan, dtype=np.float32)
+    for b, basis in enumerate(BASES):
+        for n, name in enumerate(NUTRIENTS):
+            value = _number(entries.get((name, basis)))
+            if math.isnan(value) and name == "energy-kcal":
+                kilojoules = entries.get(("energy-kj", basis), entries.get(("energy", basis)))
+                value = _number(kilojoules) / _KJ_PER_KCAL
+            values[b, n] = value
+    return values
+
+
+class MacroMatrix:
+    """Memory-mapped key nutrients of every product row"""
+
+    def __init__(self, index_dir: Union[str, Path]):
+        """
+        Open a matrix built with MacroMatrix.build.
+
+        Args:
+            index_dir: Directory containing the matrix file
+        """
+        self.index_dir = Path(index_dir)
+        self.matrix = np.load(str(self.index_dir / MATRIX_FILE), mmap_mode="r")
+
+    @staticmethod
+    def exists(index_dir: Union[str, Path]) -> bool:
+        """Check whether a complete matrix exists in the directory"""
+        return (Path(index_dir) / MATRIX_FILE).exists()
+
+    @staticmethod
+    def build(nutriments: Iterable[object], index_dir: Union[str, Path], rows: int) -> int:
+        """
+        Write the matrix from the nutriments of the product rows.
+
+        Args:
+            nutriments: Raw nutriments of every product row, in row order
+            index_dir: Destination directory
+            rows: Number of product rows
+
+        Returns:
+            Number of rows with at least one nutrient
+        """
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        matrix_tmp = index_dir / (MATRIX_FILE + ".tmp.npy")
+        matrix = np.lib.format.open_memmap(matrix_tmp, mode="w+", dtype=np.float32,
+                                           shape=(rows, len(BASES), len(NUTRIENTS)))
+        covered = 0
+        written = 0
+        for row, row_nutriments in enumerate(nutriments):
+            if row >= rows:
+                raise ValueError(f"More than {rows} product rows")
+            values = macro_values(row_nutriments)
+            matrix[row] = values
+            covered += not np.isnan(values).all()
+            written += 1
+        if written != rows:
+            raise ValueError(f"Expected {rows} product rows, got {written}")
+        matrix.flush()
+        del matrix
+        os.replace(matrix_tmp, index_dir / MATRIX_FILE)
+        return covered
+
+    @staticmethod
+    def build_from_store(product_store, index_dir: Union[str, Path]) -> int:
+        """Write the matrix from the nutriments column of a ProductStore"""
+        return MacroMatrix.build((product_store.get_raw(row)[1] for row in range(len(product_store))),
+                                 index_dir, len(product_store))
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def totals(self, rows, grams, servings) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nutrient totals of several portions.
+
+        Args:
+            rows: Product row of every portion
+            grams: Grams of every portion (per-100g values), 0 for none
+            servings: Servings of every portion (per-serving values), 0 for none
+
+        Returns:
+            Tuple of (float64 totals in NUTRIENTS order, boolean array marking
+            the portions that lack a nutrient for their quantity); missing
+            values count as 0
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        values = self.matrix[rows]
+        weights = np.stack([np.asarray(grams, dtype=np.float32) / 100.0,
+                            np.asarray(servings, dtype=np.float32)], axis=1)
+        used = (weights > 0)[:, :, None]
+        incomplete = (np.isnan(values) & used).any(axis=(1, 2))
+        contributions = np.where(used, values, 0.0) * weights[:, :, None]
+        return np.nansum(contributions, axis=(0, 1), dtype=np.float64), incomplete
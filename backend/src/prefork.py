@@ -0,0 +1,170 @@
+"""
+Pre-fork serving mode: python -m src.prefork --workers 4 --port 8000
+
+The parent process loads the read-only components (model, corpus, product
+store, indexes), binds the listening socket and forks the workers, so every
+worker shares one copy of that data instead of loading its own. Each worker
+serves the Flask app on the shared socket and loads its own food cache,
+embedding cache and Open Food Facts product cache. The parent only
+supervises: it restarts workers that die and stops them on SIGTERM/SIGINT.
+"""
+
+import argparse
+import atexit
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from src import config
+from src.food_lookup import load_shared_components
+from src.log import setup_logging
+from src.metrics import process_memory
+
+logger = logging.getLogger(__name__)
+
+# A worker dying sooner than this after its start is restarted with a delay
+# so a broken deployment does not fork in a tight loop
+MIN_WORKER_UPTIME = 1.0
+
+
+def _limit_threads(threads: int):
+    """Split the CPUs between workers instead of every worker using all of them"""
+    if config.ONNX_THREADS == 0:
+        config.ONNX_THREADS = threads
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def _run_worker(sock: socket.socket, worker_id: int, threads: int):
+    """Body of a forked worker: serve the Flask app on the inherited socket"""
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    _limit_threads(threads)
+    # The embedding cache's disk tier has a single writer; other workers
+    # keep their memoized embeddings in memory only
+    if worker_id > 0:
+        config.EMBEDDING_CACHE_PERSIST = False
+    # Re-enable collection for objects created from here on; the preloaded
+    # objects stay frozen so the collector never writes to their shared pages
+    gc.enable()
+
+    from werkzeug.serving import make_server
+    from src.server import app
+
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    logger.info("Worker %d serving (pid %d, %d threads)", worker_id, os.getpid(), threads)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+class Supervisor:
+    """Forks the workers and keeps them running"""
+
+    def __init__(self, sock: socket.socket, workers: int):
+        self.sock = sock
+        self.workers = workers
+        self.threads = max(1, (os.cpu_count() or 1) // workers)
+        self.children = {}
+        self.stopping = False
+
+    def spawn(self, worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(self.sock, worker_id, self.threads)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 0
+            except BaseException:
+                logger.exception("Worker %d crashed", worker_id)
+                code = 1
+            finally:
+                # Never return into the parent's supervision loop
+                atexit._run_exitfuncs()
+                os._exit(code)
+        self.children[pid] = (worker_id, time.monotonic())
+        logger.info("Worker %d started (pid %d)", worker_id, pid)
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """Fork the workers and supervise them until they have all stopped"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for worker_id in range(self.workers):
+            self.spawn(worker_id)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            worker_id, started = self.children.pop(pid, (None, 0.0))
+            if worker_id is None or self.stopping:
+                continue
+            logger.warning("Worker %d (pid %d) exited with status %d; restarting", worker_id, pid,
+                           os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                time.sleep(MIN_WORKER_UPTIME)
+            if not self.stopping:
+                self.spawn(worker_id)
+
+
+def serve(host: str, port: int, workers: int):
+    """
+    Preload the shared components, then fork and supervise the workers.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on; 0 picks a free port
+        workers: Worker processes; 0 uses one per CPU
+    """
+    setup_logging(config.LOG_LEVEL)
+    workers = workers or os.cpu_count() or 1
+
+    sock = socket.create_server((host, port), backlog=128)
+    sock.set_inheritable(True)
+    logger.info("Listening on http://%s:%d with %d workers", host, sock.getsockname()[1], workers)
+
+    start = time.perf_counter()
+    loaded = load_shared_components()
+    memory = process_memory()
+    logger.info("Preloaded %s in %.1fs (%d MB resident)", ", ".join(loaded), time.perf_counter() - start,
+                memory.get("rss", 0) // 2**20)
+
+    # Move everything loaded so far out of the collector's reach: a collection
+    # in a worker would otherwise touch every object header and copy the pages
+    gc.disable()
+    gc.freeze()
+    Supervisor(sock, workers).run()
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the backend from pre-forked worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.WORKERS,
+                        help="Worker processes (default: FOODSCANNER_WORKERS, or one per CPU)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Product cache module for Open Food Facts products by barcode.
+Fetched products are kept in SQLite with a time-to-live, unknown barcodes are
+cached negatively, and remote fetches run on a bounded thread pool so callers
+can wait with a timeout or not at all.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
+import requests
+
+from src.barcode_index import normalize_barcode
+from src.lru_cache import LRUCache
+
+
+class OpenFoodFactsClient:
+    """Minimal client for the Open Food Facts product API"""
+
+    def __init__(self, base_url: str = "https://world.openfoodfacts.org", timeout: float = 5.0,
+                 user_agent: str = "MyAwesomeApp/1.0"):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: API root, e.g. a local stub server in tests
+            timeout: Connect and read timeout of each request in seconds
+            user_agent: User-Agent header required by Open Food Facts
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.user_agent = user_agent
+        # requests.Session is not thread-safe; each fetch thread gets its own
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["User-Agent"] = self.user_agent
+        return session
+
+    def get_product(self, code: str) -> Optional[dict]:
+        """
+        Fetch one product.
+
+        Returns:
+            The product dict, or None if Open Food Facts does not know the code
+
+        Raises:
+            ValueError: The code is not a barcode
+            requests.RequestException: Network errors and unexpected HTTP statuses
+        """
+        if normalize_barcode(code) is None:
+            # Never put arbitrary text into the remote URL path
+            raise ValueError(f"Invalid barcode: {code!r}")
+        response = self._session().get(f"{self.base_url}/api/v2/product/{code}.json", timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        body = response.json()
+        if body.get("status") != 1:
+            return None
+        return body.get("product")
+
+
+class ProductCache:
+    """
+    Products by barcode with TTL, negative caching and a background fetch pool.
+
+    Products live in SQLite (persistent) behind a small in-memory LRU tier.
+    Fresh entries are returned without a fetch; stale or missing ones are
+    fetched on the pool, at most once concurrently per code. Failed fetches
+    are not cached, so the next request retries them.
+    """
+
+    def __init__(self, fetch_product: Callable[[str], Optional[dict]], db_path: Optional[str] = None,
+                 ttl: float = 7 * 24 * 3600, negative_ttl: float = 24 * 3600, max_workers: int = 4,
+                 max_pending: int = 256, hot_cache_max_items: Optional[int] = 10000,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize the product cache.
+
+        Args:
+            fetch_product: Function returning the product for a code, or None
+                if the code is unknown; it may raise on transient errors
+            db_path: Path to SQLite database file. Defaults to cache/off_products.db
+            ttl: Seconds a fetched product stays fresh
+            negative_ttl: Seconds an unknown code stays cached as unknown
+            max_workers: Number of fetch threads
+            max_pending: Prefetches are dropped once this many fetches are queued
+            hot_cache_max_items: Maximum number of products held in memory
+            clock: Time source, replaceable in tests
+        """
+        if db_path is None:
+            # Resolve path relative to backend root
+            backend_root = Path(__file__).parent.parent
+            cache_dir = backend_root / "cache"
+            cache_dir.mkdir(exist_ok=True)
+            db_path = str(cache_dir / "off_products.db")
+
+        self.db_path = db_path
+        self.fetch_product = fetch_product
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_pending = max_pending
+        self.clock = clock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self.hot_cache = LRUCache(max_items=hot_cache_max_items)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="off-fetch")
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.timeouts = 0
+        self.dropped_prefetches = 0
+        self._closed = False
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize the database schema if it doesn't exist"""
+        with self._db_lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS off_products (
+                    code TEXT PRIMARY KEY,
+                    product TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            self.conn.commit()
+
+    def _entry(self, code: str) -> Optional[Tuple[Optional[dict], float]]:
+        """Cached (product or None if unknown, fetched_at), or None if never fetched"""
+        entry = self.hot_cache.get(code)
+        if entry is not None:
+            return entry
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT product, fetched_at FROM off_products WHERE code = ?", (code,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = (json.loads(row[0]) if row[0] is not None else None, row[1])
+        self.hot_cache.put(code, entry)
+        return entry
+
+    def _is_fresh(self, entry: Tuple[Optional[dict], float]) -> bool:
+        product, fetched_at = entry
+        ttl = self.ttl if product is not None else self.negative_ttl
+        return self.clock() - fetched_at < ttl
+
+    def _store(self, code: str, product: Optional[dict]):
+        fetched_at = self.clock()
+        with self._db_lock:
+            if self._closed:
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO off_products (code, product, fetched_at) VALUES (?, ?, ?)",
+                (code, json.dumps(product) if product is not None else None, fetched_at)
+            )
+            self.conn.commit()
+        self.hot_cache.put(code, (product, fetched_at))
+
+    def _fetch_and_store(self, code: str) -> Optional[dict]:
+        try:
+            product = self.fetch_product(code)
+        except Exception:
+            with self._inflight_lock:
+                self.fetch_errors += 1
+            raise
+        self._store(code, product)
+        return product
+
+    def _fetch_async(self, code: str, prefetch: bool = False) -> Optional[Future]:
+        """Future of the fetch for code, joining one already in flight"""
+        with self._inflight_lock:
+            future = self._inflight.get(code)
+            if future is not None:
+                return future
+            if prefetch and len(self._inflight) >= self.max_pending:
+                self.dropped_prefetches += 1
+                return None
+            self.fetches += 1
+            future = self._executor.submit(self._fetch_and_store, code)
+            self._inflight[code] = future
+        future.add_done_callback(lambda _: self._forget(code, future))
+        return future
+
+    def _forget(self, code: str, future: Future):
+        with self._inflight_lock:
+            if self._inflight.get(code) is future:
+                del self._inflight[code]
+
+    def get(self, code: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Product for a barcode, fetching it if it is not cached or stale.
+
+        Args:
+            code: Product barcode
+            timeout: Seconds to wait for a fetch; 0 never waits and None waits
+                until it finishes. A fetch that outlives the wait still
+                completes in the background and fills the cache
+
+        Returns:
+            The product, or None if the code is unknown, the fetch failed or
+            did not finish in time. On a stale entry whose refresh does not
+            finish in time the stale product is returned
+        """
+        stale, future = self.fetch(code)
+        if future is None:
+            return stale
+        if timeout == 0:
+            return stale
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            return stale
+        except Exception:
+            return stale
+
+    def fetch(self, code: str) -> Tuple[Optional[dict], Optional[Future]]:
+        """
+        Cached product and, unless it is fresh, the future of its refresh.
+
+        For callers that wait on their own terms, e.g. asyncio code awaiting
+        the future with asyncio.wrap_future.
+
+        Returns:
+            Tuple of (cached product or None, Future resolving to the fetched
+            product, or None when the cached entry is fresh). Codes that are
+            not barcodes give (None, None); they are neither fetched nor
+            cached negatively
+        """
+        code = str(code).strip()
+        if normalize_barcode(code) is None:
+            return None, None
+        entry = self._entry(code)
+        if entry is not None and self._is_fresh(entry):
+            self.hits += 1
+            return entry[0], None
+        self.misses += 1
+        return (entry[0] if entry is not None else None), self._fetch_async(code)
+
+    def prefetch(self, codes: Iterable[str]) -> int:
+        """
+        Fetch missing or stale products in the background without waiting.
+
+        Returns:
+            Number of fetches started or joined
+        """
+        started = 0
+        for code in dict.fromkeys(str(code).strip() for code in codes if normalize_barcode(code) is not None):
+            entry = self._entry(code)
+            if entry is not None and self._is_fresh(entry):
+                continue
+            if self._fetch_async(code, prefetch=True) is not None:
+                started += 1
+        return started
+
+    def wait_idle(self, timeout: Optional[float] = None):
+        """Wait for the fetches currently in flight (mostly for tests and scripts)"""
+        with self._inflight_lock:
+            futures = list(self._inflight.values())
+        for future in futures:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        """Hit/miss and fetch counters"""
+        lookups = self.hits + self.misses
+        with self._inflight_lock:
+            inflight = len(self._inflight)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "timeouts": self.timeouts,
+            "inflight": inflight,
+            "dropped_prefetches": self.dropped_prefetches,
+            "hot_tier": self.hot_cache.stats(),
+        }
+
+    def close(self):
+        """Stop the fetch pool and close the database connection"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._db_lock:
+            self._closed = True
+            self.conn.close()
@@ -0,0 +1,133 @@
+"""
+Product store module for row-addressable access to the product corpus.
+Rows of the total_dataset are packed into a single JSON-lines blob with an
+offsets array, both memory-mapped, so fetching one product is O(1) and never
+materializes a whole dataset column.
+"""
+
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+OFFSETS_FILE = "offsets.npy"
+BLOB_FILE = "products.jsonl"
+COLUMNS = ("product_name", "nutriments", "code")
+
+
+class ProductStore:
+    """Memory-mapped product rows addressed by embedding row index"""
+
+    def __init__(self, store_dir: Union[str, Path]):
+        """
+        Open a product store built with ProductStore.build.
+
+        Args:
+            store_dir: Directory containing the offsets and blob files
+        """
+        self.store_dir = Path(store_dir)
+        self.offsets = np.load(str(self.store_dir / OFFSETS_FILE), mmap_mode="r")
+        self._blob_file = open(self.store_dir / BLOB_FILE, "rb")
+        if os.fstat(self._blob_file.fileno()).st_size:
+            self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._blob = b""
+
+    @staticmethod
+    def exists(store_dir: Union[str, Path]) -> bool:
+        """Check whether a complete store exists in the directory"""
+        store_dir = Path(store_dir)
+        return (store_dir / OFFSETS_FILE).exists() and (store_dir / BLOB_FILE).exists()
+
+    @staticmethod
+    def build(rows: Iterable[Tuple[object, object, object]], store_dir: Union[str, Path]) -> int:
+        """
+        Write a product store from (product_name, nutriments, code) rows.
+
+        Args:
+            rows: Rows in embedding order
+            store_dir: Destination directory
+
+        Returns:
+            Number of rows written
+        """
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        blob_tmp = store_dir / (BLOB_FILE + ".tmp")
+        offsets_tmp = store_dir / (OFFSETS_FILE + ".tmp.npy")
+
+        offsets = [0]
+        with open(blob_tmp, "wb") as blob:
+            for row in rows:
+                line = json.dumps(list(row), ensure_ascii=False, separators=(",", ":"), default=str)
+                blob.write(line.encode("utf-8"))
+                blob.write(b"\n")
+                offsets.append(blob.tell())
+
+        np.save(offsets_tmp, np.asarray(offsets, dtype=np.int64))
+        os.replace(blob_tmp, store_dir / BLOB_FILE)
+        os.replace(offsets_tmp, store_dir / OFFSETS_FILE)
+        return len(offsets) - 1
+
+    @staticmethod
+    def build_from_dataset(dataset, store_dir: Union[str, Path], batch_size: int = 10000) -> int:
+        """
+        Write a product store from a Hugging Face dataset (e.g. total_dataset).
+
+        Args:
+            dataset: Dataset with product_name, nutriments and code columns
+            store_dir: Destination directory
+            batch_size: Number of rows read from the Arrow table at a time
+
+        Returns:
+            Number of rows written
+        """
+        def iter_rows():
+            for batch in dataset.select_columns(list(COLUMNS)).iter(batch_size=batch_size):
+                yield from zip(*(batch[column] for column in COLUMNS))
+
+        return ProductStore.build(iter_rows(), store_dir)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_raw(self, row: int) -> list:
+        """Return the stored [product_name, nutriments, code] for a row"""
+        if row < 0 or row >= len(self):
+            raise IndexError(f"Product row {row} out of range")
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self._blob[start:end])
+
+    def get(self, row: int) -> Tuple[object, Optional[dict], object]:
+        """
+        Fetch a product by row index.
+
+        Returns:
+            Tuple of (product_name, nutriments_info, code), where nutriments_info
+            is the first nutriments entry as returned by the dataset, or None
+        """
+        product_name, nutriments, code = self.get_raw(row)
+        nutriments_info = nutriments[0] if nutriments else None
+        return product_name, nutriments_info, code
+
+    def get_many(self, rows: Iterable[int]) -> List[Tuple[object, Optional[dict], object]]:
+        """Fetch several products by row index, in the given order, with one JSON decode"""
+        lines = []
+        for row in rows:
+            row = int(row)
+            if row < 0 or row >= len(self):
+                raise IndexError(f"Product row {row} out of range")
+            lines.append(self._blob[int(self.offsets[row]):int(self.offsets[row + 1])].rstrip(b"\n"))
+        if not lines:
+            return []
+        return [(product_name, nutriments[0] if nutriments else None, code)
+                for product_name, nutriments, code in json.loads(b"[" + b",".join(lines) + b"]")]
+
+    def close(self):
+        """Release the memory maps"""
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
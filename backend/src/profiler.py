@@ -0,0 +1,93 @@
+"""
+Sampling profiler module.
+An opt-in background thread samples the stacks of all other threads at a
+fixed interval and aggregates them as collapsed stacks, the input format of
+flame graph tools. At most max_stacks distinct stacks are kept; samples of
+further stacks are counted under OTHER_STACK, so memory stays bounded over
+long sessions. Sampling costs one sys._current_frames() walk per interval
+and nothing on the request threads themselves.
+"""
+
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+# Collapsed-stack name of the samples whose stacks were not kept
+OTHER_STACK = "[other]"
+
+
+class SamplingProfiler:
+    """Periodically samples thread stacks into collapsed-stack counts"""
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64, max_stacks: int = 10000):
+        """
+        Initialize the profiler without starting it.
+
+        Args:
+            interval: Seconds between samples
+            max_depth: Frames kept per stack, innermost first
+            max_stacks: Distinct stacks kept before new ones count as OTHER_STACK
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start sampling in a background thread"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling; collected stacks are kept"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude: Optional[int] = None):
+        """Record the current stack of every thread except `exclude`"""
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            stacks.append(";".join(reversed(names)))
+        with self._lock:
+            self.samples += 1
+            for stack in stacks:
+                if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                    stack = OTHER_STACK
+                self._stacks[stack] += 1
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        """Collapsed stacks ("frame;frame;frame count" per line), most frequent first"""
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def reset(self):
+        """Drop the collected samples"""
+        with self._lock:
+            self.samples = 0
+            self._stacks.clear()
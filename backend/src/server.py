@@ -1,73 +1,123 @@
-from flask import Flask, request, jsonify
+import logging
+import time
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from src.food_lookup import lookup
-from src.analysemacro import analyse_macro
+from src import handlers
+from src.batcher import BatchTimeout
+from src.handlers import REQUEST_SECONDS
+from src.loader import ComponentNotReady
+from src.single_flight import FlightTimeout
+
+handlers.start()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
 
+def respond(result):
+    """Flask response for a (body, status) pair from src.handlers"""
+    body, status = result
+    if isinstance(body, str):
+        return Response(body, status=status, mimetype="text/plain; version=0.0.4")
+    return jsonify(body), status
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, request.url_rule.rule if request.url_rule else "unmatched",
+                                str(response.status_code))
+    return response
+
+@app.errorhandler(ComponentNotReady)
+def component_not_ready(e):
+    """Lookups that need a component which is still loading"""
+    response, status = respond(handlers.not_ready(e))
+    response.headers["Retry-After"] = str(handlers.NOT_READY_RETRY_AFTER)
+    return response, status
+
+@app.errorhandler(FlightTimeout)
+def flight_timeout(e):
+    """Lookups that gave up waiting for an identical lookup in flight"""
+    response, status = respond(handlers.flight_timeout(e))
+    response.headers["Retry-After"] = str(handlers.FLIGHT_TIMEOUT_RETRY_AFTER)
+    return response, status
+
+@app.errorhandler(BatchTimeout)
+def batch_timeout(e):
+    """Lookups that gave up waiting for their micro-batch"""
+    response, status = respond(handlers.batch_timeout(e))
+    response.headers["Retry-After"] = str(handlers.BATCH_TIMEOUT_RETRY_AFTER)
+    return response, status
+
 @app.route('/food_lookup', methods=['POST'])
 def food_lookup():
     try:
-        data = request.get_json()
-        print(f"Received data: {data}")
-        
-        if not data or 'food_text' not in data:
-            return jsonify({"error": "No food_text provided"}), 400
-        
-        food_text = data['food_text']
-        print(f"Looking up: {food_text}")
-        
-        product_name, nutriments_info, similarity_score, code = lookup(food_text)
-        print("Code: ", code)
-
-        # Check if we got valid data
-        if product_name is None:
-            return jsonify({"error": "No product found"}), 404
-
-        # Handle macro analysis safely
-        macro_analysis = None
-        if nutriments_info is not None:
-            try:
-                macro_analysis = analyse_macro(code)
-                if macro_analysis is not None:
-                    macro_analysis = list(macro_analysis)
-            except Exception as e:
-                print(f"Macro analysis error: {e}")
-                macro_analysis = []
-
-        similarity_score = float(similarity_score)*100
-        product_name = str(product_name)
-        
-        print(f"Macro analysis: {macro_analysis}")
-        
-        # Simple response for now
-        return jsonify({
-            "status": "success",
-            "message": f"Received: {product_name}",
-            "food_text": product_name,
-            "result": {
-                "product_name": product_name,
-                "similarity_score": similarity_score
-            }
-        })
-        
+        return respond(handlers.food_lookup(request.get_json()))
+    except (ComponentNotReady, FlightTimeout, BatchTimeout):
+        raise
+    except Exception as e:
+        return respond(handlers.server_error(e))
+
+@app.route('/food_lookup/batch', methods=['POST'])
+def food_lookup_batch():
+    """Look up a list of food texts, returning per-item results in input order"""
+    try:
+        return respond(handlers.food_lookup_batch(request.get_json()))
+    except (ComponentNotReady, FlightTimeout):
+        raise
+    except Exception as e:
+        return respond(handlers.server_error(e))
+
+@app.route('/scan', methods=['POST'])
+def scan():
+    """Resolve a scanned barcode to a product, locally when possible"""
+    try:
+        return respond(handlers.scan_request(request.get_json()))
+    except Exception as e:
+        return respond(handlers.server_error(e))
+
+@app.route('/meal_totals', methods=['POST'])
+def meal_totals():
+    """Calorie and macro totals of a meal from the precomputed macro matrix"""
+    try:
+        return respond(handlers.meal_totals_request(request.get_json()))
+    except ComponentNotReady:
+        raise
     except Exception as e:
-        print(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+        return respond(handlers.server_error(e))
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Runtime statistics of the lookup components"""
+    return respond(handlers.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Stage and request latency histograms and cache statistics in Prometheus text format"""
+    return respond(handlers.metrics())
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Collapsed stacks from the sampling profiler (FOODSCANNER_PROFILER=1)"""
+    return respond(handlers.debug_profile(limit=request.args.get("limit", type=int),
+                                          reset=request.args.get("reset") == "1"))
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness endpoint: per-component load state and load time"""
+    return respond(handlers.ready())
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
-        "status": "healthy",
-        "message": "Basic server is running",
-        "endpoints": ["/test", "/food_lookup", "/health"]
-    })
+    return respond(handlers.health())
 
 if __name__ == '__main__':
-    print("Available at: http://localhost:8000")
+    logger.info("Available at: http://localhost:8000")
     
     app.run(host='10.0.0.40', port=8000, debug=True)
-
-
@@ -0,0 +1,137 @@
+"""
+Sharded exact search over the normalized embedding matrix.
+The corpus is split offline into contiguous row-range shards, each its own
+memory-mapped .npy file. A query scores every shard in parallel on a thread
+pool (NumPy releases the GIL inside the BLAS product and the partial sort),
+takes each shard's top-k and merges them, so the result equals a single
+exact pass while latency scales down with the number of cores.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from src.embedding_index import EmbeddingIndex, score_block, top_k
+
+SHARD_DIR = "shards"
+
+
+class ShardedIndex:
+    """Row-range shards of the normalized embeddings searched in parallel"""
+
+    def __init__(self, index_dir: Union[str, Path], threads: int = 0, chunk_size: int = 65536):
+        """
+        Open shards built with ShardedIndex.build.
+
+        Args:
+            index_dir: Directory containing meta.json and the shard files
+            threads: Shards scored at once; 0 uses every CPU
+            chunk_size: Rows upcast at a time when scoring float16 shards
+        """
+        self.index_dir = Path(index_dir)
+        if not self.exists(self.index_dir):
+            raise FileNotFoundError(f"No sharded index in {self.index_dir}; "
+                                    f"build it with scripts/build_indexes.py shards")
+        with open(self.index_dir / "meta.json") as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.dim = meta["dim"]
+        self.chunk_size = chunk_size
+        # Read-only mappings, shared between processes via the page cache
+        self.shards: List[np.ndarray] = [np.load(str(self.index_dir / shard["file"]), mmap_mode="r")
+                                         for shard in meta["shards"]]
+        self.offsets = np.array([shard["start"] for shard in meta["shards"]], dtype=np.int64)
+        threads = threads or os.cpu_count() or 1
+        self.threads = max(1, min(threads, len(self.shards)))
+        # Threads start on the first search, never at load (see src/prefork.py)
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="shard-search") \
+            if self.threads > 1 else None
+
+    @staticmethod
+    def exists(index_dir: Union[str, Path]) -> bool:
+        """Check whether a complete index exists in the directory"""
+        return (Path(index_dir) / "meta.json").exists()
+
+    @staticmethod
+    def build(embeddings: np.ndarray, index_dir: Union[str, Path], n_shards: int,
+              chunk_size: int = 65536) -> int:
+        """
+        Split a normalized embedding matrix into contiguous row-range shards.
+
+        Args:
+            embeddings: L2-normalized embedding matrix (rows x dim), may be memory-mapped
+            index_dir: Destination directory
+            n_shards: Number of shards; shard sizes differ by at most one row
+            chunk_size: Number of rows copied at a time
+
+        Returns:
+            Number of shards written
+        """
+        rows, dim = embeddings.shape
+        n_shards = max(1, min(n_shards, rows))
+        bounds = np.linspace(0, rows, n_shards + 1).astype(np.int64)
+
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        meta_path = index_dir / "meta.json"
+        if meta_path.exists():
+            # Invalidate the old layout before its files are overwritten
+            meta_path.unlink()
+
+        shards = []
+        for number, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            name = f"shard_{number:03d}.npy"
+            out = np.lib.format.open_memmap(str(index_dir / name), mode="w+", dtype=embeddings.dtype,
+                                            shape=(int(end - start), dim))
+            for offset in range(start, end, chunk_size):
+                stop = min(offset + chunk_size, end)
+                out[offset - start:stop - start] = embeddings[offset:stop]
+            out.flush()
+            del out
+            shards.append({"file": name, "start": int(start), "rows": int(end - start)})
+
+        # Written last so a partially built directory is never picked up
+        with open(meta_path, "w") as f:
+            json.dump({"rows": int(rows), "dim": int(dim), "dtype": str(embeddings.dtype), "shards": shards}, f)
+        return n_shards
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _search_shard(self, number: int, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores, indices = top_k(score_block(queries, self.shards[number], self.chunk_size), k)
+        return scores, indices + self.offsets[number]
+
+    def search(self, queries, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the exact top-k most similar corpus rows for each query.
+
+        Args:
+            queries: Query embeddings, shape (dim,) or (batch, dim)
+            k: Number of results per query
+
+        Returns:
+            Tuple of (scores, indices), both of shape (batch, k), sorted by
+            descending score
+        """
+        queries = EmbeddingIndex.normalize_queries(queries)
+        numbers = range(len(self.shards))
+        if self._executor is None:
+            results = [self._search_shard(number, queries, k) for number in numbers]
+        else:
+            results = list(self._executor.map(lambda number: self._search_shard(number, queries, k), numbers))
+
+        # Every row of the global top-k is in its shard's top-k, so merging the
+        # per-shard candidates gives the exact result
+        candidate_scores = np.concatenate([scores for scores, _ in results], axis=1)
+        candidate_indices = np.concatenate([indices for _, indices in results], axis=1)
+        scores, order = top_k(candidate_scores, k)
+        return scores, np.take_along_axis(candidate_indices, order, axis=1)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
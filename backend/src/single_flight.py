@@ -0,0 +1,115 @@
+"""
+Single-flight module for coalescing identical in-flight computations.
+The first caller for a key (the leader) runs the computation; callers
+arriving with the same key while it runs wait for the leader's result, or
+its exception, instead of running their own. Nothing is kept once the
+computation finishes: this coalesces concurrent work, it is not a cache.
+"""
+
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Hashable, Optional, Tuple
+
+
+class FlightTimeout(TimeoutError):
+    """A waiter gave up on the leader's computation"""
+
+
+class SingleFlight:
+    """Runs one computation per key at a time and shares its outcome with every waiter"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Initialize the group.
+
+        Args:
+            timeout: Longest time in seconds a waiter waits for the leader;
+                None waits for as long as the leader runs
+        """
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def begin(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        Join the flight for key, or start one.
+
+        Returns:
+            Tuple of (future of the flight, True if the caller is the leader).
+            The leader must call finish() with the outcome.
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._flights[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def finish(self, key: Hashable, future: Future, result=None, error: Optional[BaseException] = None):
+        """Publish the leader's result (or exception) to its waiters and end the flight"""
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def wait(self, future: Future, timeout: Optional[float] = None):
+        """
+        Result of a joined flight.
+
+        Raises:
+            FlightTimeout: The leader did not finish within timeout (defaults to self.timeout)
+            Exception: Whatever the leader's computation raised
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            raise FlightTimeout(f"Identical request still running after {timeout}s")
+
+    def do(self, key: Hashable, fn: Callable, *args, timeout: Optional[float] = None):
+        """
+        fn(*args), or the result of the identical call already in flight.
+
+        Raises:
+            FlightTimeout: Waited longer than timeout for the leader
+            Exception: Whatever fn raised, for the leader and every waiter
+        """
+        future, leader = self.begin(key)
+        if not leader:
+            return self.wait(future, timeout)
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def join(self, key: Hashable) -> Optional[Future]:
+        """Future of the flight running for key, counted as coalesced; None if there is none"""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+            return future
+
+    def stats(self) -> dict:
+        """Flights started, callers that joined one, and waiters that timed out"""
+        with self._lock:
+            in_flight = len(self._flights)
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "in_flight": in_flight
+        }
+
@@ -0,0 +1,114 @@
+"""
+Write-back policy for semantic search results.
+Decides which semantic results are written into the FoodCache: only results
+above a similarity threshold, and only for queries seen admit_after times
+(a doorkeeper over recent queries), so one-off queries never reach the
+cache or its fuzzy index. Queries that found nothing or failed are kept in
+a negative cache for a TTL and answered without running the model.
+"""
+
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from src.canonicalize import canonicalize
+from src.lru_cache import LRUCache
+
+# (product_name, nutriments_info, similarity_score, code)
+Result = Tuple[Optional[str], Optional[dict], float, Optional[str]]
+
+NOT_FOUND: Result = (None, None, 0.0, None)
+
+
+class WriteBackPolicy:
+    """Admission and negative caching of semantic search results"""
+
+    def __init__(self, write_back: bool = True, min_score: float = 0.6, admit_after: int = 2,
+                 negative_ttl: float = 300.0, error_ttl: float = 30.0, max_tracked: Optional[int] = 100000,
+                 normalize: Callable[[str], str] = canonicalize, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the policy.
+
+        Args:
+            write_back: False never admits results, only negative-caches
+            min_score: Lowest similarity score written back
+            admit_after: Sightings of a query (with a confident result) before
+                it is written back; 1 writes back on first sight
+            negative_ttl: Seconds a query that found nothing is answered as not found
+            error_ttl: Seconds a query whose search raised is answered as not found
+            max_tracked: Queries remembered by the doorkeeper and by the
+                negative cache, each; least recently seen are forgotten first
+            normalize: Key function, the FoodCache's canonicalization
+            clock: Time source for the TTLs
+        """
+        self.write_back = write_back
+        self.min_score = min_score
+        self.admit_after = max(1, admit_after)
+        self.negative_ttl = negative_ttl
+        self.error_ttl = error_ttl
+        self.normalize = normalize
+        self.clock = clock
+        # Normalized query -> sightings so far
+        self._candidates = LRUCache(max_items=max_tracked)
+        # Normalized query -> expiry time
+        self._negative = LRUCache(max_items=max_tracked)
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.low_score = 0
+        self.negative_hits = 0
+
+    def is_negative(self, text: str) -> bool:
+        """True if the query recently found nothing or failed"""
+        key = self.normalize(text)
+        expires = self._negative.get(key)
+        if expires is None:
+            return False
+        if expires <= self.clock():
+            self._negative.pop(key)
+            return False
+        self.negative_hits += 1
+        return True
+
+    def record_error(self, text: str):
+        """Remember a query whose search raised, for error_ttl seconds"""
+        if self.error_ttl > 0:
+            self._negative.put(self.normalize(text), self.clock() + self.error_ttl)
+
+    def admit(self, text: str, result: Result) -> bool:
+        """
+        Record a semantic search result and decide whether to write it back.
+
+        Results without a product go to the negative cache instead.
+
+        Returns:
+            True if the result should be added to the food cache
+        """
+        product_name, _, similarity_score, _ = result
+        key = self.normalize(text)
+        if product_name is None:
+            if self.negative_ttl > 0:
+                self._negative.put(key, self.clock() + self.negative_ttl)
+            return False
+        if not self.write_back:
+            return False
+        if similarity_score < self.min_score:
+            self.low_score += 1
+            return False
+        with self._lock:
+            sightings = (self._candidates.get(key) or 0) + 1
+            if sightings < self.admit_after:
+                self._candidates.put(key, sightings)
+                return False
+            self._candidates.pop(key)
+            self.admitted += 1
+            return True
+
+    def stats(self) -> dict:
+        """Admission counters and tracked queries"""
+        return {
+            "admitted": self.admitted,
+            "rejected_low_score": self.low_score,
+            "candidates": len(self._candidates),
+            "negative_entries": len(self._negative),
+            "negative_hits": self.negative_hits
+        }
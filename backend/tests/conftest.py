@@ -0,0 +1,35 @@
+"""
+Shared test setup
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Runtime caches opened with their default paths (the app's food cache and
+# Open Food Facts product cache) go to a temporary directory instead of
+# backend/cache. Set before any test module imports src.config.
+_cache_dir = tempfile.mkdtemp(prefix="foodscanner-tests-")
+atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
+os.environ.setdefault("FOODSCANNER_FOOD_CACHE_DB", os.path.join(_cache_dir, "food_cache.db"))
+os.environ.setdefault("FOODSCANNER_OFF_CACHE_DB", os.path.join(_cache_dir, "off_products.db"))
+os.environ.setdefault("FOODSCANNER_EMBEDDING_CACHE_DIR", os.path.join(_cache_dir, "query_embeddings"))
+
+
+class FakeClock:
+    """Stand-in for time.time / time.monotonic that only moves when a test sets now"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """A FakeClock to pass as the clock of TTL-based components"""
+    return FakeClock()
@@ -0,0 +1,73 @@
+"""
+Tests for the approximate nearest-neighbour indexes
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.ann_index import IVFIndex, evaluate_recall, load_search_index
+from src.embedding_index import EmbeddingIndex
+
+
+@pytest.fixture
+def exact_index(tmp_path):
+    rng = np.random.default_rng(0)
+    # Clustered data, like product embeddings
+    centers = rng.normal(size=(20, 32))
+    embeds = centers[rng.integers(0, 20, size=3000)] + rng.normal(scale=0.3, size=(3000, 32))
+    np.save(tmp_path / "embeddings_only.npy", embeds.astype(np.float32))
+    return EmbeddingIndex(tmp_path / "embeddings_only.npy")
+
+
+def _queries(exact_index, count=50):
+    rng = np.random.default_rng(1)
+    rows = rng.choice(len(exact_index), size=count, replace=False)
+    return exact_index.embeddings[rows] + rng.normal(scale=0.05, size=(count, exact_index.dim))
+
+
+def test_ivf_recall_against_exact(tmp_path, exact_index):
+    IVFIndex.build(exact_index.embeddings, tmp_path / "ivf_index", n_lists=32)
+    assert IVFIndex.exists(tmp_path / "ivf_index")
+    index = IVFIndex(tmp_path / "ivf_index", nprobe=8)
+
+    recall = evaluate_recall(index, exact_index, _queries(exact_index))
+    assert recall["recall@1"] >= 0.9
+    assert recall["recall@10"] >= 0.8
+
+
+def test_ivf_full_probe_is_exact(tmp_path, exact_index):
+    IVFIndex.build(exact_index.embeddings, tmp_path / "ivf_index", n_lists=16)
+    index = IVFIndex(tmp_path / "ivf_index")
+    queries = _queries(exact_index)
+
+    scores, indices = index.search(queries, k=5, nprobe=16)
+    exact_scores, exact_indices = exact_index.search(queries, k=5)
+    np.testing.assert_array_equal(indices, exact_indices)
+    np.testing.assert_allclose(scores, exact_scores, rtol=1e-5)
+
+
+def test_load_search_index_modes(tmp_path, exact_index):
+    assert load_search_index("exact", tmp_path, exact_index) is exact_index
+    IVFIndex.build(exact_index.embeddings, tmp_path / "ivf_index", n_lists=8)
+    assert isinstance(load_search_index("ivf", tmp_path, exact_index, nprobe=2), IVFIndex)
+    with pytest.raises(ValueError):
+        load_search_index("annoy", tmp_path, exact_index)
+
+
+def test_interrupted_ivf_rebuild_is_not_picked_up(tmp_path, exact_index, monkeypatch):
+    IVFIndex.build(exact_index.embeddings, tmp_path / "ivf_index", n_lists=8)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np.lib.format, "open_memmap", fail)
+    with pytest.raises(OSError):
+        IVFIndex.build(exact_index.embeddings, tmp_path / "ivf_index", n_lists=16)
+    assert not IVFIndex.exists(tmp_path / "ivf_index")
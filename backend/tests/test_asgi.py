@@ -0,0 +1,163 @@
+"""
+Tests for the ASGI serving mode: endpoint contract, executor backpressure and deadlines
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+# Keep the app from loading the real model when imported by these tests
+os.environ.setdefault("FOODSCANNER_BACKGROUND_LOADING", "0")
+
+from src import asgi, food_lookup, handlers
+from src.food_cache import FoodCache
+from src.loader import Component
+
+
+async def request(app, method, path, body=None, headers=()):
+    """Call the app once; returns (status, headers, body)"""
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": list(headers)}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    response_headers = {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+    content = sent[1]["body"]
+    if response_headers["content-type"] == "application/json":
+        content = json.loads(content)
+    return sent[0]["status"], response_headers, content
+
+
+def call(app, method, path, body=None, headers=()):
+    return asyncio.run(request(app, method, path, body, headers))
+
+
+def test_cache_hits_and_not_ready_misses(tmp_path, monkeypatch):
+    food_cache = FoodCache(str(tmp_path / "food_cache.db"))
+    food_cache.add_to_cache("peanut butter", "Peanut Butter", None, "123", 0.9)
+    cache_component = Component("food_cache", lambda: food_cache)
+    cache_component.get()
+    release = threading.Event()
+    model = Component("model", lambda: release.wait(5))
+    monkeypatch.setattr(food_lookup, "food_cache_component", cache_component)
+    monkeypatch.setattr(food_lookup, "_semantic_components", [model])
+    monkeypatch.setattr(food_lookup, "_block_on_load", False)
+    app = asgi.App(workers=2)
+
+    status, _, body = call(app, "POST", "/food_lookup", {"food_text": "peanut butter"})
+    assert status == 200
+    assert body["result"]["product_name"] == "Peanut Butter"
+
+    status, headers, body = call(app, "POST", "/food_lookup", {"food_text": "sparkling water"})
+    assert status == 503 and headers["retry-after"] == "5"
+    assert body["ready"] is False
+
+    assert call(app, "POST", "/food_lookup", {})[0] == 400
+    release.set()
+    food_cache.close()
+
+
+def test_routing_cors_and_bad_bodies():
+    app = asgi.App(workers=1)
+
+    status, headers, body = call(app, "GET", "/health")
+    assert status == 200 and headers["access-control-allow-origin"] == "*"
+    assert body["endpoints"] == handlers.ENDPOINTS
+
+    status, headers, _ = call(app, "OPTIONS", "/food_lookup",
+                              headers=[(b"access-control-request-headers", b"content-type")])
+    assert status == 200
+    assert headers["access-control-allow-methods"] == "POST"
+    assert headers["access-control-allow-headers"] == "content-type"
+
+    assert call(app, "GET", "/nowhere")[0] == 404
+    assert call(app, "GET", "/food_lookup")[0] == 405
+    assert call(app, "POST", "/food_lookup", b"{not json")[0] == 400
+    assert call(app, "POST", "/food_lookup", b"x" * (asgi.MAX_BODY_BYTES + 1))[0] == 413
+
+    status, headers, text = call(app, "GET", "/metrics")
+    assert status == 200 and headers["content-type"].startswith("text/plain")
+    assert b'foodscanner_request_seconds_count{endpoint="/health",status="200"}' in text
+
+
+def test_scan_awaits_product_fetch(monkeypatch):
+    class FakeProductCache:
+        def fetch(self, code):
+            future = Future()
+            future.set_result({"product_name": "Cola", "nutriments": {"energy": 180}, "code": code})
+            return None, future
+
+    monkeypatch.setattr(asgi, "scan_local", lambda barcode: None)
+    monkeypatch.setattr(asgi, "get_product_cache", FakeProductCache)
+    app = asgi.App(workers=1)
+
+    status, _, body = call(app, "POST", "/scan", {"barcode": "5449000000996"})
+    assert status == 200
+    assert body["source"] == "open_food_facts"
+    assert body["result"]["product_name"] == "Cola"
+
+
+def test_scan_fetch_timeout_falls_back_to_stale(monkeypatch):
+    never = Future()
+
+    class FakeProductCache:
+        def fetch(self, code):
+            return {"product_name": "Old Cola", "code": code}, never
+
+    monkeypatch.setattr(asgi, "scan_local", lambda barcode: None)
+    monkeypatch.setattr(asgi, "get_product_cache", FakeProductCache)
+    app = asgi.App(workers=1, fetch_timeout=0.05)
+
+    status, _, body = call(app, "POST", "/scan", {"barcode": "5449000000996"})
+    assert status == 200
+    assert body["result"]["product_name"] == "Old Cola"
+    # The shared fetch is left running for other waiters
+    assert not never.cancelled()
+
+
+def test_overload_is_rejected_immediately(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(handlers, "food_lookup", lambda data: (release.wait(5), 200))
+    app = asgi.App(workers=1, max_pending=1)
+
+    async def scenario():
+        slow = asyncio.ensure_future(request(app, "POST", "/food_lookup", {"food_text": "a"}))
+        while app.pending == 0:
+            await asyncio.sleep(0.001)
+        rejected = await request(app, "POST", "/food_lookup", {"food_text": "b"})
+        release.set()
+        return rejected, await slow
+
+    (status, headers, body), (slow_status, _, _) = asyncio.run(scenario())
+    assert status == 503 and headers["retry-after"] == "1"
+    assert slow_status == 200
+    assert app.rejected == 1
+
+
+def test_deadline_returns_503(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(handlers, "food_lookup", lambda data: (release.wait(5), 200))
+    app = asgi.App(workers=1, request_timeout=0.05)
+
+    status, _, body = call(app, "POST", "/food_lookup", {"food_text": "a"})
+    assert status == 503
+    assert "deadline" in body["error"]
+    # Abandoned work keeps counting against the limit until it finishes
+    assert app.pending == 1
+    release.set()
+    app.executor.shutdown(wait=True)
+    assert app.pending == 0
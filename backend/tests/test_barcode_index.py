@@ -0,0 +1,96 @@
+"""
+Tests for the offline barcode index
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+# Keep the server from loading the real model when imported by these tests
+os.environ.setdefault("FOODSCANNER_BACKGROUND_LOADING", "0")
+
+from src import food_lookup
+from src.barcode_index import BarcodeIndex, normalize_barcode
+from src.loader import Component
+from src.product_store import ProductStore
+
+
+def test_normalize_barcode():
+    assert normalize_barcode("3017620422003") == 3017620422003
+    assert normalize_barcode(" 0012345678905 ") == normalize_barcode("012345678905")
+    assert normalize_barcode("abc123") is None
+    assert normalize_barcode("") is None
+    assert normalize_barcode(None) is None
+    assert normalize_barcode("9" * 25) is None
+
+
+def test_lookup_resolves_rows(tmp_path):
+    codes = ["3017620422003", "012345678905", None, "not-a-code", "5449000000996", "3017620422003"]
+    assert BarcodeIndex.build(codes, tmp_path) == 3
+    index = BarcodeIndex(tmp_path)
+
+    assert len(index) == 3
+    assert index.lookup("3017620422003") == 0
+    # UPC-A scanned as EAN-13
+    assert index.lookup("0012345678905") == 1
+    assert index.lookup("5449000000996") == 4
+    assert index.lookup("4000000000000") is None
+    assert index.lookup("not-a-code") is None
+    assert index.lookup_many(["5449000000996", "1"]) == [4, None]
+
+
+def test_build_from_product_store(tmp_path):
+    rows = [("Nutella", [{"energy": 539}], "3017620422003"), ("Water", [], "5449000000996")]
+    ProductStore.build(rows, tmp_path / "store")
+    store = ProductStore(tmp_path / "store")
+    BarcodeIndex.build_from_store(store, tmp_path / "barcodes")
+    index = BarcodeIndex(tmp_path / "barcodes")
+
+    assert store.get(index.lookup("5449000000996")) == ("Water", None, "5449000000996")
+    store.close()
+
+
+def test_empty_index(tmp_path):
+    BarcodeIndex.build([], tmp_path)
+    assert BarcodeIndex(tmp_path).lookup("3017620422003") is None
+
+
+def test_rebuild_replaces_keys_and_rows_together(tmp_path):
+    BarcodeIndex.build(["3017620422003", "5449000000996"], tmp_path)
+    old = BarcodeIndex(tmp_path)
+    BarcodeIndex.build(["5449000000996", "0012345678905", "3017620422003"], tmp_path)
+
+    # One file, swapped in one rename: the open index keeps its own build
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["barcodes.npy"]
+    assert old.lookup_many(["3017620422003", "5449000000996", "012345678905"]) == [0, 1, None]
+    new = BarcodeIndex(tmp_path)
+    assert new.lookup_many(["3017620422003", "5449000000996", "012345678905"]) == [2, 0, 1]
+
+
+def test_scan_endpoint_resolves_locally(tmp_path, monkeypatch):
+    from src.server import app
+
+    ProductStore.build([("Nutella", [{"energy": 539}], "3017620422003")], tmp_path / "store")
+    store = ProductStore(tmp_path / "store")
+    BarcodeIndex.build_from_store(store, tmp_path / "barcodes")
+    monkeypatch.setattr(food_lookup, "product_store_component", Component("product_store", lambda: store))
+    monkeypatch.setattr(food_lookup, "barcode_index_component",
+                        Component("barcode_index", lambda: BarcodeIndex(tmp_path / "barcodes")))
+    monkeypatch.setattr(food_lookup, "analyse_macro", lambda code, timeout=None: None)
+    client = app.test_client()
+
+    response = client.post("/scan", json={"barcode": "3017620422003"})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["source"] == "local"
+    assert body["result"] == {"product_name": "Nutella", "code": "3017620422003", "nutriments": {"energy": 539}}
+
+    assert client.post("/scan", json={"barcode": "5449000000996"}).status_code == 404
+    assert client.post("/scan", json={}).status_code == 400
+    for barcode in ["../x?y=", "12 34", "abc", "", "1" * 40]:
+        assert client.post("/scan", json={"barcode": barcode}).status_code == 400
+    store.close()
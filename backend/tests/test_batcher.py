@@ -0,0 +1,136 @@
+"""
+Tests for the micro-batching dispatcher
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.batcher import BatchTimeout, MicroBatcher
+
+
+def test_concurrent_submissions_are_batched():
+    calls = []
+
+    def process(items):
+        calls.append(list(items))
+        time.sleep(0.01)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda i: batcher.submit(i).result(timeout=5), range(32)))
+
+    assert results == [i * 2 for i in range(32)]
+    stats = batcher.stats()
+    assert stats["items"] == stats["submitted"] == 32
+    assert stats["batches"] == len(calls) < 32
+    assert stats["max_batch_size"] <= 8
+    assert sum(size * count for size, count in stats["batch_size_counts"].items()) == 32
+    batcher.close()
+
+
+def test_single_submission_waits_at_most_the_window():
+    batcher = MicroBatcher(lambda items: items, max_wait_ms=5)
+    start = time.monotonic()
+    assert batcher.submit("apple").result(timeout=1) == "apple"
+    assert time.monotonic() - start < 0.5
+    batcher.close()
+
+
+def test_batch_errors_propagate_to_every_caller():
+    def process(items):
+        raise ValueError("encoder failed")
+
+    batcher = MicroBatcher(process, max_wait_ms=20)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match="encoder failed"):
+            future.result(timeout=1)
+    assert batcher.stats()["errors"] >= 1
+
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+
+
+def test_close_drains_queued_items():
+    release = threading.Event()
+
+    def process(items):
+        release.wait(1)
+        return items
+
+    batcher = MicroBatcher(process, max_batch_size=1, max_wait_ms=0)
+    futures = [batcher.submit(i) for i in range(3)]
+    release.set()
+    batcher.close(timeout=2)
+    assert [future.result(timeout=0) for future in futures] == [0, 1, 2]
+
+
+def test_wait_times_out_on_a_stuck_batch():
+    release = threading.Event()
+
+    def process(items):
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(process, max_wait_ms=1, timeout=0.05)
+    future = batcher.submit("apple")
+    with pytest.raises(BatchTimeout):
+        batcher.wait(future)
+    assert batcher.stats()["timeouts"] == 1
+
+    release.set()
+    assert batcher.wait(future, timeout=1) == "apple"
+    batcher.close()
+
+
+def test_wrong_result_count_fails_the_batch():
+    batcher = MicroBatcher(lambda items: items[:-1], max_wait_ms=20)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match="results"):
+            future.result(timeout=1)
+    batcher.close()
+
+
+# The dispatcher re-raises what killed it, which pytest reports from the thread
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dying_dispatcher_fails_pending_items_and_restarts():
+    class Fatal(BaseException):
+        pass
+
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def process(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            started.set()
+            release.wait(5)
+            raise Fatal()
+        return items
+
+    batcher = MicroBatcher(process, max_batch_size=1, max_wait_ms=1)
+    running = batcher.submit("first")
+    assert started.wait(1)
+    queued = batcher.submit("second")
+    dispatcher = batcher._thread
+    release.set()
+    dispatcher.join(1)
+
+    for future in (running, queued):
+        with pytest.raises(RuntimeError, match="dispatcher stopped"):
+            future.result(timeout=1)
+    assert batcher.wait(batcher.submit("third"), timeout=1) == "third"
+    batcher.close()
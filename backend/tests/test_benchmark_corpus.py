@@ -0,0 +1,47 @@
+"""
+Tests for the synthetic benchmark corpus fixtures
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from benchmarks.corpus import HashEncoder, build_corpus
+from src.product_store import ProductStore
+
+
+def test_corpus_has_the_embeddings_layout(tmp_path):
+    directory = build_corpus(250, dim=16, seed=3, directory=tmp_path / "corpus")
+
+    embeddings = np.load(directory / "embeddings_only.npy")
+    assert embeddings.shape == (250, 16) and embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+
+    from datasets import load_from_disk
+    dataset = load_from_disk(str(directory / "total_dataset"))
+    ProductStore.build_from_dataset(dataset, tmp_path / "store")
+    product_name, nutriments_info, code = ProductStore(tmp_path / "store").get(249)
+    assert isinstance(product_name, str) and "energy-kcal_100g" in nutriments_info
+    assert code == "2000000000249"
+
+
+def test_corpus_is_deterministic_and_reused(tmp_path):
+    first = build_corpus(100, dim=8, seed=1, directory=tmp_path / "a")
+    second = build_corpus(100, dim=8, seed=1, directory=tmp_path / "b")
+    np.testing.assert_array_equal(np.load(first / "embeddings_only.npy"), np.load(second / "embeddings_only.npy"))
+
+    mtime = (first / "embeddings_only.npy").stat().st_mtime_ns
+    build_corpus(100, dim=8, seed=1, directory=first)
+    assert (first / "embeddings_only.npy").stat().st_mtime_ns == mtime
+
+
+def test_hash_encoder_is_deterministic():
+    encoder = HashEncoder(dim=8)
+    vectors = encoder.encode(["apple", "banana", "apple"])
+    np.testing.assert_array_equal(vectors[0], vectors[2])
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
@@ -0,0 +1,69 @@
+"""
+Tests for query canonicalization
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.canonicalize import canonicalize, singular
+
+
+@pytest.mark.parametrize("texts", [
+    ["apple", "Apples", "APPLES!", "2 cups of apples", "a bowl of apples"],
+    ["rice", "2 cups of rice", "half a cup of rice", "100g rice", "1/2 cup rice"],
+    ["chicken breast", "Chicken breasts, 100 g", "two servings of chicken breasts", "2 x chicken breasts"],
+    ["egg", "a dozen eggs", "2 dozen eggs"],
+    ["bbq sauce", "Barbecue sauce", "barbeque sauces"],
+    ["mac and cheese", "mac & cheese", "Mac  and   cheese"],
+    ["2% milk", "2% milks"],
+    ["black-eyed peas", "Black eyed pea"],
+    ["creme brulee", "Crème brûlée"],
+    ["mayo", "Mayonnaise"],
+])
+def test_equivalent_texts_share_a_key(texts):
+    assert len({canonicalize(text) for text in texts}) == 1
+
+
+@pytest.mark.parametrize("first,second", [
+    ("milk chocolate", "chocolate milk"),
+    ("whole milk", "2% milk"),
+    ("glass noodles", "noodles"),
+    ("half and half", "half"),
+    # Numbers that are part of a name
+    ("omega 3", "omega"),
+    ("7 up", "up"),
+    ("chicken 65", "chicken"),
+    ("food 1", "food 2"),
+    ("100 grand bar", "bar grand"),
+    ("2 apples", "apple"),
+    # Word order
+    ("rice milk", "milk rice"),
+    ("sauce barbecue", "barbecue sauce"),
+])
+def test_different_foods_keep_different_keys(first, second):
+    assert canonicalize(first) != canonicalize(second)
+
+
+def test_word_order_is_kept_and_quantities_only_stripped_around_units():
+    assert canonicalize("Barbeque Sauces") == "barbecue sauce"
+    assert canonicalize("cup of coffee") == "coffee"
+    assert canonicalize("2 1/2 cups of rice") == "rice"
+    assert canonicalize("7 Up, 2 cans") == "7 up"
+    assert canonicalize("100 Grand Bar") == "100 grand bar"
+    # Nothing but a quantity is kept as typed rather than mapped to ""
+    assert canonicalize(" 2  Cups ") == "2 cups"
+
+
+@pytest.mark.parametrize("plural,expected", [
+    ("berries", "berry"), ("peaches", "peach"), ("tomatoes", "tomato"), ("pies", "pie"),
+    ("cookies", "cookie"), ("leaves", "leaf"), ("hummus", "hummus"), ("couscous", "couscous"),
+    ("peas", "pea"), ("oats", "oat"),
+])
+def test_singular(plural, expected):
+    assert singular(plural) == expected
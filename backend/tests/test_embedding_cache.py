@@ -0,0 +1,93 @@
+"""
+Tests for query embedding memoization
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.embedding_cache import EmbeddingCache, normalize_query
+
+DIM = 8
+
+
+class CountingEncoder:
+    """Deterministic fake encoder recording what it was asked to encode"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.stack([np.random.default_rng(abs(hash(normalize_query(t))) % 2**32).normal(size=DIM)
+                         for t in texts]).astype(np.float32)
+
+
+def test_normalize_query():
+    assert normalize_query("  Peanut   BUTTER \n") == "peanut butter"
+
+
+def test_encodes_only_misses_once():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache()
+
+    first = cache.encode(["Apple", "banana", "apple "], encoder)
+    assert encoder.calls == [["Apple", "banana"]]
+    np.testing.assert_array_equal(first[0], first[2])
+
+    second = cache.encode(["BANANA", "cherry"], encoder)
+    assert encoder.calls[1] == ["cherry"]
+    np.testing.assert_array_equal(second[0], first[1])
+    assert second.dtype == np.float32 and second.shape == (2, DIM)
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+
+def test_memory_tier_respects_byte_budget():
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(max_bytes=3 * (DIM * 4 + 200))
+    cache.encode([f"food {i}" for i in range(10)], encoder)
+    assert cache.stats()["memory"]["items"] == 3
+    assert cache.memory.bytes <= cache.memory.max_bytes
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(persist_dir=tmp_path, max_persisted=3)
+    expected = cache.encode(["apple", "banana", "cherry", "durian"], encoder)
+
+    reopened = EmbeddingCache(persist_dir=tmp_path, max_persisted=3)
+    assert reopened.stats()["persisted"] == 3
+    vectors = reopened.encode(["apple", "banana", "cherry", "durian"], encoder)
+    np.testing.assert_array_equal(vectors, expected)
+    assert encoder.calls[-1] == ["durian"]
+    assert reopened.stats()["disk_hits"] == 3
+
+
+def test_disk_tier_recovers_from_torn_append(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(persist_dir=tmp_path)
+    cache.encode(["apple", "banana"], encoder)
+    # Vector appended but its key line only partially written
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(np.zeros(DIM, dtype=np.float32).tobytes())
+    with open(tmp_path / "keys.jsonl", "a") as f:
+        f.write('"cher')
+
+    reopened = EmbeddingCache(persist_dir=tmp_path)
+    assert reopened.stats()["persisted"] == 2
+    reopened.encode(["cherry"], encoder)
+    again = EmbeddingCache(persist_dir=tmp_path)
+    np.testing.assert_array_equal(again.get("cherry"), encoder(["cherry"])[0])
+
+
+def test_disk_tier_is_discarded_for_another_model(tmp_path):
+    EmbeddingCache(persist_dir=tmp_path, model_name="a").encode(["apple"], CountingEncoder())
+    assert EmbeddingCache(persist_dir=tmp_path, model_name="b").get("apple") is None
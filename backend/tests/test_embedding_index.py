@@ -0,0 +1,73 @@
+"""
+Tests for the memory-mapped embedding index
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.embedding_index import EmbeddingIndex, top_k
+
+
+def _write_embeddings(tmp_path, rows=500, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    embeds = rng.normal(size=(rows, dim)).astype(np.float32) * rng.uniform(0.5, 3.0, size=(rows, 1))
+    path = tmp_path / "embeddings_only.npy"
+    np.save(path, embeds)
+    return path, embeds
+
+
+def _reference_cos_sim(queries, embeds):
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    embeds = embeds / np.linalg.norm(embeds, axis=1, keepdims=True)
+    return queries @ embeds.T
+
+
+def test_search_matches_brute_force_cosine(tmp_path):
+    path, embeds = _write_embeddings(tmp_path)
+    index = EmbeddingIndex(path, chunk_size=64)
+    queries = np.random.default_rng(1).normal(size=(8, embeds.shape[1])).astype(np.float32)
+
+    scores, indices = index.search(queries, k=5)
+    expected = _reference_cos_sim(queries, embeds)
+
+    assert scores.shape == indices.shape == (8, 5)
+    np.testing.assert_array_equal(indices[:, 0], expected.argmax(axis=1))
+    np.testing.assert_allclose(scores[:, 0], expected.max(axis=1), rtol=1e-5)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_sidecar_is_built_once_and_memory_mapped(tmp_path):
+    path, _ = _write_embeddings(tmp_path)
+    index = EmbeddingIndex(path)
+    sidecar = EmbeddingIndex.sidecar_path(path)
+
+    assert index.normalized_path == sidecar
+    assert sidecar.exists()
+    assert isinstance(index.embeddings, np.memmap)
+    np.testing.assert_allclose(np.linalg.norm(index.embeddings, axis=1), 1.0, rtol=1e-5)
+
+    mtime = sidecar.stat().st_mtime_ns
+    EmbeddingIndex(path)
+    assert sidecar.stat().st_mtime_ns == mtime
+
+
+def test_float16_sidecar_agrees_with_float32(tmp_path):
+    path, embeds = _write_embeddings(tmp_path)
+    index = EmbeddingIndex(path, dtype="float16", chunk_size=100)
+    queries = np.random.default_rng(2).normal(size=(4, embeds.shape[1]))
+
+    scores = index.scores(queries)
+    np.testing.assert_allclose(scores, _reference_cos_sim(queries, embeds), atol=2e-3)
+
+
+def test_top_k_handles_k_larger_than_corpus():
+    scores = np.array([[0.1, 0.9, 0.5]], dtype=np.float32)
+    values, indices = top_k(scores, 10)
+    np.testing.assert_array_equal(indices, [[1, 2, 0]])
+    np.testing.assert_allclose(values, [[0.9, 0.5, 0.1]])
@@ -0,0 +1,67 @@
+"""
+Tests for the encoder backends' shared helpers and validation
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.embedding_index import EmbeddingIndex
+from src.encoders import compare_encoders, encoder_id, l2_normalize, load_encoder, mean_pool
+
+
+def test_mean_pool_ignores_padding():
+    tokens = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    np.testing.assert_allclose(mean_pool(tokens, mask), [[2.0, 3.0]])
+
+
+def test_l2_normalize():
+    vectors = l2_normalize(np.array([[3.0, 4.0], [0.0, 0.0]], dtype=np.float32))
+    np.testing.assert_allclose(vectors, [[0.6, 0.8], [0.0, 0.0]])
+
+
+def test_encoder_ids_differ_per_backend():
+    assert len({encoder_id("torch"), encoder_id("onnx", False), encoder_id("onnx", True)}) == 3
+
+
+class TableEncoder:
+    """Fake encoder looking texts up in a fixed table, optionally with noise"""
+
+    def __init__(self, table, noise=0.0):
+        self.table = table
+        self.noise = noise
+
+    def encode(self, texts, batch_size=32):
+        vectors = np.stack([self.table[text] for text in texts])
+        rng = np.random.default_rng(0)
+        return (vectors + rng.normal(scale=self.noise, size=vectors.shape)).astype(np.float32)
+
+
+def test_compare_encoders_reports_cosine_and_top1(tmp_path):
+    rng = np.random.default_rng(1)
+    corpus = l2_normalize(rng.normal(size=(200, 16)).astype(np.float32))
+    np.save(tmp_path / "embeddings_only.npy", corpus)
+    index = EmbeddingIndex(tmp_path / "embeddings_only.npy")
+    table = {f"text {i}": corpus[i] for i in range(50)}
+
+    identical = compare_encoders(TableEncoder(table), TableEncoder(table), list(table), index)
+    assert identical["mean_cosine"] == pytest.approx(1.0)
+    assert identical["top1_agreement"] == 1.0
+
+    noisy = compare_encoders(TableEncoder(table), TableEncoder(table, noise=0.05), list(table), index)
+    assert 0.9 < noisy["min_cosine"] <= noisy["mean_cosine"] < 1.0
+    assert noisy["top1_agreement"] > 0.9
+
+
+def test_load_encoder_errors(tmp_path):
+    with pytest.raises(ValueError):
+        load_encoder("tensorflow")
+    with pytest.raises(FileNotFoundError):
+        load_encoder("onnx", onnx_dir=tmp_path)
@@ -0,0 +1,218 @@
+"""
+Tests for the SQLite-backed food cache
+"""
+
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.food_cache import FoodCache
+
+PEANUT_BUTTER = ("Peanut Butter", "Smooth Peanut Butter", {"fat": 50.0}, "0001", 0.91)
+APPLE = ("Apple", "Golden Apple", None, "0002", 0.88)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    food_cache = FoodCache(str(tmp_path / "food_cache.db"))
+    yield food_cache
+    food_cache.close()
+
+
+def test_exact_and_fuzzy_hits(cache):
+    cache.add_to_cache(*PEANUT_BUTTER)
+
+    assert cache.get_cached_result("  peanut butter ") == ("Smooth Peanut Butter", {"fat": 50.0}, 0.91, "0001")
+    product_name, _, score, _ = cache.get_cached_result("peanut buter")
+    assert product_name == "Smooth Peanut Butter"
+    assert 0.85 <= score < 1.0
+    assert cache.get_cached_result("rice") is None
+
+
+def test_add_many_to_cache(cache):
+    cache.add_many_to_cache([PEANUT_BUTTER, APPLE, ("apple", "Red Apple", None, "0003", 0.8)])
+
+    assert cache.get_cache_size() == 3
+    assert cache.food_names_list == ["peanut butter", "apple"]
+    assert cache.get_cached_result("Peanut Butter")[0] == "Smooth Peanut Butter"
+    assert cache.get_cached_result("APPLE") is not None
+    cache.add_many_to_cache([])
+    assert cache.get_cache_size() == 3
+
+
+def test_cache_persists_across_instances(tmp_path):
+    db_path = str(tmp_path / "food_cache.db")
+    first = FoodCache(db_path)
+    first.add_many_to_cache([PEANUT_BUTTER, APPLE])
+    first.close()
+
+    second = FoodCache(db_path)
+    assert second.get_cache_size() == 2
+    assert second.get_cached_result("apple")[3] == "0002"
+    second.close()
+
+
+def test_hot_tier_serves_hits_without_sql(tmp_path):
+    db_path = str(tmp_path / "food_cache.db")
+    writer = FoodCache(db_path)
+    writer.add_many_to_cache([PEANUT_BUTTER, APPLE])
+    writer.close()
+
+    cache = FoodCache(db_path, reader_pool_size=1)
+    statements = []
+    with cache._reading() as reader:
+        reader.set_trace_callback(statements.append)
+
+    # First hit reads through to SQLite, later exact and fuzzy hits do not
+    assert cache.get_cached_result("apple")[0] == "Golden Apple"
+    assert len(statements) == 1
+    assert cache.get_cached_result("Apple ")[0] == "Golden Apple"
+    assert cache.get_cached_result("aple")[2] < 1.0
+    assert cache.get_cached_result("unknown food") is None
+    assert len(statements) == 1
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["fuzzy_hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["hot_tier"]["hits"] == 2
+    cache.close()
+
+
+def test_hot_tier_is_bounded(tmp_path):
+    cache = FoodCache(str(tmp_path / "food_cache.db"), hot_cache_max_items=1)
+    cache.add_many_to_cache([PEANUT_BUTTER, APPLE])
+
+    assert len(cache.hot_cache) == 1
+    assert cache.get_cached_result("peanut butter")[3] == "0001"
+    assert cache.hot_cache.stats()["evictions"] == 2
+    cache.close()
+
+
+def _count_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM food_cache").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_write_through_commits_each_add(tmp_path):
+    db_path = str(tmp_path / "food_cache.db")
+    cache = FoodCache(db_path)
+    cache.add_to_cache(*PEANUT_BUTTER)
+
+    assert _count_rows(db_path) == 1
+    assert cache.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    cache.close()
+
+
+def test_write_behind_buffers_until_size_threshold(tmp_path):
+    db_path = str(tmp_path / "food_cache.db")
+    cache = FoodCache(db_path, write_behind=True, flush_max_items=3, flush_interval=60)
+    cache.hot_cache.clear()
+    cache.add_to_cache(*PEANUT_BUTTER)
+    cache.add_to_cache(*APPLE)
+
+    # Buffered rows are visible to lookups, even after leaving the hot tier
+    cache.hot_cache.clear()
+    assert cache.get_cached_result("apple")[0] == "Golden Apple"
+    assert cache.stats()["pending_writes"] == 2
+    assert _count_rows(db_path) == 0
+
+    cache.add_to_cache("Rice", "White Rice", None, "0004", 0.9)
+    assert cache.stats()["pending_writes"] == 0
+    assert _count_rows(db_path) == 3
+    cache.close()
+
+
+def test_write_behind_flushes_on_interval_and_close(tmp_path):
+    db_path = str(tmp_path / "food_cache.db")
+    cache = FoodCache(db_path, write_behind=True, flush_max_items=100, flush_interval=0.05)
+    cache.add_to_cache(*PEANUT_BUTTER)
+    deadline = time.monotonic() + 5
+    while _count_rows(db_path) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _count_rows(db_path) == 1
+
+    cache.add_to_cache(*APPLE)
+    cache.close()
+    assert _count_rows(db_path) == 2
+
+
+def test_write_behind_rows_are_lost_without_flush(tmp_path):
+    db_path = str(tmp_path / "food_cache.db")
+    cache = FoodCache(db_path, write_behind=True, flush_max_items=100, flush_interval=60)
+    cache.add_many_to_cache([PEANUT_BUTTER, APPLE])
+
+    # A second process only sees what has been flushed
+    other = FoodCache(db_path)
+    assert other.get_cached_result("apple") is None
+    cache.flush()
+    other.close()
+    other = FoodCache(db_path)
+    assert other.get_cached_result("apple")[3] == "0002"
+    other.close()
+    cache.close()
+
+
+def test_rows_committed_by_other_processes_are_picked_up(tmp_path):
+    db_path = str(tmp_path / "food_cache.db")
+    cache = FoodCache(db_path, refresh_interval=0)
+    cache.add_to_cache(*PEANUT_BUTTER)
+    assert cache.get_cached_result("apple") is None
+
+    # Another prefork worker writing back, or init_cache.py on the live database
+    other = FoodCache(db_path)
+    other.add_to_cache(*APPLE)
+    other.close()
+
+    assert cache.get_cached_result("apple")[3] == "0002"
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.refresh() == 0
+    assert len(cache.food_names_list) == 2
+    cache.close()
+
+    never = FoodCache(db_path, refresh_interval=None)
+    writer = FoodCache(db_path)
+    writer.add_to_cache("banana", "Banana", None, "0003", 0.9)
+    writer.close()
+    assert never.get_cached_result("banana") is None
+    assert never.refresh() == 1
+    assert never.get_cached_result("banana")[3] == "0003"
+    never.close()
+
+
+def test_canonical_forms_take_the_exact_path(cache):
+    cache.add_many_to_cache([APPLE, ("BBQ sauce", "Smoky Sauce", None, "0004", 0.9)])
+
+    assert cache.get_cached_result("apple") == ("Golden Apple", None, 0.88, "0002")
+    assert cache.get_cached_result("2 cups of Apples")[2] == 0.88
+    assert cache.get_cached_result("barbecue sauces")[3] == "0004"
+    assert cache.has_exact("a bowl of apples")
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["canonical_hits"], stats["fuzzy_hits"]) == (3, 2, 0)
+    assert stats["canonical_hit_ratio"] == pytest.approx(2 / 3)
+
+
+def test_rekeys_rows_of_an_older_canonical_version(tmp_path):
+    db_path = str(tmp_path / "food_cache.db")
+    FoodCache(db_path).close()
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("INSERT INTO food_cache (food_name, normalized_name, product_name, code) "
+                     "VALUES ('Apples', 'apples', 'Golden Apple', '0002')")
+        conn.execute("PRAGMA user_version = 0")
+    conn.close()
+
+    cache = FoodCache(db_path)
+    assert cache.food_names_list == ["apple"]
+    assert cache.get_cached_result("apple")[3] == "0002"
+    assert cache.stats()["exact_hits"] == 1
+    cache.close()
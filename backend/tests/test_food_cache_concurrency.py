@@ -0,0 +1,119 @@
+"""
+Concurrency stress tests for FoodCache
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from rapidfuzz import fuzz, process
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src import food_cache as food_cache_module
+from src.canonicalize import canonicalize
+from src.food_cache import FoodCache
+
+# One spelling per canonical key, e.g. "apple" but not also "apples"
+_BY_KEY = {}
+for _line in open(backend_root / "data" / "common_foods_list.txt"):
+    if _line.strip():
+        _BY_KEY.setdefault(canonicalize(_line), _line.strip().lower())
+FOODS = list(_BY_KEY.values())
+
+
+def _item(name):
+    return (name, f"Product {name}", {"energy-kcal": len(name)}, f"code-{name}", 0.9)
+
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_concurrent_reads_during_writes(tmp_path, monkeypatch, write_behind):
+    # Force frequent delta merges while readers are running
+    monkeypatch.setattr(food_cache_module, "_DELTA_MAX_NAMES", 16)
+    cache = FoodCache(str(tmp_path / "food_cache.db"), hot_cache_max_items=50,
+                      write_behind=write_behind, flush_max_items=25, flush_interval=0.01)
+    initial, added = FOODS[:400], FOODS[400:]
+    cache.add_many_to_cache(_item(name) for name in initial)
+
+    errors = []
+    stop = threading.Event()
+
+    def reader(offset):
+        try:
+            i = offset
+            while not stop.is_set():
+                name = initial[i % len(initial)]
+                result = cache.get_cached_result(name)
+                assert result is not None and result[3] == f"code-{name}", name
+                i += 7
+        except Exception as e:
+            errors.append(e)
+
+    def writer():
+        try:
+            for name in added:
+                cache.add_to_cache(*_item(name))
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(8)]
+    writers = [threading.Thread(target=writer)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    for name in added:
+        assert cache.get_cached_result(name)[3] == f"code-{name}"
+    assert cache.get_cache_size() == len(FOODS)
+    cache.close()
+
+
+def test_short_lived_threads_share_a_bounded_reader_pool(tmp_path):
+    cache = FoodCache(str(tmp_path / "food_cache.db"), hot_cache_max_items=0, reader_pool_size=4)
+    cache.add_many_to_cache(_item(name) for name in FOODS[:50])
+    errors = []
+
+    def lookup(name):
+        try:
+            assert cache.get_cached_result(name)[3] == f"code-{name}"
+        except Exception as e:
+            errors.append(e)
+
+    # One thread per request, like the threaded development server
+    for start in range(0, 500, 10):
+        threads = [threading.Thread(target=lookup, args=(FOODS[(start + i) % 50],)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert not errors
+    assert len(cache._readers) <= 4
+    cache.close()
+
+
+def test_snapshot_fuzzy_matching_equals_linear_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(food_cache_module, "_DELTA_MAX_NAMES", 50)
+    cache = FoodCache(str(tmp_path / "food_cache.db"))
+    for start in range(0, 300, 30):
+        cache.add_many_to_cache(_item(name) for name in FOODS[start:start + 30])
+
+    names = cache.food_names_list
+    assert names == [canonicalize(name) for name in FOODS[:300]]
+    for query in ["aple", "chiken breast", "banan", "peanut buter", "zzz"]:
+        expected = process.extractOne(canonicalize(query), names, scorer=fuzz.ratio, score_cutoff=85)
+        result = cache.get_cached_result(query)
+        if expected is None:
+            assert result is None
+        else:
+            assert result[3] == f"code-{_BY_KEY[expected[0]]}"
+            assert result[2] == pytest.approx(min(0.9, expected[1] / 100))
+    cache.close()
@@ -0,0 +1,69 @@
+"""
+Tests that the fuzzy index returns exactly what a linear extractOne scan returns
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+from rapidfuzz import fuzz, process
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src import fuzzy_index
+from src.fuzzy_index import FuzzyIndex
+
+WORDS = [line.strip().lower() for line in open(backend_root / "data" / "common_foods_list.txt") if line.strip()]
+
+
+def _mutate(text, rng):
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        op = rng.choice("ids")
+        position = rng.randrange(len(chars) + 1)
+        if op == "i" or not chars:
+            chars.insert(position, rng.choice("abcdefghijklmnopqrstuvwxyz %"))
+        elif op == "d":
+            del chars[min(position, len(chars) - 1)]
+        else:
+            chars[min(position, len(chars) - 1)] = rng.choice("aeiou")
+    return "".join(chars)
+
+
+@pytest.fixture(autouse=True)
+def always_prune(monkeypatch):
+    # Exercise the pruning path even on the small test corpus
+    monkeypatch.setattr(fuzzy_index, "LINEAR_SCAN_MAX_NAMES", 0)
+
+
+@pytest.mark.parametrize("threshold", [85.0, 70.0, 95.0, 50.0, 0.0])
+def test_matches_linear_extract_one(threshold):
+    rng = random.Random(int(threshold))
+    names = list(dict.fromkeys(WORDS + [_mutate(word, rng) for word in WORDS] + ["", "a", "aa", "aaa"]))
+    index = FuzzyIndex(names)
+    queries = [_mutate(rng.choice(WORDS), rng) for _ in range(400)] + ["", "a", "ab", "zzzzzz"]
+
+    for query in queries:
+        expected = process.extractOne(query, names, scorer=fuzz.ratio, score_cutoff=threshold)
+        assert index.extract_one(query, score_cutoff=threshold) == expected, query
+
+
+def test_candidates_prune_most_names():
+    index = FuzzyIndex(WORDS)
+    assert len(index.candidates("peanut butter", 85.0)) < len(WORDS) / 20
+
+
+def test_add_is_idempotent_and_clear_resets():
+    index = FuzzyIndex(["apple", "banana"])
+    assert not index.add("apple")
+    assert index.add("apples")
+    assert index.names == ["apple", "banana", "apples"]
+    assert "apples" in index
+    assert index.extract_one("appless", 85.0) == ("apples", pytest.approx(92.307, rel=1e-3), 2)
+
+    index.clear()
+    assert len(index) == 0
+    assert index.extract_one("apple", 85.0) is None
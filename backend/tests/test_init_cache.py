@@ -0,0 +1,72 @@
+"""
+Tests for the cache warm-up helpers in scripts/init_cache.py
+"""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent and scripts directories to path
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+sys.path.insert(0, str(backend_root / "scripts"))
+
+import init_cache
+from src import food_lookup
+from src.food_cache import FoodCache
+
+
+def test_iter_names_streams_json_and_txt_identically():
+    json_path = backend_root / "data" / "common_foods_list.json"
+    expected = json.loads(json_path.read_text())
+
+    assert list(init_cache.iter_names(json_path, chunk_size=5)) == expected
+    assert list(init_cache.iter_names(backend_root / "data" / "common_foods_list.txt")) == expected
+
+
+def test_iter_names_handles_escapes_and_rejects_non_arrays(tmp_path):
+    path = tmp_path / "names.json"
+    path.write_text('[ "Crème \\"brûlée\\"" ,\n"", "Tea"]')
+    assert list(init_cache.iter_names(path, chunk_size=3)) == ['Crème "brûlée"', "Tea"]
+
+    path.write_text('{"name": "Tea"}')
+    with pytest.raises(ValueError):
+        list(init_cache.iter_names(path))
+
+
+def test_checkpoint_round_trip_and_source_change(tmp_path):
+    source = tmp_path / "names.txt"
+    source.write_text("Apple\nBanana\n")
+    checkpoint = tmp_path / "checkpoint.json"
+
+    assert init_cache.load_checkpoint(checkpoint, source) == 0
+    init_cache.save_checkpoint(checkpoint, source, 1)
+    assert init_cache.load_checkpoint(checkpoint, source) == 1
+
+    source.write_text("Apple\nBanana\nCherry\n")
+    assert init_cache.load_checkpoint(checkpoint, source) == 0
+
+
+def test_checkpoint_only_claims_rows_on_disk_with_write_behind(tmp_path, monkeypatch):
+    source = tmp_path / "names.txt"
+    source.write_text("Apple\nBanana\nCherry\n")
+    checkpoint = tmp_path / "checkpoint.json"
+    db_path = str(tmp_path / "food_cache.db")
+    food_cache = FoodCache(db_path, write_behind=True, flush_max_items=1000, flush_interval=60)
+
+    def semantic_search(texts, encode_batch_size=32):
+        return [(f"Product {text}", None, 0.9, text) for text in texts]
+
+    monkeypatch.setattr(food_lookup, "get_food_cache", lambda: food_cache)
+    monkeypatch.setattr(food_lookup, "semantic_search", semantic_search)
+    init_cache.warm_cache(source, checkpoint, batch_size=2, limit=3)
+
+    # A crash now loses nothing the checkpoint counts as processed
+    assert init_cache.load_checkpoint(checkpoint, source) == 3
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM food_cache").fetchone()[0] == 3
+    conn.close()
+    food_cache.close()
@@ -0,0 +1,115 @@
+"""
+Tests for deferred component loading and the server's readiness behaviour
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+# Keep the server from loading the real model when imported by these tests
+os.environ.setdefault("FOODSCANNER_BACKGROUND_LOADING", "0")
+
+from src import food_lookup
+from src.food_cache import FoodCache
+from src.loader import Component, ComponentNotReady
+
+
+def test_blocking_get_loads_once():
+    calls = []
+    component = Component("thing", lambda: calls.append(1) or "value")
+
+    assert component.peek() is None
+    assert component.get() == "value"
+    assert component.get() == "value"
+    assert calls == [1]
+    status = component.status()
+    assert status["state"] == Component.READY
+    assert status["load_seconds"] is not None
+
+
+def test_non_blocking_get_raises_until_ready():
+    release = threading.Event()
+    component = Component("slow", lambda: release.wait(5) and "value")
+
+    with pytest.raises(ComponentNotReady):
+        component.get(block=False)
+    assert component.status()["state"] == Component.LOADING
+
+    release.set()
+    assert component.get() == "value"
+    assert component.get(block=False) == "value"
+
+
+def test_failed_load_is_reported():
+    def fail():
+        raise ValueError("missing artifact")
+
+    component = Component("broken", fail)
+    component.start()
+    with pytest.raises(RuntimeError, match="missing artifact"):
+        component.get()
+    assert component.status() == {
+        "state": Component.FAILED,
+        "load_seconds": component.load_seconds,
+        "error": "missing artifact",
+    }
+
+
+@pytest.fixture
+def warming_server(tmp_path, monkeypatch):
+    """Server whose food cache is ready while the model is still loading"""
+    from src.server import app
+
+    food_cache = FoodCache(str(tmp_path / "food_cache.db"))
+    food_cache.add_to_cache("peanut butter", "Peanut Butter", None, "123", 0.9)
+    cache_component = Component("food_cache", lambda: food_cache)
+    cache_component.get()
+
+    release = threading.Event()
+    model = Component("model", lambda: release.wait(5))
+    monkeypatch.setattr(food_lookup, "food_cache_component", cache_component)
+    monkeypatch.setattr(food_lookup, "_semantic_components", [model])
+    monkeypatch.setattr(food_lookup, "components", [cache_component, model])
+    monkeypatch.setattr(food_lookup, "_block_on_load", False)
+    yield app.test_client()
+    release.set()
+    food_cache.close()
+
+
+def test_cache_hits_are_served_while_warming(warming_server):
+    response = warming_server.post("/food_lookup", json={"food_text": "peanut butter"})
+    assert response.status_code == 200
+    assert response.get_json()["result"]["product_name"] == "Peanut Butter"
+
+
+def test_cache_misses_get_503_while_warming(warming_server):
+    response = warming_server.post("/food_lookup", json={"food_text": "sparkling water"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+
+
+def test_batch_serves_hits_and_marks_misses_unavailable_while_warming(warming_server):
+    response = warming_server.post("/food_lookup/batch",
+                                   json={"food_texts": ["peanut butter", "sparkling water", "Peanut Butter"]})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [item["status"] for item in results] == ["success", "unavailable", "success"]
+    assert results[0]["result"]["product_name"] == "Peanut Butter"
+    assert results[1]["food_text"] == "sparkling water"
+
+
+def test_ready_reports_component_state(warming_server):
+    response = warming_server.get("/ready")
+    assert response.status_code == 503
+    body = response.get_json()
+    assert body["ready"] is False
+    assert body["components"]["food_cache"]["state"] == "ready"
+    assert body["components"]["model"]["state"] in ("pending", "loading")
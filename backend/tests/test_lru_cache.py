@@ -0,0 +1,52 @@
+"""
+Tests for the bounded LRU cache
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used_by_count():
+    cache = LRUCache(max_items=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["evictions"], stats["items"]) == (3, 1, 2)
+
+
+def test_byte_budget_accounting():
+    cache = LRUCache(max_bytes=100, sizeof=len)
+    cache.put("a", "x" * 40)
+    cache.put("b", "x" * 40)
+    cache.put("a", "x" * 10)
+    assert cache.bytes == 50
+
+    cache.put("c", "x" * 60)
+    assert "b" not in cache and "a" in cache
+    assert cache.bytes == 70
+
+    cache.put("huge", "x" * 101)
+    assert "huge" not in cache
+    assert cache.pop("a") == "x" * 10
+    assert cache.bytes == 60
+
+
+def test_miss_counting_and_clear():
+    cache = LRUCache()
+    assert cache.get("missing", "default") == "default"
+    cache.put("a", None)
+    assert cache.get("a", "default") is None
+    cache.clear()
+    assert len(cache) == 0 and cache.bytes == 0
+    assert cache.stats()["misses"] == 1
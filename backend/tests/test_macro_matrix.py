@@ -0,0 +1,95 @@
+"""
+Tests for the macro-nutrient matrix and /meal_totals
+"""
+
+import math
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+os.environ.setdefault("FOODSCANNER_BACKGROUND_LOADING", "0")
+
+from src import food_lookup
+from src.barcode_index import BarcodeIndex
+from src.loader import Component
+from src.macro_matrix import MacroMatrix, macro_values
+from src.product_store import ProductStore
+from src.server import app
+
+ROWS = [
+    ("Nutella", [{"energy-kcal_100g": 539, "proteins_100g": 6.3, "carbohydrates_100g": 57.5, "fat_100g": 30.9,
+                  "energy-kcal_serving": 80.9, "proteins_serving": 0.9, "carbohydrates_serving": 8.6,
+                  "fat_serving": 4.6}], "3017620422003"),
+    ("Peanut Butter", [{"name": "energy", "100g": 2510.4}, {"name": "proteins", "100g": "25"},
+                       {"name": "fat", "100g": 50.0}], "0001"),
+    ("Water", [], "5449000000996"),
+]
+
+
+def test_macro_values_of_both_nutriment_shapes():
+    nutella, peanut_butter, water = (macro_values(nutriments) for _, nutriments, _ in ROWS)
+    np.testing.assert_allclose(nutella, [[539, 6.3, 57.5, 30.9], [80.9, 0.9, 8.6, 4.6]], rtol=1e-6)
+    # kJ energy is converted, strings parsed, unreported nutrients are NaN
+    np.testing.assert_allclose(peanut_butter[0], [600, 25, math.nan, 50], rtol=1e-6)
+    assert np.isnan(peanut_butter[1]).all() and np.isnan(water).all()
+    assert np.isnan(macro_values({"fat_100g": "n/a", "proteins_100g": float("inf")})).all()
+
+
+def test_totals(tmp_path):
+    assert MacroMatrix.build((nutriments for _, nutriments, _ in ROWS), tmp_path, rows=3) == 2
+    matrix = MacroMatrix(tmp_path)
+    assert len(matrix) == 3
+
+    totals, incomplete = matrix.totals([0, 0, 1], grams=[100, 0, 50], servings=[0, 2, 0])
+    np.testing.assert_allclose(totals, [539 + 161.8 + 300, 6.3 + 1.8 + 12.5, 57.5 + 17.2, 30.9 + 9.2 + 25],
+                               rtol=1e-5)
+    assert incomplete.tolist() == [False, False, True]
+    # Servings of a product without per-serving values count as missing
+    assert matrix.totals([1], grams=[0], servings=[1])[1].tolist() == [True]
+    assert matrix.totals([], grams=[], servings=[])[0].tolist() == [0.0] * 4
+
+    with pytest.raises(ValueError):
+        MacroMatrix.build([[]], tmp_path / "short", rows=2)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    ProductStore.build(ROWS, tmp_path / "store")
+    store = ProductStore(tmp_path / "store")
+    BarcodeIndex.build_from_store(store, tmp_path / "barcodes")
+    MacroMatrix.build_from_store(store, tmp_path / "macros")
+    monkeypatch.setattr(food_lookup, "barcode_index_component",
+                        Component("barcode_index", lambda: BarcodeIndex(tmp_path / "barcodes")))
+    monkeypatch.setattr(food_lookup, "macro_matrix_component",
+                        Component("macro_matrix", lambda: MacroMatrix(tmp_path / "macros")))
+    yield app.test_client()
+    store.close()
+
+
+def test_meal_totals_endpoint(client):
+    response = client.post("/meal_totals", json={"items": [
+        {"code": "3017620422003", "grams": 50},
+        {"row": 0, "servings": 1},
+        {"code": "42", "grams": 100},
+        {"row": 1, "grams": 100},
+        {"row": 99, "grams": 100},
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["totals"]["calories"] == pytest.approx(269.5 + 80.9 + 600, rel=1e-5)
+    assert body["totals"]["protein"] == pytest.approx(3.15 + 0.9 + 25, rel=1e-5)
+    assert body["totals"]["carbs"] == pytest.approx(28.75 + 8.6, rel=1e-5)
+    assert body["unknown"] == [2, 4]
+    assert body["incomplete"] == [3]
+
+    assert client.post("/meal_totals", json={"items": []}).get_json()["totals"]["fat"] == 0.0
+    for items in [None, "x", [1], [{"grams": 10}], [{"code": "1", "row": 0, "grams": 1}],
+                  [{"row": -1, "grams": 1}], [{"row": 0}], [{"row": 0, "grams": -5}], [{"row": 0, "servings": True}]]:
+        assert client.post("/meal_totals", json={"items": items}).status_code == 400
@@ -0,0 +1,106 @@
+"""
+Tests for latency metrics, the /metrics endpoint and the sampling profiler
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+# Keep the server from loading the real model when imported by these tests
+os.environ.setdefault("FOODSCANNER_BACKGROUND_LOADING", "0")
+
+from src.metrics import Histogram, Registry, STAGE_SECONDS, span
+from src.profiler import OTHER_STACK, SamplingProfiler
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo", labelnames=("stage",), buckets=(0.001, 0.01))
+    histogram.observe(0.0005, "a")
+    histogram.observe(0.005, "a")
+    histogram.observe(5.0, "a")
+
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{stage="a",le="0.001"} 1' in lines
+    assert 'demo_seconds_bucket{stage="a",le="0.01"} 2' in lines
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="a"} 3' in lines
+    assert histogram.snapshot("a")[0] == 3
+
+
+def test_span_records_stage_time():
+    before = STAGE_SECONDS.snapshot("test_stage")[0]
+    with span("test_stage"):
+        time.sleep(0.001)
+    count, total = STAGE_SECONDS.snapshot("test_stage")
+    assert count == before + 1
+    assert total >= 0.001
+
+
+def test_registry_renders_collectors():
+    registry = Registry()
+    registry.counter("demo_total", "Demo", labelnames=("kind",)).inc("x", amount=2)
+    registry.add_collector(lambda: [("demo_ratio", "Ratio", "gauge", 0.5), ("demo_missing", "Skipped", "gauge", None)])
+
+    text = registry.render()
+    assert 'demo_total{kind="x"} 2.0' in text
+    assert "# TYPE demo_ratio gauge\ndemo_ratio 0.5" in text
+    assert "demo_missing" not in text
+
+
+def test_metrics_endpoint():
+    from src.server import app
+
+    client = app.test_client()
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'foodscanner_request_seconds_count{endpoint="/health",status="200"}' in text
+    assert "# TYPE foodscanner_stage_seconds histogram" in text
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_collects_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy, args=(stop,))
+    worker.start()
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    time.sleep(0.1)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert profiler.samples > 0
+    assert "busy (test_metrics.py" in profiler.collapsed()
+    profiler.reset()
+    assert profiler.collapsed() == ""
+
+
+def _sample_at_depth(profiler, depth):
+    if depth:
+        return _sample_at_depth(profiler, depth - 1)
+    profiler.sample()
+
+
+def test_sampling_profiler_bounds_distinct_stacks():
+    profiler = SamplingProfiler(max_stacks=5)
+    for depth in range(20):
+        _sample_at_depth(profiler, depth)
+
+    counts = dict(line.rsplit(" ", 1) for line in profiler.collapsed().splitlines())
+    assert len(counts) <= 6
+    assert OTHER_STACK in counts
+    # No sample is lost, only its stack
+    assert sum(int(count) for count in counts.values()) >= 20
@@ -0,0 +1,85 @@
+"""
+Tests for the pre-fork serving mode and per-process memory reporting
+"""
+
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from benchmarks.corpus import build_corpus
+from src.metrics import process_memory
+
+
+def test_process_memory():
+    memory = process_memory()
+    if not memory:
+        pytest.skip("/proc/<pid>/smaps_rollup is not available")
+    assert 0 < memory["uss"] <= memory["pss"] <= memory["rss"]
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.load(response)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_workers_share_preloaded_components(tmp_path):
+    corpus = build_corpus(500, dim=16, seed=0, directory=tmp_path / "corpus")
+    env = dict(os.environ,
+               FOODSCANNER_EMBEDDINGS_DIR=str(corpus),
+               # Per-worker caches stay out of the source tree
+               FOODSCANNER_FOOD_CACHE_DB=str(tmp_path / "food_cache.db"),
+               FOODSCANNER_OFF_CACHE_DB=str(tmp_path / "off_products.db"),
+               FOODSCANNER_EMBEDDING_CACHE_DIR=str(tmp_path / "query_embeddings"),
+               # ONNX sessions are created per worker and lazily, so no model is needed here
+               FOODSCANNER_ENCODER_BACKEND="onnx",
+               PYTHONUNBUFFERED="1")
+    parent = subprocess.Popen([sys.executable, "-m", "src.prefork", "--workers", "2",
+                               "--host", "127.0.0.1", "--port", "0"],
+                              cwd=backend_root, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        serving = 0
+        port = None
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline and serving < 2:
+            line = parent.stdout.readline()
+            if not line:
+                break
+            match = re.search(r"Listening on http://127.0.0.1:(\d+)", line)
+            if match:
+                port = int(match.group(1))
+            if "Preloaded" in line:
+                assert "product_store" in line and "search_index" in line
+            if re.search(r"Worker \d serving", line):
+                serving += 1
+        assert port is not None and serving == 2
+
+        assert get_json(f"http://127.0.0.1:{port}/health")["status"] == "healthy"
+        workers = {}
+        for _ in range(50):
+            process = get_json(f"http://127.0.0.1:{port}/stats")["process"]
+            workers[process["pid"]] = process
+            if len(workers) == 2:
+                break
+        assert parent.pid not in workers
+        for process in workers.values():
+            if "uss" not in process:
+                pytest.skip("/proc/<pid>/smaps_rollup is not available")
+            # The preloaded corpus and libraries stay shared with the parent
+            assert process["uss"] < process["rss"] / 2
+    finally:
+        parent.send_signal(signal.SIGTERM)
+        assert parent.wait(timeout=30) == 0
+        parent.stdout.close()
@@ -0,0 +1,160 @@
+"""
+Tests for the Open Food Facts product cache against a local stub API server
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.product_cache import OpenFoodFactsClient, ProductCache
+
+PRODUCTS = {
+    "3017620422003": {"code": "3017620422003", "product_name": "Nutella", "nutriments": {"energy-kcal_100g": 539}},
+    "0000000000017": {"code": "0000000000017", "product_name": "Slow Crackers", "nutriments": {}},
+}
+
+
+class StubOpenFoodFacts(BaseHTTPRequestHandler):
+    """Answers /api/v2/product/<code>.json like Open Food Facts"""
+
+    requests = []
+    delay = 0.0
+    fail = False
+
+    def do_GET(self):
+        code = self.path.rsplit("/", 1)[-1].removesuffix(".json")
+        type(self).requests.append(code)
+        if code == "0000000000017":
+            time.sleep(type(self).delay)
+        if type(self).fail:
+            self.send_response(502)
+            self.end_headers()
+            return
+        if code in PRODUCTS:
+            status, body = 200, {"status": 1, "code": code, "product": PRODUCTS[code]}
+        else:
+            status, body = 404, {"status": 0, "code": code, "status_verbose": "product not found"}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    StubOpenFoodFacts.requests = []
+    StubOpenFoodFacts.delay = 0.0
+    StubOpenFoodFacts.fail = False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenFoodFacts)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_cache(tmp_path, stub_api, **kwargs):
+    client = OpenFoodFactsClient(stub_api, timeout=2.0)
+    return ProductCache(client.get_product, db_path=str(tmp_path / "off_products.db"), **kwargs)
+
+
+def test_fetches_once_then_serves_from_cache(tmp_path, stub_api):
+    cache = make_cache(tmp_path, stub_api)
+    assert cache.get("3017620422003")["product_name"] == "Nutella"
+    assert cache.get("3017620422003")["product_name"] == "Nutella"
+    assert StubOpenFoodFacts.requests == ["3017620422003"]
+    cache.close()
+
+    # Persisted across instances
+    reopened = make_cache(tmp_path, stub_api)
+    assert reopened.get("3017620422003")["product_name"] == "Nutella"
+    assert StubOpenFoodFacts.requests == ["3017620422003"]
+    reopened.close()
+
+
+def test_unknown_codes_are_cached_negatively_until_they_expire(tmp_path, stub_api, clock):
+    cache = make_cache(tmp_path, stub_api, ttl=100, negative_ttl=10, clock=clock)
+    assert cache.get("1234") is None
+    assert cache.get("1234") is None
+    assert StubOpenFoodFacts.requests == ["1234"]
+
+    clock.now += 11
+    assert cache.get("1234") is None
+    assert StubOpenFoodFacts.requests == ["1234", "1234"]
+    cache.close()
+
+
+def test_invalid_codes_are_neither_fetched_nor_cached(tmp_path, stub_api):
+    cache = make_cache(tmp_path, stub_api)
+    for code in ["../x?y=", "abc", "12 34", "1" * 40]:
+        assert cache.get(code) is None
+    assert cache.prefetch(["../x?y=", "abc"]) == 0
+    assert StubOpenFoodFacts.requests == []
+    assert cache.conn.execute("SELECT COUNT(*) FROM off_products").fetchone()[0] == 0
+    with pytest.raises(ValueError):
+        OpenFoodFactsClient(stub_api).get_product("../x?y=")
+    cache.close()
+
+
+def test_stale_products_are_refreshed(tmp_path, stub_api, clock):
+    cache = make_cache(tmp_path, stub_api, ttl=100, clock=clock)
+    cache.get("3017620422003")
+    clock.now += 50
+    cache.get("3017620422003")
+    assert len(StubOpenFoodFacts.requests) == 1
+
+    clock.now += 51
+    # A non-waiting call returns the stale product and refreshes it in the background
+    assert cache.get("3017620422003", timeout=0)["product_name"] == "Nutella"
+    cache.wait_idle(timeout=5)
+    assert len(StubOpenFoodFacts.requests) == 2
+    cache.close()
+
+
+def test_timeout_returns_and_fetch_completes_in_background(tmp_path, stub_api):
+    StubOpenFoodFacts.delay = 0.3
+    cache = make_cache(tmp_path, stub_api)
+    start = time.perf_counter()
+    assert cache.get("0000000000017", timeout=0.05) is None
+    assert time.perf_counter() - start < 0.25
+    assert cache.stats()["timeouts"] == 1
+
+    cache.wait_idle(timeout=5)
+    assert cache.get("0000000000017", timeout=0)["product_name"] == "Slow Crackers"
+    assert StubOpenFoodFacts.requests == ["0000000000017"]
+    cache.close()
+
+
+def test_concurrent_requests_share_one_fetch(tmp_path, stub_api):
+    StubOpenFoodFacts.delay = 0.1
+    cache = make_cache(tmp_path, stub_api)
+    assert cache.prefetch(["0000000000017", "0000000000017", "3017620422003"]) == 2
+    assert cache.get("0000000000017")["product_name"] == "Slow Crackers"
+    cache.wait_idle(timeout=5)
+    assert sorted(StubOpenFoodFacts.requests) == ["0000000000017", "3017620422003"]
+    assert cache.prefetch(["0000000000017", "3017620422003"]) == 0
+    cache.close()
+
+
+def test_failed_fetches_are_not_cached(tmp_path, stub_api):
+    StubOpenFoodFacts.fail = True
+    cache = make_cache(tmp_path, stub_api)
+    assert cache.get("3017620422003") is None
+    assert cache.stats()["fetch_errors"] == 1
+
+    StubOpenFoodFacts.fail = False
+    assert cache.get("3017620422003")["product_name"] == "Nutella"
+    cache.close()
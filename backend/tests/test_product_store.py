@@ -0,0 +1,66 @@
+"""
+Tests for the memory-mapped product store
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.product_store import ProductStore
+
+ROWS = [
+    ("Peanut Butter", [{"name": "fat", "100g": 50.0}, {"name": "proteins", "100g": 25.0}], "0001"),
+    ("Crème fraîche", [], "0002"),
+    ("Apple", None, "0003"),
+]
+
+
+def test_rows_round_trip(tmp_path):
+    assert not ProductStore.exists(tmp_path)
+    assert ProductStore.build(ROWS, tmp_path) == 3
+    assert ProductStore.exists(tmp_path)
+
+    store = ProductStore(tmp_path)
+    assert len(store) == 3
+    assert store.get(0) == ("Peanut Butter", {"name": "fat", "100g": 50.0}, "0001")
+    assert store.get(1) == ("Crème fraîche", None, "0002")
+    assert store.get(2) == ("Apple", None, "0003")
+    assert store.get_many([2, 0]) == [store.get(2), store.get(0)]
+    assert store.get_many(np.array([1, 1])) == [store.get(1)] * 2
+    assert store.get_many([]) == []
+    with pytest.raises(IndexError):
+        store.get(3)
+    with pytest.raises(IndexError):
+        store.get_many([0, 3])
+    store.close()
+
+
+def test_empty_store(tmp_path):
+    ProductStore.build([], tmp_path)
+    store = ProductStore(tmp_path)
+    assert len(store) == 0
+    store.close()
+
+
+def test_build_from_dataset_matches_column_access(tmp_path):
+    datasets = pytest.importorskip("datasets")
+    dataset = datasets.Dataset.from_dict({
+        "product_name": [row[0] for row in ROWS],
+        "nutriments": [row[1] or [] for row in ROWS],
+        "code": [row[2] for row in ROWS],
+        "unused": [1, 2, 3],
+    })
+    ProductStore.build_from_dataset(dataset, tmp_path, batch_size=2)
+    store = ProductStore(tmp_path)
+
+    for row in range(len(dataset)):
+        nutriments = dataset["nutriments"][row]
+        expected = (dataset["product_name"][row], nutriments[0] if nutriments else None, dataset["code"][row])
+        assert store.get(row) == expected
+    store.close()
@@ -0,0 +1,55 @@
+"""
+Tests for sharded exact search
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src.ann_index import load_search_index
+from src.embedding_index import EmbeddingIndex
+from src.sharded_index import SHARD_DIR, ShardedIndex
+
+
+@pytest.fixture(params=["float32", "float16"])
+def exact_index(tmp_path, request):
+    rng = np.random.default_rng(0)
+    np.save(tmp_path / "embeddings_only.npy", rng.normal(size=(1001, 24)).astype(np.float32))
+    return EmbeddingIndex(tmp_path / "embeddings_only.npy", dtype=request.param, chunk_size=128)
+
+
+@pytest.mark.parametrize("n_shards,threads", [(1, 1), (3, 1), (4, 4), (7, 2)])
+def test_matches_exact_search(tmp_path, exact_index, n_shards, threads):
+    ShardedIndex.build(exact_index.embeddings, tmp_path / "shards", n_shards=n_shards, chunk_size=100)
+    index = ShardedIndex(tmp_path / "shards", threads=threads, chunk_size=128)
+    assert len(index) == len(exact_index) and len(index.shards) == n_shards
+
+    queries = np.random.default_rng(1).normal(size=(20, 24))
+    expected_scores, expected = exact_index.search(queries, k=5)
+    scores, indices = index.search(queries, k=5)
+    np.testing.assert_array_equal(indices, expected)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+    # A single query, and k larger than a shard
+    _, single = index.search(queries[0], k=1)
+    assert single[0, 0] == expected[0, 0]
+    assert index.search(queries[:2], k=400)[1].shape == (2, 400)
+    index.close()
+
+
+def test_load_search_index_checks_the_corpus(tmp_path, exact_index):
+    with pytest.raises(FileNotFoundError):
+        load_search_index("sharded", tmp_path, exact_index)
+
+    ShardedIndex.build(exact_index.embeddings[:500], tmp_path / SHARD_DIR, n_shards=2)
+    with pytest.raises(ValueError, match="rebuild"):
+        load_search_index("sharded", tmp_path, exact_index)
+
+    ShardedIndex.build(exact_index.embeddings, tmp_path / SHARD_DIR, n_shards=3)
+    assert len(load_search_index("sharded", tmp_path, exact_index, threads=2).shards) == 3
@@ -0,0 +1,152 @@
+"""
+Tests for coalescing identical in-flight lookups
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+os.environ.setdefault("FOODSCANNER_BACKGROUND_LOADING", "0")
+
+from src import asgi, food_lookup
+from src.food_cache import FoodCache
+from src.loader import Component
+from src.single_flight import FlightTimeout, SingleFlight
+from src.write_back import NOT_FOUND, WriteBackPolicy
+
+APPLE = ("Red Apple", {"energy-kcal_100g": 52}, 0.9, "0001")
+
+
+def test_waiters_share_the_leaders_result():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        leader = executor.submit(flight.do, "key", compute, 21)
+        started.wait(5)
+        waiters = [executor.submit(flight.do, "key", compute, 0) for _ in range(4)]
+        other = executor.submit(flight.do, "other", lambda: "separate")
+        assert other.result(5) == "separate"
+        release.set()
+        assert leader.result(5) == 42
+        assert [waiter.result(5) for waiter in waiters] == [42] * 4
+
+    assert calls == [21]
+    assert flight.stats() == {"leaders": 2, "coalesced": 4, "timeouts": 0, "in_flight": 0}
+    # Finished flights are not cached
+    assert flight.do("key", compute, 1) == 2
+
+
+def test_errors_reach_every_waiter_and_waiters_time_out():
+    flight = SingleFlight(timeout=0.05)
+    future, leader = flight.begin("key")
+    assert leader
+    joined, leader = flight.begin("key")
+    assert joined is future and not leader
+
+    with pytest.raises(FlightTimeout):
+        flight.wait(joined)
+    flight.finish("key", future, error=ValueError("boom"))
+    with pytest.raises(ValueError, match="boom"):
+        flight.wait(joined)
+    assert flight.stats()["timeouts"] == 1
+    assert flight.join("key") is None
+
+
+@pytest.fixture
+def slow_search(tmp_path, monkeypatch):
+    """lookup() over an empty food cache with a semantic search held until released"""
+    food_cache = FoodCache(str(tmp_path / "food_cache.db"))
+    release = threading.Event()
+    calls = []
+
+    def semantic_search(texts, encode_batch_size=32):
+        calls.extend(texts)
+        release.wait(5)
+        return [APPLE if "apple" in text else NOT_FOUND for text in texts]
+
+    monkeypatch.setattr(food_lookup, "food_cache_component", Component("food_cache", lambda: food_cache))
+    monkeypatch.setattr(food_lookup, "_semantic_components", [])
+    monkeypatch.setattr(food_lookup, "semantic_search", semantic_search)
+    monkeypatch.setattr(food_lookup, "semantic_batcher", None)
+    monkeypatch.setattr(food_lookup, "write_back_policy", WriteBackPolicy(admit_after=5))
+    monkeypatch.setattr(food_lookup, "lookup_flight", SingleFlight(timeout=5))
+    yield release, calls
+    release.set()
+    food_cache.close()
+
+
+def _wait_for(stat, value):
+    for _ in range(500):
+        if food_lookup.lookup_flight.stats()[stat] >= value:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{stat} never reached {value}")
+
+
+def test_concurrent_lookups_search_once(slow_search):
+    release, calls = slow_search
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        first = executor.submit(food_lookup.lookup, "green apples")
+        _wait_for("in_flight", 1)
+        same = [executor.submit(food_lookup.lookup, text) for text in ["Green apple", "2 cups of green apples"]]
+        batch = executor.submit(food_lookup.lookup_many, ["green apple", "pear", "green apple"])
+        _wait_for("coalesced", 3)
+        release.set()
+
+        assert first.result(5) == APPLE
+        assert [future.result(5) for future in same] == [APPLE, APPLE]
+        assert batch.result(5) == [APPLE, NOT_FOUND, APPLE]
+
+    # The batch only searched the text nobody else was looking up
+    assert sorted(calls) == ["green apples", "pear"]
+
+
+def test_asgi_waiters_do_not_hold_worker_threads(slow_search):
+    release, calls = slow_search
+    app = asgi.App(workers=1)
+    body = b'{"food_text": "xyzzy"}'
+
+    async def post():
+        scope = {"type": "http", "method": "POST", "path": "/food_lookup", "query_string": b"", "headers": []}
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await app(scope, receive, send)
+        return sent[0]["status"]
+
+    async def scenario():
+        leader = asyncio.ensure_future(post())
+        while not food_lookup.lookup_flight.stats()["in_flight"]:
+            await asyncio.sleep(0.01)
+        # The only worker thread runs the leader; waiters await on the loop
+        waiters = [asyncio.ensure_future(post()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert app.pending == 1
+        release.set()
+        return await asyncio.gather(leader, *waiters)
+
+    assert asyncio.run(scenario()) == [404] * 4
+    assert calls == ["xyzzy"]
@@ -0,0 +1,93 @@
+"""
+Tests for top-k alternatives from lookup() and /food_lookup
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+os.environ.setdefault("FOODSCANNER_BACKGROUND_LOADING", "0")
+
+from src import food_lookup
+from src.embedding_cache import EmbeddingCache
+from src.embedding_index import EmbeddingIndex
+from src.food_cache import FoodCache
+from src.loader import Component
+from src.product_store import ProductStore
+from src.server import app
+from src.write_back import WriteBackPolicy
+
+PRODUCTS = [("Apple", "0001"), ("Apple Juice", "0002"), ("Apple Pie", "0003"), ("Pear", "0004"), ("Rice", "0005")]
+# Corpus rows are unit vectors at decreasing similarity to the "apple" query
+EMBEDDINGS = np.array([[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.8, 0.2, 0.0], [0.1, 0.9, 0.0], [0.0, 0.0, 1.0]])
+
+
+class FixedEncoder:
+    def encode(self, texts, batch_size=32):
+        return np.array([[1.0, 0.0, 0.0] if "apple" in text else [0.0, 0.0, 1.0] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    ProductStore.build(((name, [{"energy-kcal_100g": i}], code) for i, (name, code) in enumerate(PRODUCTS)),
+                       tmp_path / "store")
+    np.save(tmp_path / "embeddings_only.npy", EMBEDDINGS.astype(np.float32))
+    store = ProductStore(tmp_path / "store")
+    food_cache = FoodCache(str(tmp_path / "food_cache.db"))
+    index = EmbeddingIndex(tmp_path / "embeddings_only.npy")
+    components = {
+        "food_cache_component": Component("food_cache", lambda: food_cache),
+        "product_store_component": Component("product_store", lambda: store),
+        "model_component": Component("model", FixedEncoder),
+        "embedding_cache_component": Component("embedding_cache", EmbeddingCache),
+        "search_index_component": Component("search_index", lambda: index),
+    }
+    for name, component in components.items():
+        monkeypatch.setattr(food_lookup, name, component)
+    monkeypatch.setattr(food_lookup, "_semantic_components", list(components.values())[1:])
+    monkeypatch.setattr(food_lookup, "semantic_batcher", None)
+    monkeypatch.setattr(food_lookup, "write_back_policy", WriteBackPolicy(admit_after=1))
+    monkeypatch.setattr(food_lookup, "analyse_macro", lambda code, timeout=None: None)
+    yield food_cache
+    food_cache.close()
+    store.close()
+
+
+def test_semantic_search_top_k(corpus):
+    hits, misses = food_lookup.semantic_search_top_k(["apple", "xyz"], k=3)
+    assert [code for _, _, _, code in hits] == ["0001", "0002", "0003"]
+    assert hits[0][1] == {"energy-kcal_100g": 0}
+    assert [score for _, _, score, _ in hits] == sorted((score for _, _, score, _ in hits), reverse=True)
+    assert misses[0][3] == "0005"
+    # k beyond the corpus returns every row
+    assert len(food_lookup.semantic_search_top_k(["apple"], k=50)[0]) == len(PRODUCTS)
+    assert food_lookup.semantic_search(["apple"]) == [hits[0]]
+
+
+def test_lookup_alternatives_keep_the_cached_result_first(corpus):
+    assert [code for _, _, _, code in food_lookup.lookup("green apple", k=2)] == ["0001", "0002"]
+    # The best hit was written back; a cached result leads, without duplicates
+    corpus.add_to_cache("red apple", "Apple Pie", None, "0003", 0.95)
+    alternatives = food_lookup.lookup("red apple", k=3)
+    assert [code for _, _, _, code in alternatives] == ["0003", "0001", "0002"]
+    assert food_lookup.lookup("red apple") == alternatives[0]
+
+
+def test_food_lookup_endpoint_k(corpus):
+    client = app.test_client()
+
+    body = client.post("/food_lookup", json={"food_text": "apple", "k": 3}).get_json()
+    assert body["result"]["product_name"] == "Apple"
+    assert [item["code"] for item in body["results"]] == ["0001", "0002", "0003"]
+    assert body["results"][0]["similarity_score"] == pytest.approx(100.0)
+
+    assert "results" not in client.post("/food_lookup", json={"food_text": "apple"}).get_json()
+    for k in [0, "3", 1.5, True, 1000]:
+        assert client.post("/food_lookup", json={"food_text": "apple", "k": k}).status_code == 400
@@ -0,0 +1,156 @@
+"""
+Tests for write-back of semantic search results and the negative cache
+"""
+
+import logging
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path to import from src
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from src import food_lookup
+from src.batcher import BatchTimeout, MicroBatcher
+from src.food_cache import FoodCache
+from src.loader import Component
+from src.write_back import NOT_FOUND, WriteBackPolicy
+
+APPLE = ("Red Apple", {"energy-kcal_100g": 52}, 0.9, "0001")
+WEAK = ("Mystery Stew", None, 0.6, "0009")
+
+
+def test_admission_needs_repeated_confident_results():
+    policy = WriteBackPolicy(min_score=0.6, admit_after=2)
+
+    assert not policy.admit("Apple", APPLE)
+    # Sightings are counted by normalized text
+    assert policy.admit(" apple ", APPLE)
+    assert not policy.admit("pear", ("Pear", None, 0.4, "0002"))
+    assert not policy.admit("pear", ("Pear", None, 0.4, "0002"))
+
+    assert policy.stats()["admitted"] == 1
+    assert policy.stats()["rejected_low_score"] == 2
+
+    assert WriteBackPolicy(admit_after=1).admit("apple", APPLE)
+    assert not WriteBackPolicy(write_back=False, admit_after=1).admit("apple", APPLE)
+
+
+def test_negative_entries_expire(clock):
+    policy = WriteBackPolicy(negative_ttl=10, error_ttl=1, clock=clock)
+
+    policy.admit("xyzzy", NOT_FOUND)
+    policy.record_error("broken")
+    assert policy.is_negative("XYZZY") and policy.is_negative("broken")
+
+    clock.now += 5
+    assert policy.is_negative("xyzzy")
+    assert not policy.is_negative("broken")
+    clock.now += 5
+    assert not policy.is_negative("xyzzy")
+    assert policy.stats()["negative_hits"] == 3
+
+
+@pytest.fixture
+def stub_search(tmp_path, monkeypatch):
+    """lookup() over an empty food cache with a counting stand-in for semantic search"""
+    food_cache = FoodCache(str(tmp_path / "food_cache.db"))
+    calls = []
+
+    def semantic_search(texts, encode_batch_size=32):
+        calls.extend(texts)
+        if any(text.startswith("fail") for text in texts):
+            raise RuntimeError("search failed")
+        return [APPLE if "apple" in text else WEAK if "stew" in text else NOT_FOUND for text in texts]
+
+    monkeypatch.setattr(food_lookup, "food_cache_component", Component("food_cache", lambda: food_cache))
+    monkeypatch.setattr(food_lookup, "_semantic_components", [])
+    monkeypatch.setattr(food_lookup, "semantic_search", semantic_search)
+    monkeypatch.setattr(food_lookup, "semantic_batcher", None)
+    monkeypatch.setattr(food_lookup, "write_back_policy", WriteBackPolicy(min_score=0.6, admit_after=2))
+    yield food_cache, calls
+    food_cache.close()
+
+
+def test_lookup_writes_back_repeated_queries(stub_search):
+    food_cache, calls = stub_search
+
+    assert food_lookup.lookup("green apple") == APPLE
+    assert not food_cache.has_exact("green apple")
+    assert food_lookup.lookup("green apple") == APPLE
+    assert food_cache.has_exact("green apple")
+
+    # Served from the food cache from now on
+    assert food_lookup.lookup("green apple")[0] == "Red Apple"
+    assert calls == ["green apple", "green apple"]
+
+
+def test_fuzzy_hits_on_written_back_rows_keep_their_similarity(stub_search):
+    food_cache, calls = stub_search
+
+    assert food_lookup.lookup("lentil stew") == WEAK
+    assert food_lookup.lookup("lentil stew") == WEAK
+    assert food_cache.has_exact("lentil stew")
+
+    # The name matches at ~95%, the stored semantic match was only 0.6
+    assert food_lookup.lookup("lentl stew") == WEAK
+    assert food_cache.stats()["fuzzy_hits"] == 1
+    assert calls == ["lentil stew", "lentil stew"]
+
+
+def test_lookup_negative_caches_misses_and_errors(stub_search):
+    food_cache, calls = stub_search
+
+    assert food_lookup.lookup("xyzzy") == NOT_FOUND
+    assert food_lookup.lookup("xyzzy") == NOT_FOUND
+    assert food_lookup.lookup("fail") == NOT_FOUND
+    assert food_lookup.lookup("fail") == NOT_FOUND
+    assert calls == ["xyzzy", "fail"]
+    assert food_cache.get_cache_size() == 0
+
+
+def test_batch_timeouts_are_not_negative_cached(stub_search, monkeypatch):
+    release = threading.Event()
+
+    def stuck_search(texts):
+        release.wait(5)
+        return [APPLE for _ in texts]
+
+    batcher = MicroBatcher(stuck_search, max_wait_ms=1, timeout=0.05)
+    monkeypatch.setattr(food_lookup, "semantic_batcher", batcher)
+
+    with pytest.raises(BatchTimeout):
+        food_lookup.lookup("red apple")
+    release.set()
+    # The next lookup searches again instead of answering "not found"
+    assert food_lookup.lookup("red apple") == APPLE
+    batcher.close()
+
+
+def test_search_errors_are_logged_and_counted(stub_search, caplog):
+    errors = food_lookup.SEARCH_ERRORS
+    before = errors.value("lookup"), errors.value("batch")
+
+    with caplog.at_level(logging.ERROR, logger="src.food_lookup"):
+        assert food_lookup.lookup("fail") == NOT_FOUND
+        assert food_lookup.lookup_many(["failure", "pear"]) == [NOT_FOUND, NOT_FOUND]
+
+    assert (errors.value("lookup"), errors.value("batch")) == (before[0] + 1, before[1] + 1)
+    failures = [record for record in caplog.records if record.exc_info]
+    assert len(failures) == 2
+    assert "search failed" in caplog.text
+
+
+def test_lookup_many_applies_the_policy(stub_search):
+    food_cache, calls = stub_search
+
+    texts = ["apple pie", "xyzzy", "apple pie"]
+    assert food_lookup.lookup_many(texts) == [APPLE, NOT_FOUND, APPLE]
+    # Duplicates within a batch are searched, and counted, once
+    assert not food_cache.has_exact("apple pie")
+    assert food_lookup.lookup_many(texts) == [APPLE, NOT_FOUND, APPLE]
+    assert food_cache.has_exact("apple pie")
+    assert calls == ["apple pie", "xyzzy", "apple pie"]